@@ -3,6 +3,9 @@ from .vault_routes import router as vault_router
 from .mfa_routes import router as mfa_router
 from .analytics_routes import router as analytics_router
 from .health_routes import router as health_router
+from .metrics_routes import router as metrics_router
+from .audit_routes import router as audit_router
+from .scheduler_routes import router as scheduler_router
 
 __all__ = [
     "auth_router",
@@ -10,4 +13,7 @@ __all__ = [
     "mfa_router",
     "analytics_router",
     "health_router",
+    "metrics_router",
+    "audit_router",
+    "scheduler_router",
 ]
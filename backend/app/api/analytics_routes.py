@@ -1,7 +1,8 @@
 """Analytics API routes."""
 
+from typing import List
 from fastapi import APIRouter, Request, Depends
-from app.db.models import AnalyticsDashboard
+from app.db.models import AnalyticsDashboard, ReusedPasswordGroup, SimilarPasswordGroup
 from app.services import analytics_service
 from app.middleware import get_current_user, get_encryption_key
 
@@ -22,3 +23,31 @@ async def get_dashboard(
     )
     
     return dashboard
+
+
+@router.get("/reused", response_model=List[ReusedPasswordGroup])
+async def get_reused(
+    request: Request,
+    user: dict = Depends(get_current_user),
+):
+    """Groups of entries that share a password."""
+    key = await get_encryption_key(request)
+    
+    return await analytics_service.get_reused_groups(
+        user_id=user["id"],
+        encryption_key=key,
+    )
+
+
+@router.get("/similar", response_model=List[SimilarPasswordGroup])
+async def get_similar(
+    request: Request,
+    user: dict = Depends(get_current_user),
+):
+    """Groups of entries with near-duplicate passwords."""
+    key = await get_encryption_key(request)
+    
+    return await analytics_service.get_similar_groups(
+        user_id=user["id"],
+        encryption_key=key,
+    )
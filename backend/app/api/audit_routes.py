@@ -0,0 +1,102 @@
+"""Audit log API routes."""
+
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import Literal, Optional
+from fastapi import APIRouter, Request, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from app.db.models import AuditEvent, AuditPage
+from app.services import audit_service
+from app.middleware import get_current_user, is_operator, limiter
+
+router = APIRouter(prefix="/api/audit", tags=["Audit"])
+
+EXPORT_FIELDS = list(AuditEvent.model_fields)
+
+
+def _utc(value: Optional[datetime]) -> Optional[str]:
+    """Audit timestamps are stored as naive UTC ISO strings."""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+async def _csv_lines(events):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    async for event in events:
+        writer.writerow(event)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+async def _ndjson_lines(events):
+    async for event in events:
+        yield json.dumps(event, ensure_ascii=False) + "\n"
+
+
+@router.get("", response_model=AuditPage)
+@limiter.limit("30/minute")
+async def list_events(
+    request: Request,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    ip: Optional[str] = None,
+    user_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    format: Literal["json", "csv", "ndjson"] = "json",
+):
+    """
+    Audit events, newest first.
+    
+    Users see their own events. Requests with a valid X-Operator-Token may
+    query any user (or all users when `user_id` is omitted). JSON results
+    are paged with `next_cursor`; `format=csv|ndjson` streams every
+    matching event instead.
+    """
+    if not is_operator(request):
+        user = await get_current_user(request)
+        if user_id is not None and user_id != user["id"]:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Cannot read another user's audit log",
+            )
+        user_id = user["id"]
+    
+    filters = {
+        "user_id": user_id,
+        "action": action,
+        "since": _utc(since),
+        "until": _utc(until),
+        "ip_address": ip,
+    }
+    
+    if format != "json":
+        events = audit_service.iter_events(**filters)
+        if format == "csv":
+            body, media_type = _csv_lines(events), "text/csv; charset=utf-8"
+        else:
+            body, media_type = _ndjson_lines(events), "application/x-ndjson"
+        return StreamingResponse(
+            body,
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="audit.{format}"'},
+        )
+    
+    try:
+        events, next_cursor = await audit_service.query_events(cursor=cursor, limit=limit, **filters)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+    
+    return AuditPage(events=events, next_cursor=next_cursor)
@@ -1,12 +1,20 @@
 """Authentication API routes."""
 
 from fastapi import APIRouter, Request, HTTPException, status, Depends
-from app.db.models import UserRegister, UserLogin, TokenResponse, UserResponse
+from app.db.models import (
+    UserRegister,
+    UserLogin,
+    ChangePasswordRequest,
+    RefreshRequest,
+    TokenResponse,
+    UserResponse,
+)
 from app.services import auth_service
 from app.middleware import get_current_user, limiter
-from app.utils import logger
+from app.utils import get_logger
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
+logger = get_logger(__name__)
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -43,6 +51,7 @@ async def login(request: Request, data: UserLogin):
         password=data.master_password,
         mfa_code=data.mfa_code,
         ip_address=ip_address,
+        user_agent=request.headers.get("User-Agent"),
     )
     
     if error:
@@ -59,6 +68,23 @@ async def login(request: Request, data: UserLogin):
     return token_response
 
 
+@router.post("/refresh", response_model=TokenResponse)
+@limiter.limit("30/minute")
+async def refresh(request: Request, data: RefreshRequest):
+    """Exchange a refresh token for a new access and refresh token."""
+    ip_address = request.client.host if request.client else None
+    
+    token_response, error = await auth_service.refresh(data.refresh_token, ip_address)
+    
+    if error:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=error,
+        )
+    
+    return token_response
+
+
 @router.get("/me", response_model=UserResponse)
 async def get_me(request: Request, user: dict = Depends(get_current_user)):
     """Get current authenticated user."""
@@ -71,8 +97,37 @@ async def get_me(request: Request, user: dict = Depends(get_current_user)):
     )
 
 
+@router.post("/change-password")
+@limiter.limit("5/minute")
+async def change_password(
+    request: Request,
+    data: ChangePasswordRequest,
+    user: dict = Depends(get_current_user),
+):
+    """Change the master password and sign out other sessions."""
+    ip_address = request.client.host if request.client else None
+    
+    success, error = await auth_service.change_master_password(
+        user_id=user["id"],
+        current_password=data.current_password,
+        new_password=data.new_password,
+        ip_address=ip_address,
+        session_id=user["session_id"],
+    )
+    
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error,
+        )
+    
+    return {"message": "Master password changed"}
+
+
 @router.post("/logout")
 async def logout(request: Request, user: dict = Depends(get_current_user)):
-    """Logout (client should discard token)."""
-    logger.info(f"User logged out: {user['email']}")
+    """Logout (revokes the token's session)."""
+    ip_address = request.client.host if request.client else None
+    await auth_service.logout(user, ip_address)
+    logger.info("User logged out: %s", user["email"])
     return {"message": "Logged out successfully"}
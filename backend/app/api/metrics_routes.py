@@ -0,0 +1,25 @@
+"""Metrics API routes."""
+
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from app.config import get_settings
+from app.utils.metrics import registry
+
+settings = get_settings()
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics in text exposition format."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Metrics are disabled",
+        )
+    
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -1,14 +1,18 @@
 """MFA API routes."""
 
+from typing import Literal
 from fastapi import APIRouter, Request, HTTPException, status, Depends
+from starlette.concurrency import run_in_threadpool
 from app.db.models import MFASetupResponse, MFAVerifyRequest, MFAStatusResponse
 from app.db import user_repo
 from app.mfa import totp_manager
-from app.crypto import key_manager, mfa_crypto
+from app.crypto import mfa_crypto
+from app.services import auth_service
 from app.middleware import get_current_user
-from app.utils import logger
+from app.utils import get_logger
 
 router = APIRouter(prefix="/api/mfa", tags=["MFA"])
+logger = get_logger(__name__)
 
 
 @router.get("/status", response_model=MFAStatusResponse)
@@ -20,9 +24,10 @@ async def get_mfa_status(user: dict = Depends(get_current_user)):
 @router.post("/setup", response_model=MFASetupResponse)
 async def setup_mfa(
     request: Request,
+    qr_format: Literal["png", "svg"] = "png",
     user: dict = Depends(get_current_user),
 ):
-    """Set up MFA - returns secret and QR code."""
+    """Set up MFA - returns secret and QR code (PNG or SVG)."""
     if user["mfa_enabled"]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -40,7 +45,8 @@ async def setup_mfa(
     # Generate TOTP secret
     secret = totp_manager.generate_secret()
     provisioning_uri = totp_manager.get_provisioning_uri(secret, user["email"])
-    qr_code = totp_manager.generate_qr_code(provisioning_uri)
+    # QR rendering is CPU-bound; keep it off the event loop
+    qr_code = await run_in_threadpool(totp_manager.generate_qr_code, provisioning_uri, qr_format)
     
     # Store secret temporarily in response (user must verify to finalize)
     # In a real app, you might store it encrypted but not enable MFA until verified
@@ -48,6 +54,7 @@ async def setup_mfa(
     return MFASetupResponse(
         secret=secret,
         qr_code=qr_code,
+        qr_format=qr_format,
         provisioning_uri=provisioning_uri,
     )
 
@@ -83,13 +90,17 @@ async def enable_mfa(
         )
     
     # Encrypt and store the secret
-    salt = key_manager.decode_salt(user["salt"])
-    encryption_key = key_manager.derive_key(master_password, salt)
+    encryption_key = await auth_service.get_derived_key(user["id"], master_password)
+    if not encryption_key:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid master password",
+        )
     encrypted_secret = mfa_crypto.encrypt_secret(secret, encryption_key)
     
     await user_repo.enable_mfa(user["id"], encrypted_secret)
     
-    logger.info(f"MFA enabled for user {user['email']}")
+    logger.info("MFA enabled for user %s", user["email"])
     
     return {"message": "MFA enabled successfully"}
 
@@ -116,8 +127,12 @@ async def disable_mfa(
         )
     
     # Decrypt and verify
-    salt = key_manager.decode_salt(user["salt"])
-    encryption_key = key_manager.derive_key(master_password, salt)
+    encryption_key = await auth_service.get_derived_key(user["id"], master_password)
+    if not encryption_key:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid master password",
+        )
     
     try:
         secret = mfa_crypto.decrypt_secret(user["mfa_secret_encrypted"], encryption_key)
@@ -135,6 +150,6 @@ async def disable_mfa(
     
     await user_repo.disable_mfa(user["id"])
     
-    logger.info(f"MFA disabled for user {user['email']}")
+    logger.info("MFA disabled for user %s", user["email"])
     
     return {"message": "MFA disabled successfully"}
@@ -0,0 +1,23 @@
+"""Scheduler API routes."""
+
+from fastapi import APIRouter, Request, HTTPException, status
+from app.services import scheduler_service
+from app.middleware import is_operator
+
+router = APIRouter(prefix="/api/scheduler", tags=["Scheduler"])
+
+
+@router.get("/jobs")
+async def list_jobs(request: Request):
+    """Scheduled jobs in this worker with their recent runs (operators only)."""
+    if not is_operator(request):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Operator token required",
+        )
+    
+    return {
+        "worker": scheduler_service.worker_id,
+        "leader": scheduler_service.is_leader,
+        "jobs": await scheduler_service.get_status(),
+    }
@@ -1,19 +1,41 @@
 """Vault API routes."""
 
-from typing import List
-from fastapi import APIRouter, Request, HTTPException, status, Depends
+import asyncio
+import json
+import time
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, Request, Response, HTTPException, Query, status, Depends, Header
+from fastapi.responses import StreamingResponse
+from app.config import get_settings
 from app.db.models import (
     VaultEntryCreate,
     VaultEntryUpdate,
     VaultEntryResponse,
     VaultEntryDetail,
+    VaultSearchResult,
     PasswordStrength,
 )
-from app.services import vault_service, strength_service, breach_service
+from app.services import (
+    vault_service,
+    search_service,
+    strength_service,
+    breach_service,
+    event_service,
+    session_service,
+)
 from app.middleware import get_current_user, get_encryption_key
+from app.utils import model_list_response
+
+settings = get_settings()
 
 router = APIRouter(prefix="/api/vault", tags=["Vault"])
 
+# Client reconnect delay sent with every event stream (milliseconds)
+EVENTS_RETRY_MS = 3000
+# Vault version a list includes or a write created, so clients can skip
+# the events of their own writes
+VAULT_VERSION_HEADER = "X-Vault-Version"
+
 
 @router.get("/list", response_model=List[VaultEntryResponse])
 async def list_entries(
@@ -22,13 +44,81 @@ async def list_entries(
 ):
     """List all vault entries (passwords masked)."""
     key = await get_encryption_key(request)
-    entries = await vault_service.get_entries(user["id"], key)
-    return entries
+    entries, version = await vault_service.get_entries(user["id"], key)
+    response = model_list_response(entries, VaultEntryResponse)
+    response.headers[VAULT_VERSION_HEADER] = str(version)
+    return response
+
+
+@router.get("/search", response_model=List[VaultSearchResult])
+async def search_entries(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    user: dict = Depends(get_current_user),
+):
+    """Search entry titles, usernames and URLs (substring; word prefix under 3 characters)."""
+    key = await get_encryption_key(request)
+    return await search_service.search(user["id"], key, q, limit)
+
+
+@router.get("/events")
+async def vault_events(
+    request: Request,
+    user: dict = Depends(get_current_user),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Server-sent events for changes to the user's vault: ``entry_added``,
+    ``entry_updated`` and ``entry_deleted`` with the entry id and new vault
+    version. Send ``Last-Event-ID`` on reconnect to catch up.
+    
+    The stream ends when the access token expires or the session is
+    revoked; reconnect with a fresh token.
+    """
+    after = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    subscription = await event_service.subscribe(user["id"], after)
+    deadline = time.monotonic() + (user["token_expires_at"] - time.time())
+    
+    async def stream() -> AsyncIterator[str]:
+        try:
+            yield f"retry: {EVENTS_RETRY_MS}\n\n"
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or session_service.is_revoked(user["session_id"]):
+                    return
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(),
+                        timeout=min(settings.VAULT_EVENTS_HEARTBEAT_SECONDS, remaining),
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None or session_service.is_revoked(user["session_id"]):
+                    return
+                data = {
+                    "entry_id": event["entry_id"],
+                    "vault_version": event["vault_version"],
+                    "created_at": event["created_at"],
+                }
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            event_service.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/add", response_model=VaultEntryDetail, status_code=status.HTTP_201_CREATED)
 async def add_entry(
     request: Request,
+    response: Response,
     data: VaultEntryCreate,
     user: dict = Depends(get_current_user),
 ):
@@ -36,13 +126,14 @@ async def add_entry(
     key = await get_encryption_key(request)
     ip_address = request.client.host if request.client else None
     
-    entry = await vault_service.add_entry(
+    entry, version = await vault_service.add_entry(
         user_id=user["id"],
         data=data,
         encryption_key=key,
         ip_address=ip_address,
     )
     
+    response.headers[VAULT_VERSION_HEADER] = str(version)
     return entry
 
 
@@ -75,13 +166,14 @@ async def update_entry(
     entry_id: str,
     data: VaultEntryUpdate,
     request: Request,
+    response: Response,
     user: dict = Depends(get_current_user),
 ):
     """Update a password entry."""
     key = await get_encryption_key(request)
     ip_address = request.client.host if request.client else None
     
-    entry = await vault_service.update_entry(
+    result = await vault_service.update_entry(
         entry_id=entry_id,
         user_id=user["id"],
         data=data,
@@ -89,12 +181,14 @@ async def update_entry(
         ip_address=ip_address,
     )
     
-    if not entry:
+    if not result:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Entry not found or access denied",
         )
     
+    entry, version = result
+    response.headers[VAULT_VERSION_HEADER] = str(version)
     return entry
 
 
@@ -102,22 +196,25 @@ async def update_entry(
 async def delete_entry(
     entry_id: str,
     request: Request,
+    response: Response,
     user: dict = Depends(get_current_user),
 ):
     """Delete a password entry."""
     ip_address = request.client.host if request.client else None
     
-    result = await vault_service.delete_entry(
+    version = await vault_service.delete_entry(
         entry_id=entry_id,
         user_id=user["id"],
         ip_address=ip_address,
     )
     
-    if not result:
+    if version is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Entry not found or access denied",
         )
+    
+    response.headers[VAULT_VERSION_HEADER] = str(version)
 
 
 @router.post("/check-strength", response_model=PasswordStrength)
@@ -18,6 +18,10 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    REFRESH_REUSE_GRACE_SECONDS: int = 30  # previous refresh token tolerated (not reuse) after a rotation
+    SESSION_REVOCATION_REFRESH_SECONDS: float = 2.0  # how stale another worker's revocations may be
+    SESSION_CLEANUP_INTERVAL_SECONDS: int = 3600
+    TOKEN_CACHE_SIZE: int = 10000  # verified JWTs kept decoded; 0 disables
     
     # Crypto
     ARGON2_TIME_COST: int = 3
@@ -26,10 +30,80 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite+aiosqlite:///./vault.db"
+    # Users spread over this many SQLite files, each with its own writer;
+    # shard 0 is DATABASE_URL, the others sit next to it (vault.shard1.db, ...)
+    DB_SHARDS: int = 1
+    
+    # Online migration backfills (small transactions, paused in between)
+    MIGRATION_BATCH_SIZE: int = 500
+    MIGRATION_BATCH_PAUSE_MS: float = 20.0
+    
+    # Audit log retention (rows older than this move to archive segments)
+    AUDIT_RETENTION_DAYS: int = 90  # 0 keeps everything in the database
+    AUDIT_ARCHIVE_DIR: str = "audit_archive"  # relative to the database file
+    AUDIT_COMPACTION_INTERVAL_SECONDS: int = 3600
+    AUDIT_COMPACTION_BATCH_SIZE: int = 1000
+    AUDIT_COMPACTION_PAUSE_MS: float = 20.0
+    
+    # Online database snapshots (every shard), compressed and checksummed
+    BACKUP_DIR: str = "backups"  # relative to the database file
+    BACKUP_CRON: str = "15 2 * * *"  # UTC; empty disables scheduled snapshots
+    BACKUP_KEEP: int = 7  # newest snapshots kept
+    BACKUP_PAGES_PER_STEP: int = 256  # per step, for files not in WAL mode
+    BACKUP_STEP_PAUSE_MS: float = 10.0
+    
+    # Background job scheduler (leader-only jobs run in one worker)
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_LEASE_SECONDS: int = 30
+    SCHEDULER_HISTORY_DAYS: int = 14
+    
+    # Vault search (decrypted indexes are kept in memory between searches)
+    SEARCH_INDEX_CACHE_SIZE: int = 256  # users; 0 disables
+    SEARCH_INDEX_CACHE_SECONDS: int = 900
+    
+    # Decrypted entry summaries for vault list views, shared by all users
+    VAULT_SUMMARY_CACHE_MB: int = 64  # approximate; 0 disables
+    VAULT_SUMMARY_CACHE_SECONDS: int = 300
+    
+    # Vault change notifications (/api/vault/events)
+    VAULT_EVENTS_POLL_SECONDS: float = 1.0  # how soon other workers' changes arrive
+    VAULT_EVENTS_HEARTBEAT_SECONDS: int = 15
+    VAULT_EVENTS_RETENTION_MINUTES: int = 60  # replay window for reconnecting clients
+    
+    # Admission control for CPU-heavy requests (Argon2, bulk decrypt, analytics)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_CONCURRENT: int = 0  # per worker; 0 uses the CPU count
+    ADMISSION_MAX_WAIT_MS: int = 2000  # longer expected queueing is refused with 503
     
     # Rate Limiting
+    RATE_LIMIT_ENABLED: bool = True
     RATE_LIMIT_PER_MINUTE: int = 60
     
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"  # "text" or "json"
+    LOG_FILE: str = "app.log"  # empty disables file logging
+    LOG_ROTATION: str = "size"  # "size" or "time"
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_ROTATE_WHEN: str = "midnight"
+    LOG_BACKUP_COUNT: int = 5
+    LOG_SAMPLE_RATES: dict = {}  # e.g. {"services.vault_service": 0.1}
+    
+    # Response compression (gzip, when the client accepts it)
+    GZIP_ENABLED: bool = True
+    GZIP_MINIMUM_SIZE: int = 1024  # bytes; smaller bodies are sent as is
+    GZIP_LEVEL: int = 5
+    
+    # Observability
+    METRICS_ENABLED: bool = True
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_INTERVAL_MS: float = 5.0
+    PROFILING_OUTPUT_DIR: str = "profiles"
+    
+    # Operator access (profiling header, operator-only endpoints)
+    OPERATOR_TOKEN: str = ""
+    
     # HIBP API
     HIBP_API_URL: str = "https://api.pwnedpasswords.com/range/"
     
@@ -1,10 +1,11 @@
-from .key_manager import key_manager, KeyManager
+from .key_manager import key_manager, KeyManager, Argon2Params
 from .vault_crypto import vault_crypto, VaultCrypto
 from .mfa_crypto import mfa_crypto, MFACrypto
 
 __all__ = [
     "key_manager",
     "KeyManager",
+    "Argon2Params",
     "vault_crypto",
     "VaultCrypto",
     "mfa_crypto",
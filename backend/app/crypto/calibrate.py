@@ -0,0 +1,117 @@
+"""
+Argon2id parameter calibration.
+
+Benchmarks key derivation on this host and prints ARGON2_* settings that
+hit a target latency within a memory budget:
+    
+    python -m app.crypto.calibrate --target-ms 500 --max-memory-mib 64
+
+Parallelism follows the core count (capped, since concurrent logins share
+the cores). Memory is spent first, as it is what makes Argon2 expensive
+for attackers; passes are then added until the target latency is reached.
+If a single pass at the budget is already too slow, memory is halved
+instead. Existing users keep the parameters stored with their key and
+are moved to the new ones on their next login.
+"""
+
+import argparse
+import os
+import secrets
+import statistics
+import time
+
+from argon2.low_level import hash_secret_raw, Type
+
+from app.crypto.key_manager import Argon2Params
+
+MIN_MEMORY_MIB = 19  # OWASP minimum for Argon2id
+MAX_TIME_COST = 20
+
+
+def measure(params: Argon2Params, rounds: int = 3) -> float:
+    """Median derivation time in milliseconds."""
+    password = secrets.token_bytes(16)
+    salt = secrets.token_bytes(32)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        hash_secret_raw(
+            secret=password,
+            salt=salt,
+            time_cost=params.time_cost,
+            memory_cost=params.memory_cost,
+            parallelism=params.parallelism,
+            hash_len=32,
+            type=Type.ID,
+        )
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(
+    target_ms: float,
+    max_memory_mib: int,
+    parallelism: int,
+    rounds: int = 3,
+    verbose: bool = True,
+) -> Argon2Params:
+    """Pick the most expensive parameters that stay within target_ms."""
+    def run(params: Argon2Params) -> float:
+        elapsed = measure(params, rounds)
+        if verbose:
+            print(
+                f"  t={params.time_cost:<3} m={params.memory_cost // 1024:>5} MiB "
+                f"p={params.parallelism:<3} {elapsed:8.1f} ms"
+            )
+        return elapsed
+    
+    memory_mib = max(max_memory_mib, MIN_MEMORY_MIB)
+    params = Argon2Params(1, memory_mib * 1024, parallelism)
+    elapsed = run(params)
+    
+    # Too slow even with one pass: give up memory, down to the minimum
+    while elapsed > target_ms and memory_mib > MIN_MEMORY_MIB:
+        memory_mib = max(memory_mib // 2, MIN_MEMORY_MIB)
+        params = params._replace(memory_cost=memory_mib * 1024)
+        elapsed = run(params)
+    
+    if elapsed >= target_ms:
+        return params
+    
+    two_passes = params._replace(time_cost=2)
+    elapsed_two = run(two_passes)
+    if elapsed_two > target_ms:
+        return params
+    
+    # Time grows linearly per pass on top of a fixed cost (mostly memory
+    # allocation): extrapolate from one and two passes, then step back if over
+    per_pass = max(elapsed_two - elapsed, 1e-3)
+    time_cost = min(2 + int((target_ms - elapsed_two) / per_pass), MAX_TIME_COST)
+    while time_cost > 2:
+        candidate = params._replace(time_cost=time_cost)
+        if run(candidate) <= target_ms:
+            return candidate
+        time_cost -= 1
+    return two_passes
+
+
+def main(argv=None):
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Calibrate Argon2id parameters for this host")
+    parser.add_argument("--target-ms", type=float, default=500, help="Target derivation time per login")
+    parser.add_argument("--max-memory-mib", type=int, default=64, help="Memory budget per derivation")
+    parser.add_argument("--parallelism", type=int, default=min(cores, 4), help=f"Lanes (default: cores capped at 4, {cores} cores found)")
+    parser.add_argument("--rounds", type=int, default=3, help="Runs per measurement (median is used)")
+    args = parser.parse_args(argv)
+    
+    print(f"Calibrating Argon2id for {args.target_ms:.0f} ms on {cores} cores")
+    params = calibrate(args.target_ms, args.max_memory_mib, max(args.parallelism, 1), args.rounds)
+    
+    print("\nAdd to .env:")
+    print(f"ARGON2_TIME_COST={params.time_cost}")
+    print(f"ARGON2_MEMORY_COST={params.memory_cost}")
+    print(f"ARGON2_PARALLELISM={params.parallelism}")
+
+
+if __name__ == "__main__":
+    main()
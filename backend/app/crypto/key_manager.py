@@ -1,13 +1,36 @@
 """Master key derivation using Argon2id."""
 
+import hmac
 import secrets
 import base64
+from typing import Any, Dict, NamedTuple, Optional
 from argon2 import PasswordHasher
 from argon2.low_level import hash_secret_raw, Type
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from app.config import get_settings
+from app.utils.metrics import key_derivation_duration, timed
 
 settings = get_settings()
 
+# Key schemes stored in users.key_version
+KEY_VERSION_LEGACY = 1  # PasswordHasher hash + raw Argon2 output as vault key
+KEY_VERSION_HKDF = 2    # one Argon2 master key, HKDF auth and encryption subkeys
+KEY_VERSION_WRAPPED = 3  # as 2, but data is under a random data key wrapped by a HKDF subkey
+
+AUTH_KEY_INFO = b"samurai-vault/auth-verifier/v1"
+ENCRYPTION_KEY_INFO = b"samurai-vault/vault-encryption/v1"
+KEY_WRAP_INFO = b"samurai-vault/key-wrap/v1"
+FINGERPRINT_KEY_INFO = b"samurai-vault/password-fingerprint/v1"
+VERIFIER_PREFIX = "$sv-hkdf-sha256$"
+
+
+class Argon2Params(NamedTuple):
+    """Argon2id cost parameters a master key was derived with."""
+    time_cost: int
+    memory_cost: int  # KiB
+    parallelism: int
+
 
 class KeyManager:
     """Handles master key derivation and password hashing."""
@@ -19,29 +42,105 @@ class KeyManager:
             parallelism=settings.ARGON2_PARALLELISM,
         )
     
+    @property
+    def target_params(self) -> Argon2Params:
+        """Parameters for new keys (ARGON2_* settings, see app.crypto.calibrate)."""
+        return Argon2Params(
+            settings.ARGON2_TIME_COST,
+            settings.ARGON2_MEMORY_COST,
+            settings.ARGON2_PARALLELISM,
+        )
+    
+    def user_params(self, user: Dict[str, Any]) -> Argon2Params:
+        """Parameters stored for a user's master key."""
+        if user.get("kdf_time_cost") is None:
+            # Guessing would derive a wrong key and lock the user out
+            raise ValueError(f"No Argon2 parameters stored for user {user.get('id')}")
+        return Argon2Params(user["kdf_time_cost"], user["kdf_memory_cost"], user["kdf_parallelism"])
+    
+    def needs_rehash(self, params: Argon2Params) -> bool:
+        """
+        Whether a key derived with `params` should be re-derived.
+        
+        Same rule as PasswordHasher.check_needs_rehash: any difference from
+        the current target, so parameters can be lowered as well as raised.
+        """
+        return params != self.target_params
+    
     def generate_salt(self) -> bytes:
         """Generate a cryptographically secure random salt."""
         return secrets.token_bytes(32)
     
-    def derive_key(self, master_password: str, salt: bytes) -> bytes:
-        """Derive a 256-bit encryption key from master password."""
+    @timed(key_derivation_duration)
+    def derive_key(
+        self,
+        master_password: str,
+        salt: bytes,
+        params: Optional[Argon2Params] = None,
+    ) -> bytes:
+        """
+        Derive a 256-bit master key from master password (Argon2id).
+        
+        For KEY_VERSION_HKDF accounts this is the single expensive step;
+        the auth verifier and encryption key are HKDF subkeys of it. For
+        legacy accounts it is used directly as the vault key. Uses the
+        target parameters unless the user's stored ones are given.
+        """
+        params = params or self.target_params
         key = hash_secret_raw(
             secret=master_password.encode('utf-8'),
             salt=salt,
-            time_cost=settings.ARGON2_TIME_COST,
-            memory_cost=settings.ARGON2_MEMORY_COST,
-            parallelism=settings.ARGON2_PARALLELISM,
+            time_cost=params.time_cost,
+            memory_cost=params.memory_cost,
+            parallelism=params.parallelism,
             hash_len=32,  # 256 bits
             type=Type.ID,
         )
         return key
     
+    def derive_subkey(self, master_key: bytes, info: bytes) -> bytes:
+        """Derive an independent 256-bit subkey from the master key (HKDF-SHA256)."""
+        return HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=info,
+        ).derive(master_key)
+    
+    def derive_encryption_key(self, master_key: bytes) -> bytes:
+        """Derive the vault encryption subkey."""
+        return self.derive_subkey(master_key, ENCRYPTION_KEY_INFO)
+    
+    def derive_wrapping_key(self, master_key: bytes) -> bytes:
+        """Derive the key-encryption key that wraps the user's data key."""
+        return self.derive_subkey(master_key, KEY_WRAP_INFO)
+    
+    def derive_fingerprint_key(self, data_key: bytes) -> bytes:
+        """Derive the HMAC key for password fingerprints from the data key."""
+        return self.derive_subkey(data_key, FINGERPRINT_KEY_INFO)
+    
+    def generate_data_key(self) -> bytes:
+        """Generate a random 256-bit data-encryption key."""
+        return secrets.token_bytes(32)
+    
+    def create_auth_verifier(self, master_key: bytes) -> str:
+        """Derive the auth-verifier subkey, encoded for storage in password_hash."""
+        auth_key = self.derive_subkey(master_key, AUTH_KEY_INFO)
+        return VERIFIER_PREFIX + base64.b64encode(auth_key).decode('utf-8')
+    
+    def verify_auth_verifier(self, master_key: bytes, verifier: str) -> bool:
+        """Check a master key against a stored auth verifier (constant time)."""
+        if not verifier or not verifier.startswith(VERIFIER_PREFIX):
+            return False
+        expected = self.create_auth_verifier(master_key)
+        return hmac.compare_digest(expected.encode('utf-8'), verifier.encode('utf-8'))
+    
     def hash_password(self, password: str) -> str:
-        """Hash a password for storage (for user authentication)."""
+        """Hash a password for storage (legacy KEY_VERSION_LEGACY accounts)."""
         return self.hasher.hash(password)
     
     def verify_password(self, password: str, hash: str) -> bool:
-        """Verify a password against its hash."""
+        """Verify a password against its hash (legacy KEY_VERSION_LEGACY accounts)."""
         try:
             return self.hasher.verify(hash, password)
         except Exception:
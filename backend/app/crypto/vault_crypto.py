@@ -5,13 +5,16 @@ import base64
 import json
 from typing import Dict, Any, Optional
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from app.utils.metrics import vault_crypto_duration, timed
 
 
 class VaultCrypto:
     """Handles encryption and decryption of vault entries."""
     
     NONCE_SIZE = 12  # 96 bits for GCM
+    KEY_WRAP_AAD = b"samurai-vault/data-key"
     
+    @timed(vault_crypto_duration.labels("encrypt"))
     def encrypt(self, plaintext: str, key: bytes) -> str:
         """
         Encrypt plaintext using AES-256-GCM.
@@ -36,6 +39,7 @@ class VaultCrypto:
         encrypted = nonce + ciphertext
         return base64.b64encode(encrypted).decode('utf-8')
     
+    @timed(vault_crypto_duration.labels("decrypt"))
     def decrypt(self, encrypted_b64: str, key: bytes) -> str:
         """
         Decrypt AES-256-GCM encrypted data.
@@ -60,6 +64,21 @@ class VaultCrypto:
         
         return plaintext.decode('utf-8')
     
+    def wrap_key(self, data_key: bytes, wrapping_key: bytes) -> str:
+        """Encrypt a data key under a key-encryption key (AES-256-GCM)."""
+        if len(data_key) != 32 or len(wrapping_key) != 32:
+            raise ValueError("Keys must be 256 bits (32 bytes)")
+        
+        nonce = os.urandom(self.NONCE_SIZE)
+        wrapped = AESGCM(wrapping_key).encrypt(nonce, data_key, self.KEY_WRAP_AAD)
+        return base64.b64encode(nonce + wrapped).decode('utf-8')
+    
+    def unwrap_key(self, wrapped_b64: str, wrapping_key: bytes) -> bytes:
+        """Decrypt a data key wrapped by wrap_key."""
+        wrapped = base64.b64decode(wrapped_b64.encode('utf-8'))
+        nonce = wrapped[:self.NONCE_SIZE]
+        return AESGCM(wrapping_key).decrypt(nonce, wrapped[self.NONCE_SIZE:], self.KEY_WRAP_AAD)
+    
     def encrypt_entry(self, entry: Dict[str, Any], key: bytes) -> str:
         """Encrypt a vault entry dictionary."""
         json_str = json.dumps(entry, ensure_ascii=False)
@@ -1,38 +1,61 @@
 from .database import db, Database
+from .shards import shard_router, ShardRouter
 from .models import (
     UserRegister,
     UserLogin,
+    ChangePasswordRequest,
     UserResponse,
     TokenResponse,
+    RefreshRequest,
     VaultEntryCreate,
     VaultEntryUpdate,
     VaultEntryResponse,
     VaultEntryDetail,
+    VaultSearchResult,
     MFASetupResponse,
     MFAVerifyRequest,
     MFAStatusResponse,
     PasswordStrength,
     AnalyticsDashboard,
+    SimilarPasswordEntry,
+    SimilarPasswordGroup,
+    ReusedPasswordGroup,
+    AuditEvent,
+    AuditPage,
 )
-from .repository import user_repo, vault_repo, audit_repo
+from .repository import user_repo, vault_repo, audit_repo, session_repo, job_repo, search_index_repo, event_repo
 
 __all__ = [
     "db",
     "Database",
+    "shard_router",
+    "ShardRouter",
     "UserRegister",
     "UserLogin",
+    "ChangePasswordRequest",
     "UserResponse",
     "TokenResponse",
+    "RefreshRequest",
     "VaultEntryCreate",
     "VaultEntryUpdate",
     "VaultEntryResponse",
     "VaultEntryDetail",
+    "VaultSearchResult",
     "MFASetupResponse",
     "MFAVerifyRequest",
     "MFAStatusResponse",
     "PasswordStrength",
     "AnalyticsDashboard",
+    "SimilarPasswordEntry",
+    "SimilarPasswordGroup",
+    "ReusedPasswordGroup",
+    "AuditEvent",
+    "AuditPage",
     "user_repo",
     "vault_repo",
     "audit_repo",
+    "session_repo",
+    "job_repo",
+    "search_index_repo",
+    "event_repo",
 ]
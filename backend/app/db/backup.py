@@ -0,0 +1,70 @@
+"""
+Database snapshot CLI.
+
+    python -m app.db.backup snapshot       # take one now (safe while the app runs)
+    python -m app.db.backup list           # snapshots, oldest first
+    python -m app.db.backup verify NAME    # checksums and integrity check
+    python -m app.db.backup restore NAME   # replace the database; app stopped
+
+Uses DATABASE_URL, DB_SHARDS and BACKUP_DIR like the app, which also takes
+snapshots on BACKUP_CRON. `restore` keeps the replaced files next to the
+new ones with a .before-restore suffix.
+"""
+
+import argparse
+import asyncio
+import sys
+
+from app.services.backup_service import backup_service
+
+
+def snapshot():
+    manifest = asyncio.run(backup_service.snapshot())
+    print(f"Snapshot {manifest['name']}")
+    for entry in manifest["files"]:
+        print(f"  {entry['name']:<24} {entry['bytes']:>12,} bytes -> {entry['compressed_bytes']:>12,}")
+
+
+def list_snapshots():
+    manifests = backup_service.snapshots()
+    if not manifests:
+        print(f"No snapshots in {backup_service.backup_dir}")
+    for manifest in manifests:
+        size = sum(entry["compressed_bytes"] for entry in manifest["files"])
+        print(f"{manifest['name']}  {len(manifest['files'])} file(s)  {size:>12,} bytes")
+
+
+def verify(name: str):
+    manifest = backup_service.verify(name)
+    print(f"Snapshot {name} is intact ({len(manifest['files'])} file(s))")
+
+
+def restore(name: str):
+    for path in backup_service.restore(name):
+        print(f"Restored {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SamuraiVault database snapshots")
+    parser.add_argument("command", choices=("snapshot", "list", "verify", "restore"))
+    parser.add_argument("name", nargs="?", help="Snapshot name (verify, restore)")
+    args = parser.parse_args(argv)
+    if args.command in ("verify", "restore") and not args.name:
+        parser.error(f"{args.command} needs a snapshot name")
+
+    try:
+        if args.command == "snapshot":
+            snapshot()
+        elif args.command == "list":
+            list_snapshots()
+        elif args.command == "verify":
+            verify(args.name)
+        else:
+            restore(args.name)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
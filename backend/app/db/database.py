@@ -1,11 +1,40 @@
 """Database connection and initialization."""
 
+import asyncio
 import aiosqlite
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from pathlib import Path
+from app.config import get_settings
 from app.utils import logger
+from app.utils.metrics import db_query_duration
 
-DB_PATH = Path(__file__).parent.parent.parent / "vault.db"
-SCHEMA_PATH = Path(__file__).parent / "schema.sql"
+settings = get_settings()
+
+BACKEND_DIR = Path(__file__).parent.parent.parent
+
+
+def _resolve_db_path(database_url: str) -> Path:
+    """Get the SQLite file from DATABASE_URL; relative paths are under backend/."""
+    path = Path(database_url.split(":///", 1)[-1])
+    return path if path.is_absolute() else BACKEND_DIR / path
+
+
+DB_PATH = _resolve_db_path(settings.DATABASE_URL)
+
+
+@lru_cache(maxsize=512)
+def _query_timer(query: str):
+    """Get the latency histogram for a statement, labelled as 'verb table'."""
+    words = query.split()
+    upper = [w.upper() for w in words]
+    verb = upper[0].lower() if upper else "unknown"
+    table = "unknown"
+    for keyword in ("FROM", "INTO", "UPDATE"):
+        if keyword in upper[:-1]:
+            table = words[upper.index(keyword) + 1].strip("(),;")
+            break
+    return db_query_duration.labels(f"{verb} {table}")
 
 
 class Database:
@@ -14,13 +43,16 @@ class Database:
     def __init__(self, db_path: str = str(DB_PATH)):
         self.db_path = db_path
         self._connection = None
+        self._write_lock = asyncio.Lock()
     
     async def connect(self):
         """Establish database connection."""
         self._connection = await aiosqlite.connect(self.db_path)
         self._connection.row_factory = aiosqlite.Row
         await self._connection.execute("PRAGMA foreign_keys = ON")
-        logger.info(f"Database connected: {self.db_path}")
+        # Readers (backups included) never block the writer, nor it them
+        await self._connection.execute("PRAGMA journal_mode = WAL")
+        logger.info("Database connected: %s", self.db_path)
         return self._connection
     
     async def disconnect(self):
@@ -31,16 +63,21 @@ class Database:
             logger.info("Database disconnected")
     
     async def init_schema(self):
-        """Initialize database schema from SQL file."""
+        """Bring the schema up to date by applying pending migrations."""
+        # Imported here: migrations build on this module
+        from app.db.migrations import Migrator
+        
         if not self._connection:
             await self.connect()
         
-        with open(SCHEMA_PATH, 'r') as f:
-            schema_sql = f.read()
-        
-        await self._connection.executescript(schema_sql)
-        await self._connection.commit()
-        logger.info("Database schema initialized")
+        if await Migrator(self).migrate():
+            logger.info("Database schema migrated")
+        else:
+            logger.info("Database schema up to date")
+    
+    async def optimize(self):
+        """Let SQLite refresh planner statistics for tables that need it."""
+        await self.execute("PRAGMA optimize")
     
     @property
     def connection(self):
@@ -51,23 +88,46 @@ class Database:
         """Execute a query and return cursor."""
         if not self._connection:
             await self.connect()
-        cursor = await self._connection.execute(query, params)
-        await self._connection.commit()
+        async with self._write_lock:
+            with _query_timer(query).time():
+                cursor = await self._connection.execute(query, params)
+                await self._connection.commit()
         return cursor
     
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Run several statements atomically.
+        
+        Yields the raw connection; everything executed on it is committed
+        together, or rolled back on error. Holds the write lock so other
+        writers on the shared connection cannot commit a partial result.
+        """
+        if not self._connection:
+            await self.connect()
+        async with self._write_lock:
+            try:
+                yield self._connection
+                await self._connection.commit()
+            except BaseException:
+                await self._connection.rollback()
+                raise
+    
     async def fetch_one(self, query: str, params: tuple = ()):
         """Fetch single row."""
         if not self._connection:
             await self.connect()
-        cursor = await self._connection.execute(query, params)
-        return await cursor.fetchone()
+        with _query_timer(query).time():
+            cursor = await self._connection.execute(query, params)
+            return await cursor.fetchone()
     
     async def fetch_all(self, query: str, params: tuple = ()):
         """Fetch all rows."""
         if not self._connection:
             await self.connect()
-        cursor = await self._connection.execute(query, params)
-        return await cursor.fetchall()
+        with _query_timer(query).time():
+            cursor = await self._connection.execute(query, params)
+            return await cursor.fetchall()
 
 
 # Global instance
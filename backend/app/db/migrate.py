@@ -0,0 +1,78 @@
+"""
+Schema migration CLI.
+
+    python -m app.db.migrate status     # applied and pending migrations
+    python -m app.db.migrate plan       # what `run` would do
+    python -m app.db.migrate run        # apply schema steps, then backfills
+
+Uses DATABASE_URL and DB_SHARDS like the app, going through each shard in
+turn. The app applies schema steps at start-up
+and runs backfills in the background, so `run` is only needed to migrate
+ahead of a deploy or to finish backfills offline.
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+
+from app.db.migrations import Migrator
+from app.db.shards import shard_router
+
+
+async def status(migrator: Migrator):
+    applied = await migrator.applied()
+    for entry in migrator.migrations:
+        row = applied.get(entry.version)
+        if row is None:
+            state = "pending"
+        elif entry.backfill and row["backfilled_at"] is None:
+            state = f"applied {row['applied_at']}, backfill pending"
+        else:
+            state = f"applied {row['applied_at']}"
+        print(f"{entry.version:04d}  {entry.name:<45} {state}")
+
+
+async def plan(migrator: Migrator):
+    steps = await migrator.plan()
+    if not steps:
+        print("Database is up to date")
+    for entry, step in steps:
+        print(f"{step:<8} {entry.version:04d}  {entry.name}")
+
+
+async def run(migrator: Migrator, batch_size: int, no_backfill: bool):
+    applied = await migrator.migrate()
+    print(f"Applied {applied} migration(s)")
+    if not no_backfill:
+        rows = await migrator.run_backfills(batch_size=batch_size, pause=0)
+        print(f"Backfilled {rows} row(s)")
+
+
+async def main_async(args):
+    for database in shard_router.shards:
+        if shard_router.sharded:
+            print(f"== {Path(database.db_path).name}")
+        await database.connect()
+        migrator = Migrator(database)
+        try:
+            if args.command == "status":
+                await status(migrator)
+            elif args.command == "plan":
+                await plan(migrator)
+            else:
+                await run(migrator, args.batch_size, args.no_backfill)
+        finally:
+            await database.disconnect()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SamuraiVault schema migrations")
+    parser.add_argument("command", choices=("status", "plan", "run"))
+    parser.add_argument("--batch-size", type=int, default=None, help="Rows per backfill transaction")
+    parser.add_argument("--no-backfill", action="store_true", help="Only apply schema steps")
+    args = parser.parse_args(argv)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
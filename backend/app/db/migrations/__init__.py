@@ -0,0 +1,12 @@
+from .base import Migration, MIGRATIONS, migration, add_column, column_exists
+from .runner import Migrator, migrator
+
+__all__ = [
+    "Migration",
+    "MIGRATIONS",
+    "migration",
+    "add_column",
+    "column_exists",
+    "Migrator",
+    "migrator",
+]
@@ -0,0 +1,60 @@
+"""Migration definitions and registry."""
+
+from typing import Awaitable, Callable, List, Optional
+
+import aiosqlite
+
+SchemaStep = Callable[[aiosqlite.Connection], Awaitable[None]]
+BackfillStep = Callable[[aiosqlite.Connection, int], Awaitable[int]]
+
+
+class Migration:
+    """
+    One forward schema change.
+    
+    `up` runs inside a single transaction and should only do fast DDL.
+    Work proportional to table size goes in `backfill`, which is called
+    repeatedly with a batch size, each call in its own short transaction,
+    and returns how many rows it changed (0 once it is done).
+    """
+    
+    def __init__(
+        self,
+        version: int,
+        name: str,
+        up: SchemaStep,
+        backfill: Optional[BackfillStep] = None,
+    ):
+        self.version = version
+        self.name = name
+        self.up = up
+        self.backfill = backfill
+    
+    def __repr__(self):
+        return f"<Migration {self.version:04d} {self.name}>"
+
+
+# Ordered registry, filled by app.db.migrations.versions
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, name: str, backfill: Optional[BackfillStep] = None):
+    """Register the decorated coroutine as the `up` step of a migration."""
+    def decorator(up: SchemaStep) -> Migration:
+        if MIGRATIONS and version <= MIGRATIONS[-1].version:
+            raise ValueError(f"Migration {version} registered out of order")
+        entry = Migration(version, name, up, backfill)
+        MIGRATIONS.append(entry)
+        return entry
+    return decorator
+
+
+async def column_exists(conn: aiosqlite.Connection, table: str, column: str) -> bool:
+    cursor = await conn.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in await cursor.fetchall())
+
+
+async def add_column(conn: aiosqlite.Connection, table: str, column: str, definition: str):
+    """ALTER TABLE ADD COLUMN, skipped if the column is already there."""
+    if not await column_exists(conn, table, column):
+        await conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
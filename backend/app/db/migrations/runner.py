@@ -0,0 +1,176 @@
+"""Applies migrations and runs their online backfills."""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.db.database import Database, db
+from app.utils import get_logger
+from .base import MIGRATIONS, Migration
+from . import versions  # noqa: F401  (registers the migrations)
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+# How long a migration step waits for another process's step to finish
+BUSY_TIMEOUT_MS = 60_000
+
+VERSION_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TEXT NOT NULL,
+    backfilled_at TEXT
+)
+"""
+
+
+class Migrator:
+    """
+    Brings a database up to the latest schema.
+    
+    Applied versions are recorded in ``schema_version``; the latest one
+    is mirrored in ``PRAGMA user_version`` so an up-to-date database is
+    recognised with a single pragma read at start-up. Several processes
+    (uvicorn workers) may migrate at once: each step takes the database
+    write lock up front and skips a version another one has applied.
+    """
+    
+    def __init__(self, database: Database, migrations: List[Migration] = MIGRATIONS):
+        self.db = database
+        self.migrations = migrations
+        self.latest = migrations[-1].version if migrations else 0
+    
+    async def _connection(self):
+        if not self.db.connection:
+            await self.db.connect()
+        return self.db.connection
+    
+    async def is_current(self) -> bool:
+        """Whether every schema step is applied (backfills may still be pending)."""
+        conn = await self._connection()
+        cursor = await conn.execute("PRAGMA user_version")
+        return (await cursor.fetchone())[0] == self.latest
+    
+    async def applied(self) -> Dict[int, Dict[str, Optional[str]]]:
+        """Applied versions with their timestamps."""
+        await self._connection()
+        async with self.db.transaction() as conn:
+            await conn.execute(VERSION_TABLE_SQL)
+        cursor = await conn.execute("SELECT version, name, applied_at, backfilled_at FROM schema_version")
+        return {row["version"]: dict(row) for row in await cursor.fetchall()}
+    
+    async def plan(self) -> List[Tuple[Migration, str]]:
+        """Pending work as (migration, "schema" | "backfill"), in run order."""
+        applied = await self.applied()
+        steps = []
+        for entry in self.migrations:
+            row = applied.get(entry.version)
+            if row is None:
+                steps.append((entry, "schema"))
+            if entry.backfill and (row is None or row["backfilled_at"] is None):
+                steps.append((entry, "backfill"))
+        return steps
+    
+    async def migrate(self) -> int:
+        """Apply pending schema steps in order; returns how many ran."""
+        if await self.is_current():
+            return 0
+        
+        conn = await self._connection()
+        cursor = await conn.execute("PRAGMA busy_timeout")
+        busy_timeout = (await cursor.fetchone())[0]
+        await conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS:d}")
+        try:
+            return await self._migrate()
+        finally:
+            await conn.execute(f"PRAGMA busy_timeout = {busy_timeout:d}")
+    
+    async def _migrate(self) -> int:
+        applied = await self.applied()
+        count = 0
+        for entry in self.migrations:
+            if entry.version in applied:
+                continue
+            start = time.perf_counter()
+            now = datetime.utcnow().isoformat()
+            async with self.db.transaction() as conn:
+                # Write lock first, then look again: another process may
+                # have applied this version while we waited
+                await conn.execute("BEGIN IMMEDIATE")
+                cursor = await conn.execute(
+                    "SELECT 1 FROM schema_version WHERE version = ?", (entry.version,)
+                )
+                if await cursor.fetchone():
+                    continue
+                await entry.up(conn)
+                await conn.execute(
+                    """
+                    INSERT INTO schema_version (version, name, applied_at, backfilled_at)
+                    VALUES (?, ?, ?, ?)
+                    """,
+                    (entry.version, entry.name, now, None if entry.backfill else now)
+                )
+                await conn.execute(f"PRAGMA user_version = {entry.version:d}")
+            count += 1
+            logger.info(
+                "Applied migration %04d %s in %.1f ms",
+                entry.version, entry.name, (time.perf_counter() - start) * 1000,
+            )
+        
+        # Databases from earlier builds may carry an unrelated user_version
+        async with self.db.transaction() as conn:
+            await conn.execute(f"PRAGMA user_version = {self.latest:d}")
+        return count
+    
+    async def pending_backfills(self) -> List[Migration]:
+        return [entry for entry, step in await self.plan() if step == "backfill"]
+    
+    async def backfill(
+        self,
+        entry: Migration,
+        batch_size: Optional[int] = None,
+        pause: Optional[float] = None,
+    ) -> int:
+        """
+        Run one migration's backfill to completion, online.
+        
+        Each batch is its own short transaction holding the write lock, and
+        the loop sleeps between batches, so requests keep being served.
+        Progress is safe to interrupt: a restart simply continues.
+        """
+        batch_size = batch_size or settings.MIGRATION_BATCH_SIZE
+        pause = settings.MIGRATION_BATCH_PAUSE_MS / 1000 if pause is None else pause
+        total = 0
+        while True:
+            try:
+                async with self.db.transaction() as conn:
+                    await conn.execute("BEGIN IMMEDIATE")
+                    changed = await entry.backfill(conn, batch_size)
+            except Exception:
+                logger.exception("Backfill of migration %04d failed after %d rows", entry.version, total)
+                raise
+            total += changed
+            if changed == 0:
+                break
+            await asyncio.sleep(pause)
+        
+        await self.db.execute(
+            "UPDATE schema_version SET backfilled_at = ? WHERE version = ?",
+            (datetime.utcnow().isoformat(), entry.version)
+        )
+        logger.info("Backfilled migration %04d %s (%d rows)", entry.version, entry.name, total)
+        return total
+    
+    async def run_backfills(self, batch_size: Optional[int] = None, pause: Optional[float] = None) -> int:
+        """Run all pending backfills in order; returns rows changed."""
+        total = 0
+        for entry in await self.pending_backfills():
+            total += await self.backfill(entry, batch_size, pause)
+        return total
+
+
+# Global instance
+migrator = Migrator(db)
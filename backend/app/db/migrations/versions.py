@@ -0,0 +1,195 @@
+"""
+Schema migrations, in order.
+
+Append new migrations at the end with the next version number; never edit
+or renumber one that has shipped. Steps must tolerate databases created by
+earlier builds that already have some of the change (use add_column,
+CREATE ... IF NOT EXISTS).
+"""
+
+from pathlib import Path
+
+import aiosqlite
+from argon2 import extract_parameters
+from argon2.exceptions import InvalidHashError
+
+from .base import migration, add_column
+
+SCHEMA_PATH = Path(__file__).parent.parent / "schema.sql"
+
+
+@migration(1, "baseline schema")
+async def baseline(conn: aiosqlite.Connection):
+    # Statement by statement: executescript would commit mid-migration
+    for statement in SCHEMA_PATH.read_text().split(";"):
+        if statement.strip():
+            await conn.execute(statement)
+
+
+@migration(2, "users: key scheme and wrapped data key")
+async def key_scheme(conn: aiosqlite.Connection):
+    await add_column(conn, "users", "key_version", "INTEGER NOT NULL DEFAULT 1")
+    await add_column(conn, "users", "data_key_wrapped", "TEXT")
+
+
+async def _pin_kdf_params(conn: aiosqlite.Connection, batch_size: int) -> int:
+    # Legacy keys were derived with the parameters their password hash
+    # records (one ARGON2_* setting fed both); shard directory rows have
+    # no hash and need none
+    cursor = await conn.execute(
+        """
+        SELECT id, password_hash FROM users
+        WHERE key_version = 1 AND kdf_time_cost IS NULL AND password_hash LIKE '$argon2%'
+        LIMIT ?
+        """,
+        (batch_size,)
+    )
+    rows = await cursor.fetchall()
+    for user_id, password_hash in rows:
+        try:
+            params = extract_parameters(password_hash)
+        except InvalidHashError:
+            raise ValueError(f"User {user_id} has an unreadable password hash") from None
+        await conn.execute(
+            "UPDATE users SET kdf_time_cost = ?, kdf_memory_cost = ?, kdf_parallelism = ? WHERE id = ?",
+            (params.time_cost, params.memory_cost, params.parallelism, user_id)
+        )
+    return len(rows)
+
+
+@migration(3, "users: per-user Argon2 parameters", backfill=_pin_kdf_params)
+async def kdf_params(conn: aiosqlite.Connection):
+    # No defaults: the ARGON2_* settings of today say nothing about
+    # existing keys, which the backfill pins from their password hashes
+    await add_column(conn, "users", "kdf_time_cost", "INTEGER")
+    await add_column(conn, "users", "kdf_memory_cost", "INTEGER")
+    await add_column(conn, "users", "kdf_parallelism", "INTEGER")
+
+
+@migration(4, "audit_log: composite indexes for event queries")
+async def audit_query_indexes(conn: aiosqlite.Connection):
+    # Keyset pagination orders by (timestamp, id) within a user or action;
+    # (user_id, timestamp, id) also serves everything idx_audit_user did
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_audit_user_time ON audit_log(user_id, timestamp, id)"
+    )
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_audit_action_time ON audit_log(action, timestamp, id)"
+    )
+    await conn.execute("DROP INDEX IF EXISTS idx_audit_user")
+
+
+@migration(5, "sessions: revocation")
+async def session_revocation(conn: aiosqlite.Connection):
+    # Workers poll for revocations newer than the last one they saw
+    await add_column(conn, "sessions", "revoked_at", "TEXT")
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sessions_revoked ON sessions(revoked_at) "
+        "WHERE revoked_at IS NOT NULL"
+    )
+
+
+@migration(6, "sessions: refresh token rotation")
+async def refresh_rotation(conn: aiosqlite.Connection):
+    # token_hash now holds the current refresh token; the generation
+    # tells a replayed older token apart from a forged one
+    await add_column(conn, "sessions", "refresh_generation", "INTEGER NOT NULL DEFAULT 0")
+
+
+@migration(7, "scheduler: leases and job run history")
+async def scheduler_tables(conn: aiosqlite.Connection):
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS scheduler_leases (
+            name TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at TEXT NOT NULL
+        )
+        """
+    )
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS job_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job TEXT NOT NULL,
+            worker TEXT NOT NULL,
+            started_at TEXT NOT NULL,
+            finished_at TEXT NOT NULL,
+            status TEXT NOT NULL,
+            error TEXT
+        )
+        """
+    )
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_job_runs_job ON job_runs(job, started_at)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_job_runs_started ON job_runs(started_at)")
+
+
+@migration(8, "vault_entries: password fingerprints")
+async def password_fingerprints(conn: aiosqlite.Connection):
+    # No backfill: fingerprints are keyed per user, so existing rows are
+    # filled in by VaultService the next time their owner's key is at hand
+    await add_column(conn, "vault_entries", "password_fingerprint", "TEXT")
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_vault_fingerprint ON vault_entries(user_id, password_fingerprint)"
+    )
+
+
+@migration(9, "search_indexes: encrypted per-user search index")
+async def search_indexes(conn: aiosqlite.Connection):
+    # deleted_ids holds entries removed since the blob was last written:
+    # deletes do not have the key needed to rewrite it
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS search_indexes (
+            user_id TEXT PRIMARY KEY,
+            encrypted_index TEXT NOT NULL,
+            deleted_ids TEXT NOT NULL DEFAULT '[]',
+            version INTEGER NOT NULL DEFAULT 1,
+            updated_at TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+        """
+    )
+
+
+@migration(10, "users: vault version")
+async def vault_version(conn: aiosqlite.Connection):
+    # Bumped after every vault entry write; caches of decrypted entries
+    # compare it to tell whether another worker changed the vault
+    await add_column(conn, "users", "vault_version", "INTEGER NOT NULL DEFAULT 0")
+
+
+@migration(11, "vault_events: change notification log")
+async def vault_events(conn: aiosqlite.Connection):
+    # AUTOINCREMENT: ids are SSE event ids and must never be reused
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS vault_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            worker TEXT NOT NULL,
+            type TEXT NOT NULL,
+            entry_id TEXT,
+            vault_version INTEGER NOT NULL,
+            created_at TEXT NOT NULL
+        )
+        """
+    )
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_vault_events_user ON vault_events(user_id, id)")
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_vault_events_created ON vault_events(created_at)")
+
+
+@migration(12, "users: shard placement")
+async def user_shards(conn: aiosqlite.Connection):
+    # In the main database every user has a row, which doubles as the
+    # email/username directory; users stored in another shard (DB_SHARDS)
+    # have a row without credentials here and their full row there
+    await add_column(conn, "users", "shard_id", "INTEGER NOT NULL DEFAULT 0")
+
+
+@migration(13, "sessions: rotation time")
+async def session_rotation_time(conn: aiosqlite.Connection):
+    # Lets the previous refresh token be presented once more shortly after
+    # a rotation (another tab refreshing at the same time) without counting
+    # as reuse
+    await add_column(conn, "sessions", "rotated_at", "TEXT")
@@ -21,6 +21,12 @@ class UserLogin(BaseModel):
     mfa_code: Optional[str] = None
 
 
+class ChangePasswordRequest(BaseModel):
+    """Master password change request."""
+    current_password: str
+    new_password: str = Field(..., min_length=12, max_length=128)
+
+
 class UserResponse(BaseModel):
     """User response (no sensitive data)."""
     id: str
@@ -33,11 +39,17 @@ class UserResponse(BaseModel):
 class TokenResponse(BaseModel):
     """Authentication token response."""
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str = "bearer"
     expires_in: int
     user: UserResponse
 
 
+class RefreshRequest(BaseModel):
+    """Refresh token exchange request."""
+    refresh_token: str = Field(..., max_length=256)
+
+
 # ============== Vault Models ==============
 
 class VaultEntryCreate(BaseModel):
@@ -81,12 +93,21 @@ class VaultEntryDetail(VaultEntryResponse):
     notes: Optional[str]
 
 
+class VaultSearchResult(BaseModel):
+    """Vault search hit."""
+    id: str
+    title: str
+    username: Optional[str]
+    url: Optional[str]
+
+
 # ============== MFA Models ==============
 
 class MFASetupResponse(BaseModel):
     """MFA setup response."""
     secret: str  # Only shown during setup
     qr_code: str  # Base64 QR code image
+    qr_format: str = "png"  # png or svg
     provisioning_uri: str
 
 
@@ -114,7 +135,42 @@ class AnalyticsDashboard(BaseModel):
     total_passwords: int
     weak_passwords: int
     reused_passwords: int
+    similar_passwords: int = 0
     old_passwords: int
     breached_passwords: int
     average_strength: float
     category_breakdown: dict
+
+
+class SimilarPasswordEntry(BaseModel):
+    """Entry in a group of reused or near-duplicate passwords."""
+    id: str
+    title: str
+
+
+class SimilarPasswordGroup(BaseModel):
+    """Entries whose passwords are near-identical (e.g. Summer2023! / Summer2024!)."""
+    entries: List[SimilarPasswordEntry]
+
+
+class ReusedPasswordGroup(BaseModel):
+    """Entries that share the same password."""
+    entries: List[SimilarPasswordEntry]
+
+
+# ============== Audit Models ==============
+
+class AuditEvent(BaseModel):
+    """Audit log event."""
+    id: str
+    user_id: Optional[str]
+    action: str
+    details: Optional[str]
+    ip_address: Optional[str]
+    timestamp: str
+
+
+class AuditPage(BaseModel):
+    """One page of audit events, newest first."""
+    events: List[AuditEvent]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,162 @@
+"""
+Shard rebalancing CLI.
+
+    python -m app.db.rebalance plan     # users not on the shard DB_SHARDS gives them
+    python -m app.db.rebalance run      # move them
+
+Run it with the app stopped after changing DB_SHARDS: workers cache where
+each user lives. A user is copied to the new shard in one transaction,
+then pointed there in the directory, then removed from the old shard, and
+`run` starts by clearing what an interrupted run left behind, so it is
+safe to run again. Shard files past DB_SHARDS are empty afterwards.
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from app.config import get_settings
+from app.db.database import Database, db
+from app.db.shards import ShardRouter, placement
+
+settings = get_settings()
+
+# Per-user tables copied along with the user's row, children first when deleting
+USER_TABLES = ("audit_log", "search_indexes", "vault_entries")
+
+# The main database's row of a user stored elsewhere keeps no credentials
+CLEAR_CREDENTIALS_SQL = """
+UPDATE users
+SET password_hash = '', salt = '', data_key_wrapped = NULL, mfa_secret_encrypted = NULL
+WHERE id = ?
+"""
+
+
+async def open_router() -> ShardRouter:
+    """Router over the configured shards plus any still holding users."""
+    await db.init_schema()
+    row = await db.fetch_one("SELECT COALESCE(MAX(shard_id), 0) AS last FROM users")
+    router = ShardRouter(max(settings.DB_SHARDS, row["last"] + 1))
+    for shard in router.shards[1:]:
+        await shard.init_schema()
+    return router
+
+
+async def moves() -> List[Tuple[str, int, int]]:
+    """(user_id, from, to) for every user on the wrong shard."""
+    rows = await db.fetch_all("SELECT id, shard_id FROM users")
+    count = max(settings.DB_SHARDS, 1)
+    return [
+        (row["id"], row["shard_id"], placement(row["id"], count))
+        for row in rows
+        if row["shard_id"] != placement(row["id"], count)
+    ]
+
+
+async def _delete_user_data(conn, user_id: str):
+    for table in USER_TABLES:
+        await conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+
+
+async def _insert(conn, table: str, rows: List[Dict]):
+    if rows:
+        columns = list(rows[0])
+        await conn.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [tuple(row[column] for column in columns) for row in rows],
+        )
+
+
+async def move(router: ShardRouter, user_id: str, source: int, target: int):
+    src, dst = router.shards[source], router.shards[target]
+    user = dict(await src.fetch_one("SELECT * FROM users WHERE id = ?", (user_id,)))
+    user["shard_id"] = target
+    data = {
+        table: [dict(row) for row in await src.fetch_all(f"SELECT * FROM {table} WHERE user_id = ?", (user_id,))]
+        for table in USER_TABLES
+    }
+    
+    async with dst.transaction() as conn:
+        await _delete_user_data(conn, user_id)  # left by an interrupted run
+        if target == 0:
+            # The directory row becomes the full row
+            columns = [column for column in user if column != "id"]
+            await conn.execute(
+                f"UPDATE users SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ?",
+                (*(user[column] for column in columns), user_id)
+            )
+        else:
+            await conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+            await _insert(conn, "users", [user])
+        for table in reversed(USER_TABLES):
+            await _insert(conn, table, data[table])
+    
+    if target != 0:
+        await db.execute("UPDATE users SET shard_id = ? WHERE id = ?", (target, user_id))
+    await remove_from(src, [user_id], main=source == 0)
+
+
+async def remove_from(database: Database, user_ids: List[str], main: bool):
+    """Drop users' data from a shard they have moved away from."""
+    async with database.transaction() as conn:
+        for user_id in user_ids:
+            await _delete_user_data(conn, user_id)
+            if main:
+                # Sessions reference the directory row, so it stays
+                await conn.execute(CLEAR_CREDENTIALS_SQL, (user_id,))
+            else:
+                await conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+
+
+async def clean_up(router: ShardRouter) -> int:
+    """Remove copies left on a user's previous shard; returns how many."""
+    directory = {row["id"]: row["shard_id"] for row in await db.fetch_all("SELECT id, shard_id FROM users")}
+    removed = 0
+    for index, shard in enumerate(router.shards):
+        if index == 0:
+            rows = await db.fetch_all("SELECT id FROM users WHERE shard_id != 0 AND password_hash != ''")
+        else:
+            rows = await shard.fetch_all("SELECT id FROM users")
+        stale = [row["id"] for row in rows if directory.get(row["id"]) != index]
+        if stale:
+            await remove_from(shard, stale, main=index == 0)
+            removed += len(stale)
+    return removed
+
+
+async def main_async(args):
+    router = await open_router()
+    try:
+        pending = await moves()
+        if args.command == "plan":
+            for user_id, source, target in pending:
+                print(f"{user_id}  shard {source} -> {target}")
+            print(f"{len(pending)} user(s) to move across {len(router.shards)} shard(s)")
+            return
+        
+        leftovers = await clean_up(router)
+        if leftovers:
+            print(f"Removed {leftovers} copy(ies) left by an interrupted run")
+        for done, (user_id, source, target) in enumerate(pending, 1):
+            await move(router, user_id, source, target)
+            if done % 100 == 0:
+                print(f"Moved {done}/{len(pending)} users")
+        print(f"Moved {len(pending)} user(s)")
+        for shard in router.shards[max(settings.DB_SHARDS, 1):]:
+            print(f"{Path(shard.db_path).name} is no longer used and can be deleted")
+    finally:
+        for shard in router.shards[1:]:
+            await shard.disconnect()
+        await db.disconnect()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SamuraiVault shard rebalancing")
+    parser.add_argument("command", choices=("plan", "run"))
+    args = parser.parse_args(argv)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,21 @@
 """Database repository for CRUD operations."""
 
+import heapq
+import itertools
 import uuid
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Callable
 from .database import db
+from .shards import shard_router
+
+# (entries, mfa_secret_encrypted) -> ((entry_id, encrypted_data) pairs, mfa_secret_encrypted)
+Reencrypt = Callable[[List[Dict[str, Any]], Optional[str]], Tuple[List[Tuple[str, str]], Optional[str]]]
+
+
+def _merge(shards: List[list], limit: int, newest_first: bool = False) -> List[Dict[str, Any]]:
+    """Merge per-shard audit rows sorted by (timestamp, id) and keep `limit`."""
+    rows = heapq.merge(*shards, key=lambda row: (row["timestamp"], row["id"]), reverse=newest_first)
+    return [dict(row) for row in itertools.islice(rows, limit)]
 
 
 class UserRepository:
@@ -15,24 +27,63 @@ class UserRepository:
         username: str,
         password_hash: str,
         salt: str,
+        key_version: int = 1,
+        data_key_wrapped: Optional[str] = None,
+        kdf_params: Optional[Tuple[int, int, int]] = None,
     ) -> Dict[str, Any]:
-        """Create a new user."""
+        """
+        Create a new user.
+        
+        Users placed in another shard also get a directory row in the main
+        database, inserted first so it enforces unique emails and usernames.
+        """
         user_id = str(uuid.uuid4())
         now = datetime.utcnow().isoformat()
+        shard = shard_router.place(user_id)
         
-        await db.execute(
+        query = """
+            INSERT INTO users (
+                id, email, username, password_hash, salt, key_version, data_key_wrapped,
+                kdf_time_cost, kdf_memory_cost, kdf_parallelism, shard_id, created_at, updated_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """
-            INSERT INTO users (id, email, username, password_hash, salt, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (user_id, email, username, password_hash, salt, now, now)
+        params = (
+            user_id, email, username, password_hash, salt, key_version, data_key_wrapped,
+            *(kdf_params or (None, None, None)), shard, now, now,
         )
+        if shard == 0:
+            await db.execute(query, params)
+        else:
+            await db.execute(
+                """
+                INSERT INTO users (id, email, username, password_hash, salt, shard_id, created_at, updated_at)
+                VALUES (?, ?, ?, '', '', ?, ?, ?)
+                """,
+                (user_id, email, username, shard, now, now)
+            )
+            try:
+                await shard_router.shards[shard].execute(query, params)
+            except Exception:
+                await db.execute("DELETE FROM users WHERE id = ?", (user_id,))
+                raise
+        shard_router.remember(user_id, shard)
         
         return await self.get_by_id(user_id)
     
+    async def _from_directory(self, row) -> Optional[Dict[str, Any]]:
+        """The full user row for a row of the main database's directory."""
+        if row is None:
+            return None
+        if row["shard_id"] == 0:
+            return dict(row)
+        shard_router.remember(row["id"], row["shard_id"])
+        return await self.get_by_id(row["id"])
+    
     async def get_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user by ID."""
-        row = await db.fetch_one(
+        database = await shard_router.for_user(user_id)
+        row = await database.fetch_one(
             "SELECT * FROM users WHERE id = ?",
             (user_id,)
         )
@@ -44,7 +95,7 @@ class UserRepository:
             "SELECT * FROM users WHERE email = ?",
             (email,)
         )
-        return dict(row) if row else None
+        return await self._from_directory(row)
     
     async def get_by_username(self, username: str) -> Optional[Dict[str, Any]]:
         """Get user by username."""
@@ -52,20 +103,22 @@ class UserRepository:
             "SELECT * FROM users WHERE username = ?",
             (username,)
         )
-        return dict(row) if row else None
+        return await self._from_directory(row)
     
     async def update_last_login(self, user_id: str):
         """Update last login timestamp."""
+        database = await shard_router.for_user(user_id)
         now = datetime.utcnow().isoformat()
-        await db.execute(
+        await database.execute(
             "UPDATE users SET last_login = ?, updated_at = ? WHERE id = ?",
             (now, now, user_id)
         )
     
     async def enable_mfa(self, user_id: str, encrypted_secret: str):
         """Enable MFA for user."""
+        database = await shard_router.for_user(user_id)
         now = datetime.utcnow().isoformat()
-        await db.execute(
+        await database.execute(
             """
             UPDATE users 
             SET mfa_enabled = 1, mfa_secret_encrypted = ?, updated_at = ? 
@@ -74,10 +127,96 @@ class UserRepository:
             (encrypted_secret, now, user_id)
         )
     
+    async def upgrade_credentials(
+        self,
+        user_id: str,
+        from_version: int,
+        password_hash: str,
+        key_version: int,
+        data_key_wrapped: Optional[str],
+        reencrypt: Optional[Reencrypt] = None,
+    ) -> bool:
+        """
+        Switch a user from `from_version` to a new key scheme in one transaction.
+        
+        Does nothing and returns False if the user is no longer on
+        `from_version` (a concurrent login upgraded first). `reencrypt` is
+        called inside the transaction with the user's entries and MFA
+        secret and returns (entry_id, encrypted_data) pairs and the secret
+        encrypted under the new key; if it raises, nothing is written.
+        Re-encrypted entries lose their password fingerprints, which were
+        keyed by the old key and are recomputed later.
+        """
+        database = await shard_router.for_user(user_id)
+        now = datetime.utcnow().isoformat()
+        async with database.transaction() as conn:
+            cursor = await conn.execute(
+                """
+                UPDATE users
+                SET password_hash = ?, key_version = ?, data_key_wrapped = ?, updated_at = ?
+                WHERE id = ? AND key_version = ?
+                """,
+                (password_hash, key_version, data_key_wrapped, now, user_id, from_version)
+            )
+            if cursor.rowcount == 0:
+                return False
+            if reencrypt is None:
+                return True
+            
+            cursor = await conn.execute(
+                "SELECT id, encrypted_data FROM vault_entries WHERE user_id = ?", (user_id,)
+            )
+            entries = [dict(row) for row in await cursor.fetchall()]
+            cursor = await conn.execute("SELECT mfa_secret_encrypted FROM users WHERE id = ?", (user_id,))
+            row = await cursor.fetchone()
+            reencrypted, mfa_secret_encrypted = reencrypt(entries, row["mfa_secret_encrypted"])
+            await conn.executemany(
+                """
+                UPDATE vault_entries SET encrypted_data = ?, password_fingerprint = NULL
+                WHERE id = ? AND user_id = ?
+                """,
+                [(data, entry_id, user_id) for entry_id, data in reencrypted],
+            )
+            await conn.execute(
+                "UPDATE users SET mfa_secret_encrypted = ? WHERE id = ?",
+                (mfa_secret_encrypted, user_id)
+            )
+        return True
+    
+    async def update_master_password(
+        self,
+        user_id: str,
+        password_hash: str,
+        salt: str,
+        data_key_wrapped: str,
+        kdf_params: Tuple[int, int, int],
+        old_salt: str,
+    ) -> bool:
+        """
+        Store a newly derived master key (password change or rehash).
+        
+        Only applies while the user still has `old_salt`, i.e. no other
+        request stored a master key since the caller read the user; returns
+        whether it did.
+        """
+        database = await shard_router.for_user(user_id)
+        now = datetime.utcnow().isoformat()
+        cursor = await database.execute(
+            """
+            UPDATE users
+            SET password_hash = ?, salt = ?, data_key_wrapped = ?,
+                kdf_time_cost = ?, kdf_memory_cost = ?, kdf_parallelism = ?, updated_at = ?
+            WHERE id = ? AND salt = ?
+            """,
+            (password_hash, salt, data_key_wrapped, *kdf_params, now, user_id, old_salt)
+        )
+        return cursor.rowcount > 0
+    
     async def disable_mfa(self, user_id: str):
         """Disable MFA for user."""
+        database = await shard_router.for_user(user_id)
         now = datetime.utcnow().isoformat()
-        await db.execute(
+        await database.execute(
             """
             UPDATE users 
             SET mfa_enabled = 0, mfa_secret_encrypted = NULL, updated_at = ? 
@@ -96,24 +235,28 @@ class VaultRepository:
         encrypted_data: str,
         category: Optional[str] = None,
         favorite: bool = False,
+        password_fingerprint: Optional[str] = None,
     ) -> Dict[str, Any]:
         """Create a new vault entry."""
         entry_id = str(uuid.uuid4())
         now = datetime.utcnow().isoformat()
         
-        await db.execute(
+        database = await shard_router.for_user(user_id)
+        await database.execute(
             """
-            INSERT INTO vault_entries (id, user_id, encrypted_data, category, favorite, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO vault_entries
+                (id, user_id, encrypted_data, category, favorite, password_fingerprint, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            (entry_id, user_id, encrypted_data, category, int(favorite), now, now)
+            (entry_id, user_id, encrypted_data, category, int(favorite), password_fingerprint, now, now)
         )
         
-        return await self.get_by_id(entry_id)
+        return await self.get_by_id(entry_id, user_id)
     
-    async def get_by_id(self, entry_id: str) -> Optional[Dict[str, Any]]:
-        """Get entry by ID."""
-        row = await db.fetch_one(
+    async def get_by_id(self, entry_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get entry by ID (looked up in the owner's shard)."""
+        database = await shard_router.for_user(user_id)
+        row = await database.fetch_one(
             "SELECT * FROM vault_entries WHERE id = ?",
             (entry_id,)
         )
@@ -121,7 +264,8 @@ class VaultRepository:
     
     async def get_by_user(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all entries for a user."""
-        rows = await db.fetch_all(
+        database = await shard_router.for_user(user_id)
+        rows = await database.fetch_all(
             "SELECT * FROM vault_entries WHERE user_id = ? ORDER BY created_at DESC",
             (user_id,)
         )
@@ -130,11 +274,14 @@ class VaultRepository:
     async def update(
         self,
         entry_id: str,
+        user_id: str,
         encrypted_data: Optional[str] = None,
         category: Optional[str] = None,
         favorite: Optional[bool] = None,
+        password_fingerprint: Optional[str] = None,
     ) -> Optional[Dict[str, Any]]:
         """Update a vault entry."""
+        database = await shard_router.for_user(user_id)
         now = datetime.utcnow().isoformat()
         
         updates = ["updated_at = ?"]
@@ -149,19 +296,23 @@ class VaultRepository:
         if favorite is not None:
             updates.append("favorite = ?")
             params.append(int(favorite))
+        if password_fingerprint is not None:
+            updates.append("password_fingerprint = ?")
+            params.append(password_fingerprint)
         
         params.append(entry_id)
         
-        await db.execute(
+        await database.execute(
             f"UPDATE vault_entries SET {', '.join(updates)} WHERE id = ?",
             tuple(params)
         )
         
-        return await self.get_by_id(entry_id)
+        return await self.get_by_id(entry_id, user_id)
     
-    async def delete(self, entry_id: str) -> bool:
+    async def delete(self, entry_id: str, user_id: str) -> bool:
         """Delete a vault entry."""
-        cursor = await db.execute(
+        database = await shard_router.for_user(user_id)
+        cursor = await database.execute(
             "DELETE FROM vault_entries WHERE id = ?",
             (entry_id,)
         )
@@ -169,11 +320,95 @@ class VaultRepository:
     
     async def count_by_user(self, user_id: str) -> int:
         """Count entries for a user."""
-        row = await db.fetch_one(
+        database = await shard_router.for_user(user_id)
+        row = await database.fetch_one(
             "SELECT COUNT(*) as count FROM vault_entries WHERE user_id = ?",
             (user_id,)
         )
         return row['count'] if row else 0
+    
+    async def get_version(self, user_id: str) -> int:
+        """Counter bumped after every write to a user's entries."""
+        database = await shard_router.for_user(user_id)
+        row = await database.fetch_one(
+            "SELECT vault_version FROM users WHERE id = ?",
+            (user_id,)
+        )
+        return row['vault_version'] if row else 0
+    
+    async def bump_version(self, user_id: str) -> int:
+        """Record a write to a user's entries; returns the new version."""
+        database = await shard_router.for_user(user_id)
+        async with database.transaction() as conn:
+            cursor = await conn.execute(
+                "UPDATE users SET vault_version = vault_version + 1 WHERE id = ? RETURNING vault_version",
+                (user_id,)
+            )
+            row = await cursor.fetchone()
+        return row['vault_version'] if row else 0
+    
+    async def get_missing_fingerprints(self, user_id: str) -> List[Dict[str, Any]]:
+        """Entries of a user written before password fingerprints existed."""
+        database = await shard_router.for_user(user_id)
+        rows = await database.fetch_all(
+            """
+            SELECT id, encrypted_data FROM vault_entries
+            WHERE user_id = ? AND password_fingerprint IS NULL
+            """,
+            (user_id,)
+        )
+        return [dict(row) for row in rows]
+    
+    async def set_fingerprints(self, user_id: str, fingerprints: List[Tuple[str, str]]) -> int:
+        """
+        Store (entry_id, password_fingerprint) pairs for entries that still
+        have none; an entry updated since it was read keeps its fresh
+        fingerprint. Returns how many were stored.
+        """
+        database = await shard_router.for_user(user_id)
+        async with database.transaction() as conn:
+            cursor = await conn.executemany(
+                """
+                UPDATE vault_entries SET password_fingerprint = ?
+                WHERE id = ? AND user_id = ? AND password_fingerprint IS NULL
+                """,
+                [(fingerprint, entry_id, user_id) for entry_id, fingerprint in fingerprints],
+            )
+        return cursor.rowcount
+    
+    async def count_reused(self, user_id: str) -> int:
+        """Count entries sharing their password with another entry."""
+        database = await shard_router.for_user(user_id)
+        row = await database.fetch_one(
+            """
+            SELECT COALESCE(SUM(n), 0) AS count FROM (
+                SELECT COUNT(*) AS n FROM vault_entries
+                WHERE user_id = ? AND password_fingerprint > ''
+                GROUP BY password_fingerprint
+                HAVING COUNT(*) > 1
+            )
+            """,
+            (user_id,)
+        )
+        return row['count'] if row else 0
+    
+    async def get_reused(self, user_id: str) -> List[Dict[str, Any]]:
+        """Entries sharing their password with another entry, by fingerprint."""
+        database = await shard_router.for_user(user_id)
+        rows = await database.fetch_all(
+            """
+            SELECT id, password_fingerprint, encrypted_data FROM vault_entries
+            WHERE user_id = ? AND password_fingerprint IN (
+                SELECT password_fingerprint FROM vault_entries
+                WHERE user_id = ? AND password_fingerprint > ''
+                GROUP BY password_fingerprint
+                HAVING COUNT(*) > 1
+            )
+            ORDER BY password_fingerprint, created_at
+            """,
+            (user_id, user_id)
+        )
+        return [dict(row) for row in rows]
 
 
 class AuditRepository:
@@ -186,20 +421,398 @@ class AuditRepository:
         details: Optional[str] = None,
         ip_address: Optional[str] = None,
     ):
-        """Create audit log entry."""
+        """Create audit log entry (in the user's shard)."""
         log_id = str(uuid.uuid4())
         now = datetime.utcnow().isoformat()
         
-        await db.execute(
+        database = await shard_router.for_user(user_id)
+        await database.execute(
             """
             INSERT INTO audit_log (id, user_id, action, details, ip_address, timestamp)
             VALUES (?, ?, ?, ?, ?, ?)
             """,
             (log_id, user_id, action, details, ip_address, now)
         )
+    
+    async def query(
+        self,
+        user_id: Optional[str] = None,
+        action: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        before: Optional[Tuple[str, str]] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Filtered events, newest first.
+        
+        Pages by keyset: pass the (timestamp, id) of the last row seen as
+        `before`. Served by idx_audit_user_time / idx_audit_action_time.
+        Without `user_id` every shard is queried and the results merged.
+        """
+        clauses = []
+        params: List[Any] = []
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if action is not None:
+            clauses.append("action = ?")
+            params.append(action)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        if ip_address is not None:
+            clauses.append("ip_address = ?")
+            params.append(ip_address)
+        if before is not None:
+            clauses.append("(timestamp, id) < (?, ?)")
+            params.extend(before)
+        where = " AND ".join(clauses) or "1"
+        query = f"""
+            SELECT id, user_id, action, details, ip_address, timestamp
+            FROM audit_log
+            WHERE {where}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+            """
+        
+        if user_id is not None:
+            database = await shard_router.for_user(user_id)
+            return [dict(row) for row in await database.fetch_all(query, (*params, limit))]
+        shards = await shard_router.each(lambda database: database.fetch_all(query, (*params, limit)))
+        return _merge(shards, limit, newest_first=True)
+    
+    async def get_older_than(self, cutoff: str, limit: int) -> List[Dict[str, Any]]:
+        """Oldest rows before `cutoff` across shards, in (timestamp, id) order."""
+        shards = await shard_router.each(lambda database: database.fetch_all(
+            """
+            SELECT id, user_id, action, details, ip_address, timestamp
+            FROM audit_log
+            WHERE timestamp < ?
+            ORDER BY timestamp, id
+            LIMIT ?
+            """,
+            (cutoff, limit)
+        ))
+        return _merge(shards, limit)
+    
+    async def delete_through(self, cutoff: str, last: Tuple[str, str]) -> int:
+        """Delete rows before `cutoff` up to and including the (timestamp, id) key `last`."""
+        cursors = await shard_router.each(lambda database: database.execute(
+            "DELETE FROM audit_log WHERE timestamp < ? AND (timestamp, id) <= (?, ?)",
+            (cutoff, last[0], last[1])
+        ))
+        return sum(cursor.rowcount for cursor in cursors)
+
+
+class SessionRepository:
+    """Session database operations."""
+    
+    async def create(
+        self,
+        session_id: str,
+        user_id: str,
+        token_hash: str,
+        expires_at: str,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+    ):
+        """Record an issued token."""
+        now = datetime.utcnow().isoformat()
+        
+        await db.execute(
+            """
+            INSERT INTO sessions (id, user_id, token_hash, expires_at, created_at, ip_address, user_agent)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (session_id, user_id, token_hash, expires_at, now, ip_address, user_agent)
+        )
+    
+    async def get_by_id(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get session by ID."""
+        row = await db.fetch_one(
+            "SELECT * FROM sessions WHERE id = ?",
+            (session_id,)
+        )
+        return dict(row) if row else None
+    
+    async def rotate(self, session_id: str, generation: int, token_hash: str, new_token_hash: str) -> bool:
+        """
+        Replace the refresh token of generation `generation` with the next one.
+        
+        Compare-and-swap: False if the session moved on, was revoked or expired.
+        """
+        now = datetime.utcnow().isoformat()
+        cursor = await db.execute(
+            """
+            UPDATE sessions
+            SET token_hash = ?, refresh_generation = refresh_generation + 1, rotated_at = ?
+            WHERE id = ? AND refresh_generation = ? AND token_hash = ?
+              AND revoked_at IS NULL AND expires_at > ?
+            """,
+            (new_token_hash, now, session_id, generation, token_hash, now)
+        )
+        return cursor.rowcount == 1
+    
+    async def get_active_for_user(self, user_id: str) -> List[Dict[str, Any]]:
+        """Unrevoked, unexpired sessions of a user."""
+        rows = await db.fetch_all(
+            """
+            SELECT id, expires_at, created_at, ip_address, user_agent
+            FROM sessions
+            WHERE user_id = ? AND revoked_at IS NULL AND expires_at > ?
+            """,
+            (user_id, datetime.utcnow().isoformat())
+        )
+        return [dict(row) for row in rows]
+    
+    async def revoke(self, session_ids: List[str], revoked_at: str) -> int:
+        """Mark sessions revoked (already revoked ones keep their time)."""
+        if not session_ids:
+            return 0
+        placeholders = ", ".join("?" * len(session_ids))
+        cursor = await db.execute(
+            f"UPDATE sessions SET revoked_at = ? WHERE revoked_at IS NULL AND id IN ({placeholders})",
+            (revoked_at, *session_ids)
+        )
+        return cursor.rowcount
+    
+    async def get_revoked_since(self, since: str) -> List[Dict[str, Any]]:
+        """Sessions revoked after `since`."""
+        rows = await db.fetch_all(
+            "SELECT id, revoked_at FROM sessions WHERE revoked_at > ?",
+            (since,)
+        )
+        return [dict(row) for row in rows]
+    
+    async def delete_expired(self, now: str) -> int:
+        """Delete sessions whose refresh token has expired."""
+        cursor = await db.execute(
+            "DELETE FROM sessions WHERE expires_at <= ?",
+            (now,)
+        )
+        return cursor.rowcount
+
+
+class JobRepository:
+    """Scheduler lease and job run history operations."""
+    
+    async def acquire_lease(self, name: str, owner: str, expires_at: str) -> bool:
+        """Take or renew lease `name` if it is free, expired or already ours."""
+        now = datetime.utcnow().isoformat()
+        cursor = await db.execute(
+            """
+            INSERT INTO scheduler_leases (name, owner, expires_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE
+            SET owner = excluded.owner, expires_at = excluded.expires_at
+            WHERE scheduler_leases.owner = excluded.owner OR scheduler_leases.expires_at <= ?
+            """,
+            (name, owner, expires_at, now)
+        )
+        return cursor.rowcount == 1
+    
+    async def release_lease(self, name: str, owner: str):
+        """Give up lease `name` if we hold it."""
+        await db.execute(
+            "DELETE FROM scheduler_leases WHERE name = ? AND owner = ?",
+            (name, owner)
+        )
+    
+    async def record_run(
+        self,
+        job: str,
+        worker: str,
+        started_at: str,
+        finished_at: str,
+        status: str,
+        error: Optional[str] = None,
+    ):
+        """Append a job run to the history."""
+        await db.execute(
+            """
+            INSERT INTO job_runs (job, worker, started_at, finished_at, status, error)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (job, worker, started_at, finished_at, status, error)
+        )
+    
+    async def get_runs(self, job: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent runs, optionally of one job."""
+        if job is None:
+            rows = await db.fetch_all(
+                "SELECT * FROM job_runs ORDER BY started_at DESC LIMIT ?",
+                (limit,)
+            )
+        else:
+            rows = await db.fetch_all(
+                "SELECT * FROM job_runs WHERE job = ? ORDER BY started_at DESC LIMIT ?",
+                (job, limit)
+            )
+        return [dict(row) for row in rows]
+    
+    async def delete_runs_before(self, cutoff: str) -> int:
+        """Delete history older than `cutoff`."""
+        cursor = await db.execute(
+            "DELETE FROM job_runs WHERE started_at < ?",
+            (cutoff,)
+        )
+        return cursor.rowcount
+
+
+class SearchIndexRepository:
+    """Encrypted search index operations."""
+    
+    async def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        database = await shard_router.for_user(user_id)
+        row = await database.fetch_one(
+            "SELECT * FROM search_indexes WHERE user_id = ?",
+            (user_id,)
+        )
+        return dict(row) if row else None
+    
+    async def get_version(self, user_id: str) -> Optional[int]:
+        database = await shard_router.for_user(user_id)
+        row = await database.fetch_one(
+            "SELECT version FROM search_indexes WHERE user_id = ?",
+            (user_id,)
+        )
+        return row["version"] if row else None
+    
+    async def insert(self, user_id: str, encrypted_index: str, vault_version: int) -> Optional[int]:
+        """
+        Store a freshly built index; returns its version.
+        
+        None, storing nothing, if the user already has an index or the
+        vault changed since it was at `vault_version` (the build may miss
+        that write).
+        """
+        database = await shard_router.for_user(user_id)
+        now = datetime.utcnow().isoformat()
+        async with database.transaction() as conn:
+            cursor = await conn.execute(
+                """
+                INSERT INTO search_indexes (user_id, encrypted_index, updated_at)
+                SELECT ?, ?, ? WHERE (SELECT vault_version FROM users WHERE id = ?) = ?
+                ON CONFLICT(user_id) DO NOTHING
+                RETURNING version
+                """,
+                (user_id, encrypted_index, now, user_id, vault_version)
+            )
+            row = await cursor.fetchone()
+        return row["version"] if row else None
+    
+    async def update(self, user_id: str, encrypted_index: str, version: int) -> Optional[int]:
+        """
+        Overwrite the index if it is still at `version`; returns the new
+        version, or None if someone else changed it first.
+        """
+        database = await shard_router.for_user(user_id)
+        now = datetime.utcnow().isoformat()
+        async with database.transaction() as conn:
+            cursor = await conn.execute(
+                """
+                UPDATE search_indexes
+                SET encrypted_index = ?, deleted_ids = '[]', version = version + 1, updated_at = ?
+                WHERE user_id = ? AND version = ?
+                RETURNING version
+                """,
+                (encrypted_index, now, user_id, version)
+            )
+            row = await cursor.fetchone()
+        return row["version"] if row else None
+    
+    async def add_deleted(self, user_id: str, entry_id: str) -> Optional[int]:
+        """Record a deleted entry; returns the new version (None if no index)."""
+        database = await shard_router.for_user(user_id)
+        async with database.transaction() as conn:
+            cursor = await conn.execute(
+                """
+                UPDATE search_indexes
+                SET deleted_ids = json_insert(deleted_ids, '$[#]', ?), version = version + 1
+                WHERE user_id = ?
+                RETURNING version
+                """,
+                (entry_id, user_id)
+            )
+            row = await cursor.fetchone()
+        return row["version"] if row else None
+    
+    async def delete(self, user_id: str):
+        database = await shard_router.for_user(user_id)
+        await database.execute(
+            "DELETE FROM search_indexes WHERE user_id = ?",
+            (user_id,)
+        )
+
+
+class EventRepository:
+    """Vault change event log operations."""
+    
+    async def append(
+        self,
+        user_id: str,
+        worker: str,
+        type: str,
+        entry_id: Optional[str],
+        vault_version: int,
+    ) -> Dict[str, Any]:
+        """Append an event; returns it with its id."""
+        now = datetime.utcnow().isoformat()
+        cursor = await db.execute(
+            """
+            INSERT INTO vault_events (user_id, worker, type, entry_id, vault_version, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (user_id, worker, type, entry_id, vault_version, now)
+        )
+        return {
+            "id": cursor.lastrowid,
+            "user_id": user_id,
+            "worker": worker,
+            "type": type,
+            "entry_id": entry_id,
+            "vault_version": vault_version,
+            "created_at": now,
+        }
+    
+    async def get_last_id(self) -> int:
+        row = await db.fetch_one("SELECT COALESCE(MAX(id), 0) AS id FROM vault_events")
+        return row["id"]
+    
+    async def get_after(self, after_id: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Events of all users newer than `after_id`, oldest first."""
+        rows = await db.fetch_all(
+            "SELECT * FROM vault_events WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit)
+        )
+        return [dict(row) for row in rows]
+    
+    async def get_for_user_after(self, user_id: str, after_id: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """A user's events newer than `after_id`, oldest first."""
+        rows = await db.fetch_all(
+            "SELECT * FROM vault_events WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (user_id, after_id, limit)
+        )
+        return [dict(row) for row in rows]
+    
+    async def delete_before(self, cutoff: str) -> int:
+        cursor = await db.execute(
+            "DELETE FROM vault_events WHERE created_at < ?",
+            (cutoff,)
+        )
+        return cursor.rowcount
 
 
 # Global instances
 user_repo = UserRepository()
 vault_repo = VaultRepository()
 audit_repo = AuditRepository()
+session_repo = SessionRepository()
+job_repo = JobRepository()
+search_index_repo = SearchIndexRepository()
+event_repo = EventRepository()
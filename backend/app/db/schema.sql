@@ -1,5 +1,8 @@
 -- SamuraiVault Database Schema
 -- SQLite compatible
+--
+-- Baseline schema, applied by migration 1. Do not edit: later changes are
+-- migrations in app/db/migrations/versions.py.
 
 -- Users table
 CREATE TABLE IF NOT EXISTS users (
@@ -0,0 +1,125 @@
+"""Routing of per-user data over several SQLite files."""
+
+import asyncio
+import hashlib
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional, TypeVar
+
+from app.config import get_settings
+from app.utils import LRUCache, get_logger
+from .database import DB_PATH, Database, db
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+# Placements only change through the offline rebalance tool, so cached ones
+# never go stale while the app runs; the size just bounds memory
+PLACEMENT_CACHE_SIZE = 100_000
+PLACEMENT_CACHE_SECONDS = 3600
+
+T = TypeVar("T")
+
+
+def shard_path(index: int) -> Path:
+    """File of shard `index`; shard 0 is the DATABASE_URL file itself."""
+    if index == 0:
+        return DB_PATH
+    return DB_PATH.with_name(f"{DB_PATH.stem}.shard{index}{DB_PATH.suffix}")
+
+
+def placement(user_id: str, count: int) -> int:
+    """Shard a user belongs on out of `count` (a stable hash of the id)."""
+    digest = hashlib.sha256(user_id.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+class ShardRouter:
+    """
+    Picks the database holding a user's data.
+    
+    With DB_SHARDS > 1 users are hashed over that many SQLite files, each
+    with its own connection and write lock, so writes for different users
+    stop queueing behind a single writer. A user's row, vault entries,
+    search index and audit events live in their shard. Sessions, scheduler
+    state and vault events stay in the main database (shard 0), whose
+    ``users`` table is the global directory: every user has a row there,
+    with the unique email and username and the ``shard_id``; for users
+    stored elsewhere it carries no credentials.
+    
+    A user's shard is fixed at registration. After changing DB_SHARDS, run
+    ``python -m app.db.rebalance`` to move existing users to where the hash
+    now puts them. With one shard everything is in the main database and
+    routing costs nothing.
+    """
+    
+    def __init__(self, count: int = settings.DB_SHARDS):
+        self.shards: List[Database] = [db] + [Database(str(shard_path(i))) for i in range(1, max(count, 1))]
+        self._placements = LRUCache("user_shards", PLACEMENT_CACHE_SIZE)
+    
+    @property
+    def sharded(self) -> bool:
+        return len(self.shards) > 1
+    
+    def place(self, user_id: str) -> int:
+        """Shard for a new user."""
+        return placement(user_id, len(self.shards))
+    
+    def remember(self, user_id: str, index: int):
+        if self.sharded:
+            self._placements.set(user_id, index, time.time() + PLACEMENT_CACHE_SECONDS)
+    
+    async def shard_of(self, user_id: str) -> int:
+        """Index of the shard holding a user (0 for unknown users)."""
+        if not self.sharded:
+            return 0
+        index = self._placements.get(user_id)
+        if index is None:
+            row = await db.fetch_one("SELECT shard_id FROM users WHERE id = ?", (user_id,))
+            if row is None:
+                return 0
+            index = row["shard_id"]
+            self.remember(user_id, index)
+        return index
+    
+    async def for_user(self, user_id: Optional[str]) -> Database:
+        """Database holding a user's data; the main one for no user."""
+        if not self.sharded or user_id is None:
+            return db
+        return self.shards[await self.shard_of(user_id)]
+    
+    async def each(self, func: Callable[[Database], Awaitable[T]]) -> List[T]:
+        """Run `func` on every shard concurrently, results in shard order."""
+        if not self.sharded:
+            return [await func(db)]
+        return list(await asyncio.gather(*(func(shard) for shard in self.shards)))
+    
+    async def optimize(self):
+        for shard in self.shards:
+            await shard.optimize()
+    
+    # ============== Lifecycle ==============
+    
+    async def connect(self):
+        """
+        Open and migrate the shards besides the main database (connected
+        first), and check every user's shard is configured.
+        """
+        for shard in self.shards[1:]:
+            await shard.init_schema()
+        row = await db.fetch_one("SELECT COALESCE(MAX(shard_id), 0) AS last FROM users")
+        if row["last"] >= len(self.shards):
+            raise RuntimeError(
+                f"Users are stored in shard {row['last']} but DB_SHARDS is {len(self.shards)}; "
+                "restore DB_SHARDS or run python -m app.db.rebalance"
+            )
+        if self.sharded:
+            logger.info("Database sharded over %d files", len(self.shards))
+    
+    async def disconnect(self):
+        for shard in self.shards[1:]:
+            await shard.disconnect()
+
+
+# Global instance
+shard_router = ShardRouter()
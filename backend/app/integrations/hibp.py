@@ -1,12 +1,13 @@
 """HIBP (Have I Been Pwned) integration for breach detection."""
 
 import hashlib
-import httpx
 from typing import Tuple
 from app.config import get_settings
-from app.utils import logger
+from app.utils import get_logger
+from app.utils.metrics import hibp_request_duration, hibp_requests_total
 
 settings = get_settings()
+logger = get_logger(__name__)
 
 
 class HIBPClient:
@@ -32,18 +33,26 @@ class HIBPClient:
         prefix = sha1_hash[:5]
         suffix = sha1_hash[5:]
         
+        # Imported lazily: httpx (and certifi behind it) is only needed for
+        # breach checks, so it stays out of process start-up
+        import httpx
+        
         try:
             async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.api_url}{prefix}",
-                    timeout=self.timeout,
-                    headers={"User-Agent": "SamuraiVault-PasswordManager"}
-                )
+                with hibp_request_duration.time():
+                    response = await client.get(
+                        f"{self.api_url}{prefix}",
+                        timeout=self.timeout,
+                        headers={"User-Agent": "SamuraiVault-PasswordManager"}
+                    )
                 
                 if response.status_code != 200:
-                    logger.warning(f"HIBP API returned status {response.status_code}")
+                    hibp_requests_total.labels("bad_status").inc()
+                    logger.warning("HIBP API returned status %s", response.status_code)
                     return False, 0
                 
+                hibp_requests_total.labels("ok").inc()
+                
                 # Parse response
                 hashes = response.text.splitlines()
                 for line in hashes:
@@ -52,16 +61,18 @@ class HIBPClient:
                         hash_suffix, count = parts
                         if hash_suffix.upper() == suffix:
                             count = int(count)
-                            logger.info(f"Password found in {count} breaches")
+                            logger.info("Password found in %d breaches", count)
                             return True, count
                 
                 return False, 0
                 
         except httpx.TimeoutException:
+            hibp_requests_total.labels("timeout").inc()
             logger.warning("HIBP API timeout")
             return False, 0
         except Exception as e:
-            logger.error(f"HIBP API error: {e}")
+            hibp_requests_total.labels("error").inc()
+            logger.error("HIBP API error: %s", e)
             return False, 0
 
 
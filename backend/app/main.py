@@ -1,15 +1,35 @@
 """SamuraiVault - Password Manager API."""
 
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
 from app.config import get_settings
-from app.db import db
-from app.api import auth_router, vault_router, mfa_router, analytics_router, health_router
-from app.middleware import limiter, rate_limit_handler
+from app.db import db, shard_router
+from app.db.migrations import Migrator
+from app.services import audit_service, session_service, scheduler_service, event_service, backup_service
+from app.api import (
+    auth_router,
+    vault_router,
+    mfa_router,
+    analytics_router,
+    health_router,
+    metrics_router,
+    audit_router,
+    scheduler_router,
+)
+from app.middleware import (
+    limiter,
+    rate_limit_handler,
+    AdmissionMiddleware,
+    CompressionMiddleware,
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    RequestIdMiddleware,
+)
 from app.utils import logger
 
 settings = get_settings()
@@ -19,14 +39,64 @@ settings = get_settings()
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     # Startup
-    logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
+    logger.info("Starting %s v%s", settings.APP_NAME, settings.APP_VERSION)
     await db.connect()
     await db.init_schema()
+    await shard_router.connect()
     logger.info("Database initialized")
     
+    # Backfills run in the background in small batches, while serving
+    background_tasks = []
+    for database in shard_router.shards:
+        shard_migrator = Migrator(database)
+        if await shard_migrator.pending_backfills():
+            background_tasks.append(asyncio.create_task(shard_migrator.run_backfills()))
+    
+    # Picks up sessions revoked and vault events published by other workers
+    await session_service.start()
+    event_service.start()
+    
+    # Periodic jobs; leader-only ones run in a single worker
+    if settings.AUDIT_RETENTION_DAYS > 0:
+        scheduler_service.add_job(
+            "audit.compact", audit_service.compact,
+            every=settings.AUDIT_COMPACTION_INTERVAL_SECONDS, jitter=60, timeout=1800,
+        )
+    scheduler_service.add_job(
+        "sessions.cleanup", session_service.cleanup,
+        every=settings.SESSION_CLEANUP_INTERVAL_SECONDS, jitter=60, timeout=300,
+    )
+    scheduler_service.add_job(
+        "sessions.prune", session_service.prune,
+        every=300, jitter=30, leader_only=False,
+    )
+    scheduler_service.add_job(
+        "vault_events.prune", event_service.prune,
+        every=600, jitter=60, timeout=300,
+    )
+    if settings.BACKUP_CRON:
+        scheduler_service.add_job(
+            "db.backup", backup_service.snapshot,
+            cron=settings.BACKUP_CRON, jitter=300, timeout=3600,
+        )
+    scheduler_service.add_job("db.optimize", shard_router.optimize, cron="30 3 * * *", jitter=300, timeout=600)
+    if settings.SCHEDULER_ENABLED:
+        await scheduler_service.start()
+    else:
+        # Housekeeping still runs, per worker
+        scheduler_service.start_unscheduled()
+    
     yield
     
     # Shutdown
+    await event_service.stop()
+    await session_service.stop()
+    await scheduler_service.stop()
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError, Exception):  # failures were logged
+            await task
+    await shard_router.disconnect()
     await db.disconnect()
     logger.info("Application shutdown complete")
 
@@ -43,6 +113,11 @@ app = FastAPI(
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, rate_limit_handler)
 
+# Refuse CPU-heavy requests early when they would queue too long (innermost,
+# so 503s still carry CORS headers and are counted by the metrics)
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
 # Add CORS middleware - allow all origins for browser extension support
 app.add_middleware(
     CORSMiddleware,
@@ -50,14 +125,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Vault-Version"],
 )
 
+# Compress large responses (vault lists) for clients sending Accept-Encoding: gzip;
+# the vault event stream is sent as is
+if settings.GZIP_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.GZIP_MINIMUM_SIZE,
+        compresslevel=settings.GZIP_LEVEL,
+    )
+
+# Opt-in request profiling; not installed at all unless enabled
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Record per-route latency (covers CORS and routing too)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Tag requests with an id for log correlation (outermost, so every log line
+# emitted while handling the request carries it)
+app.add_middleware(RequestIdMiddleware)
+
 # Register routers
 app.include_router(health_router)
+app.include_router(metrics_router)
 app.include_router(auth_router)
 app.include_router(vault_router)
 app.include_router(mfa_router)
 app.include_router(analytics_router)
+app.include_router(audit_router)
+app.include_router(scheduler_router)
 
 
 @app.get("/")
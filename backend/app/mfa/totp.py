@@ -1,7 +1,6 @@
 """TOTP (Time-based One-Time Password) implementation."""
 
 import pyotp
-import qrcode
 import base64
 from io import BytesIO
 
@@ -10,6 +9,7 @@ class TOTPManager:
     """Handles TOTP generation and verification."""
     
     ISSUER = "SamuraiVault"
+    QR_FORMATS = ("png", "svg")
     
     def generate_secret(self) -> str:
         """Generate a new TOTP secret."""
@@ -20,8 +20,21 @@ class TOTPManager:
         totp = pyotp.TOTP(secret)
         return totp.provisioning_uri(name=email, issuer_name=self.ISSUER)
     
-    def generate_qr_code(self, provisioning_uri: str) -> str:
-        """Generate QR code as base64 string."""
+    def generate_qr_code(self, provisioning_uri: str, image_format: str = "png") -> str:
+        """
+        Generate QR code as base64 string.
+        
+        `image_format` is "png" (raster, needs Pillow) or "svg" (vector
+        path, no raster encoding). This is CPU-bound; call it from a
+        worker thread in async code.
+        """
+        # Imported lazily: qrcode (and Pillow behind it) is only needed
+        # during MFA setup, so other processes never pay for it
+        import qrcode
+        
+        if image_format not in self.QR_FORMATS:
+            raise ValueError(f"Unsupported QR format: {image_format}")
+        
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -31,11 +44,14 @@ class TOTPManager:
         qr.add_data(provisioning_uri)
         qr.make(fit=True)
         
-        img = qr.make_image(fill_color="black", back_color="white")
-        
         buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
+        if image_format == "svg":
+            import qrcode.image.svg
+            img = qr.make_image(image_factory=qrcode.image.svg.SvgPathImage)
+            img.save(buffer)
+        else:
+            img = qr.make_image(fill_color="black", back_color="white")
+            img.save(buffer, format='PNG')
         
         return base64.b64encode(buffer.getvalue()).decode('utf-8')
     
@@ -1,4 +1,21 @@
-from .auth_guard import get_current_user, get_encryption_key
+from .auth_guard import get_current_user, get_encryption_key, is_operator
 from .rate_limiter import limiter, rate_limit_handler
+from .admission import AdmissionMiddleware, admission_controller
+from .compression import CompressionMiddleware
+from .metrics import MetricsMiddleware
+from .profiler import ProfilingMiddleware
+from .request_id import RequestIdMiddleware
 
-__all__ = ["get_current_user", "get_encryption_key", "limiter", "rate_limit_handler"]
+__all__ = [
+    "get_current_user",
+    "get_encryption_key",
+    "is_operator",
+    "limiter",
+    "rate_limit_handler",
+    "AdmissionMiddleware",
+    "admission_controller",
+    "CompressionMiddleware",
+    "MetricsMiddleware",
+    "ProfilingMiddleware",
+    "RequestIdMiddleware",
+]
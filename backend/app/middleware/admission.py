@@ -0,0 +1,175 @@
+"""Admission control for CPU-heavy requests."""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Deque, Optional
+
+from fastapi.responses import JSONResponse
+
+from app.config import get_settings
+from app.utils.metrics import (
+    admission_in_flight,
+    admission_queued,
+    admission_rejected_total,
+    admission_wait_duration,
+)
+
+settings = get_settings()
+
+# Weight of the newest request in the running average of slot hold time
+EWMA_ALPHA = 0.2
+
+# Requests that run Argon2 without a master password header
+AUTH_ROUTES = {
+    ("POST", "/api/auth/login"),
+    ("POST", "/api/auth/register"),
+    ("POST", "/api/auth/change-password"),
+    ("POST", "/api/mfa/enable"),
+    ("POST", "/api/mfa/disable"),
+}
+VAULT_PREFIX = "/api/vault/"
+# Vault routes that never derive a key or decrypt entries
+VAULT_LIGHT_PATHS = {"/api/vault/events", "/api/vault/check-strength", "/api/vault/check-breach"}
+ANALYTICS_PREFIX = "/api/analytics/"
+
+
+def work_class(method: str, path: str) -> Optional[str]:
+    """Kind of CPU-heavy work a request does, or None for cheap ones."""
+    if (method, path) in AUTH_ROUTES:
+        return "auth"
+    if path.startswith(VAULT_PREFIX) and method != "DELETE" and path not in VAULT_LIGHT_PATHS:
+        return "vault"  # key derivation, then decrypting entries
+    if path.startswith(ANALYTICS_PREFIX):
+        return "analytics"
+    return None
+
+
+class AdmissionController:
+    """
+    A fixed number of slots for CPU-heavy requests, with a bounded wait.
+    
+    Up to ADMISSION_MAX_CONCURRENT requests hold a slot; later ones queue
+    in arrival order. A request whose expected wait (queue length times
+    the running average time a slot is held, over the slot count) is
+    above ADMISSION_MAX_WAIT_MS is refused at once, and one that has
+    queued that long gives up, so a burst sheds load instead of timing
+    out everything behind it. Counts are per worker process.
+    """
+    
+    def __init__(
+        self,
+        slots: int = settings.ADMISSION_MAX_CONCURRENT,
+        max_wait_ms: float = settings.ADMISSION_MAX_WAIT_MS,
+    ):
+        self.slots = slots if slots > 0 else (os.cpu_count() or 1)
+        self.max_wait = max_wait_ms / 1000
+        self.active = 0
+        self.hold_time = 0.0  # seconds; 0 until a request completes
+        self._waiters: Deque[asyncio.Future] = deque()
+        admission_in_flight.set_function(lambda: self.active)
+        admission_queued.set_function(lambda: len(self._waiters))
+    
+    def expected_wait(self) -> float:
+        """Seconds a request arriving now is expected to queue."""
+        if self.active < self.slots and not self._waiters:
+            return 0.0
+        return (len(self._waiters) + 1) * self.hold_time / self.slots
+    
+    async def acquire(self) -> bool:
+        """Wait for a slot; False if none came within the wait budget."""
+        if self.active < self.slots and not self._waiters:
+            self.active += 1
+            return True
+        
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, timeout=self.max_wait)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        except BaseException:
+            # Cancelled (client went away) after release() handed us the slot
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            if future in self._waiters:
+                self._waiters.remove(future)
+    
+    def release(self, held: Optional[float] = None):
+        """Free a slot (held for `held` seconds) for the next queued request."""
+        if held is not None:
+            self.hold_time = held if self.hold_time == 0 else (
+                EWMA_ALPHA * held + (1 - EWMA_ALPHA) * self.hold_time
+            )
+        self.active -= 1
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                self.active += 1
+                break
+
+
+def _overloaded(retry_after: float) -> JSONResponse:
+    seconds = max(1, math.ceil(retry_after))
+    return JSONResponse(
+        status_code=503,
+        content={
+            "error": "overloaded",
+            "message": "Server is busy. Please try again later.",
+            "retry_after": str(seconds),
+        },
+        headers={"Retry-After": str(seconds)},
+    )
+
+
+class AdmissionMiddleware:
+    """
+    Refuse CPU-heavy requests with 503 and Retry-After when busy.
+    
+    Login, registration, password changes, MFA changes, vault reads and
+    writes that derive the master key, and analytics take a slot of the
+    global AdmissionController for the whole request. Everything else,
+    such as ``/api/health`` and ``/api/auth/me``, passes straight through,
+    and because Argon2 runs in worker threads it stays responsive while
+    the slots are busy.
+    """
+    
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+    
+    async def __call__(self, scope, receive, send):
+        kind = work_class(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if kind is None:
+            await self.app(scope, receive, send)
+            return
+        
+        controller = self.controller
+        expected = controller.expected_wait()
+        if expected > controller.max_wait:
+            admission_rejected_total.labels(kind, "predicted").inc()
+            await _overloaded(expected)(scope, receive, send)
+            return
+        
+        queued_at = time.perf_counter()
+        if not await controller.acquire():
+            admission_rejected_total.labels(kind, "timeout").inc()
+            await _overloaded(controller.expected_wait() or controller.max_wait)(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        admission_wait_duration.labels(kind).observe(started - queued_at)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(time.perf_counter() - started)
+
+
+# Global instance
+admission_controller = AdmissionController()
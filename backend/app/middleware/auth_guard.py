@@ -1,16 +1,23 @@
 """JWT authentication guard middleware."""
 
+import hmac
 from typing import Optional, Tuple
 from fastapi import Request, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.config import get_settings
 from app.services import auth_service
 
+settings = get_settings()
 
 security = HTTPBearer()
 
 
 async def get_current_user(request: Request) -> dict:
-    """Extract and validate current user from request."""
+    """Extract and validate current user from request (once per request)."""
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        return user
+    
     auth_header = request.headers.get("Authorization")
     
     if not auth_header or not auth_header.startswith("Bearer "):
@@ -30,6 +37,7 @@ async def get_current_user(request: Request) -> dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    request.state.user = user
     return user
 
 
@@ -58,3 +66,11 @@ async def get_encryption_key(request: Request) -> bytes:
         )
     
     return key
+
+
+def is_operator(request: Request) -> bool:
+    """Whether the request carries the configured X-Operator-Token."""
+    token = request.headers.get("X-Operator-Token")
+    if not settings.OPERATOR_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), settings.OPERATOR_TOKEN.encode("utf-8"))
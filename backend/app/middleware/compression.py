@@ -0,0 +1,22 @@
+"""Response compression that leaves event streams alone."""
+
+from starlette.middleware.gzip import GZipMiddleware
+
+# Streams whose chunks must reach the client as they are written
+UNCOMPRESSED_PATHS = {"/api/vault/events"}
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware, except for server-sent event streams.
+    
+    Depending on the Starlette version, GZipMiddleware buffers
+    ``text/event-stream`` responses like any other, so events would sit in
+    the compressor instead of reaching the client.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in UNCOMPRESSED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
@@ -0,0 +1,41 @@
+"""Per-route request latency middleware."""
+
+import time
+from app.utils.metrics import http_request_duration, http_requests_total
+
+
+class MetricsMiddleware:
+    """
+    Record latency and status for every HTTP request.
+
+    Implemented as plain ASGI middleware so it adds no per-request
+    task or body buffering overhead. Requests are labelled by route
+    template (``/api/vault/{entry_id}``), not raw path, to keep label
+    cardinality bounded.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        status_code = 500
+        
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_request_duration.labels(method, path).observe(time.perf_counter() - start)
+            http_requests_total.labels(method, path, status_code).inc()
@@ -0,0 +1,200 @@
+"""On-demand per-request sampling profiler."""
+
+import asyncio
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import get_settings
+from app.utils import logger
+
+settings = get_settings()
+
+PROFILE_HEADER = b"x-profile"
+MAX_STACK_DEPTH = 128
+# Long-lived streams; random sampling would tie up a sampler thread for hours
+UNSAMPLED_PATHS = {"/api/vault/events"}
+
+# Running task per loop; a private CPython detail, so it may be missing
+_CURRENT_TASKS = getattr(asyncio.tasks, "_current_tasks", None)
+
+
+def _frame_name(frame) -> str:
+    """Format a frame as 'module:function'."""
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_name}"
+
+
+def _thread_stack(frame) -> List[str]:
+    """Collect a thread's stack, root first."""
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        stack.append(_frame_name(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _await_stack(coro) -> List[str]:
+    """Collect a suspended task's logical stack by following its await chain."""
+    stack = []
+    while coro is not None and len(stack) < MAX_STACK_DEPTH:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        stack.append(_frame_name(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return stack
+
+
+class _StackSampler:
+    """
+    Samples one asyncio task from a background thread.
+    
+    While the task is on-CPU the real event loop thread stack is taken,
+    which includes synchronous work such as Argon2 or AES. While it is
+    suspended (waiting on the database, HIBP, ...) its await chain is
+    recorded with a trailing ``[waiting]`` frame, so time spent off-CPU is
+    attributed to the awaiting call site too. Where the interpreter does
+    not expose the running task, every sample is an await chain marked
+    ``[unknown]`` instead.
+    """
+    
+    def __init__(self, task: asyncio.Task, interval: float):
+        self.task = task
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._loop = task.get_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def stop(self):
+        """Tell the sampler thread to finish; returns at once."""
+        self._stop.set()
+    
+    def join(self):
+        """Wait for the sampler thread; blocks, so not on the event loop."""
+        self._thread.join()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if _CURRENT_TASKS is None:
+                stack = _await_stack(self.task.get_coro()) + ["[unknown]"]
+            elif _CURRENT_TASKS.get(self._loop) is self.task:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                stack = _thread_stack(frame)
+            else:
+                stack = _await_stack(self.task.get_coro()) + ["[waiting]"]
+            if stack:
+                self.samples[";".join(stack)] += 1
+    
+    def collapsed(self) -> str:
+        """Render samples in flamegraph.pl / speedscope collapsed format."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class ProfilingMiddleware:
+    """
+    Wrap selected requests in a sampling profiler.
+    
+    A request is profiled when it carries an ``X-Profile`` header equal to
+    ``OPERATOR_TOKEN``, or when it is picked by ``PROFILING_SAMPLE_RATE``
+    (streaming endpoints never are). Each profile is written as a
+    collapsed-stack file to ``PROFILING_OUTPUT_DIR``; only operator
+    requests get its name back in ``X-Profile-File``. Only installed when
+    ``PROFILING_ENABLED`` is set.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+        self.output_dir = Path(settings.PROFILING_OUTPUT_DIR)
+        self.interval = settings.PROFILING_INTERVAL_MS / 1000
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self._token = settings.OPERATOR_TOKEN.encode("utf-8")
+        if _CURRENT_TASKS is None:
+            logger.warning("Profiler cannot tell on-CPU from waiting on this Python; samples are marked [unknown]")
+    
+    def _requested(self, scope) -> bool:
+        """Whether the request carries the operator's ``X-Profile`` token."""
+        if self._token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    return hmac.compare_digest(value, self._token)
+        return False
+    
+    def _sampled(self, scope) -> bool:
+        return (
+            self.sample_rate > 0
+            and scope["path"] not in UNSAMPLED_PATHS
+            and random.random() < self.sample_rate
+        )
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested = self._requested(scope)
+        if not requested and not self._sampled(scope):
+            await self.app(scope, receive, send)
+            return
+        
+        profile_id = uuid.uuid4().hex[:12]
+        filename = None
+        
+        async def send_wrapper(message):
+            nonlocal filename
+            if message["type"] == "http.response.start":
+                # Routing has happened by now, so the route template is known
+                filename = self._filename(scope, profile_id)
+                if requested:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-profile-file", filename.encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+        
+        sampler = _StackSampler(asyncio.current_task(), self.interval)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            filename = filename or self._filename(scope, profile_id)
+            await run_in_threadpool(self._write, filename, sampler)
+            logger.info(
+                "Profiled %s %s in %.1f ms (%d samples) -> %s",
+                scope["method"],
+                scope["path"],
+                elapsed_ms,
+                sum(sampler.samples.values()),
+                filename,
+            )
+    
+    def _filename(self, scope, profile_id: str) -> str:
+        route = getattr(scope.get("route"), "path", None) or scope["path"]
+        slug = "".join(c if c.isalnum() else "_" for c in route).strip("_")
+        timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        return f"{timestamp}-{scope['method']}-{slug}-{profile_id}.folded"
+    
+    def _write(self, filename: str, sampler: _StackSampler):
+        sampler.join()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / filename
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(sampler.collapsed())
+        os.replace(tmp_path, path)
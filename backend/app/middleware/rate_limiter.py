@@ -5,6 +5,9 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from fastapi import Request
 from fastapi.responses import JSONResponse
+from app.config import get_settings
+
+settings = get_settings()
 
 
 def get_user_identifier(request: Request) -> str:
@@ -18,7 +21,7 @@ def get_user_identifier(request: Request) -> str:
     return get_remote_address(request)
 
 
-limiter = Limiter(key_func=get_user_identifier)
+limiter = Limiter(key_func=get_user_identifier, enabled=settings.RATE_LIMIT_ENABLED)
 
 
 async def rate_limit_handler(request: Request, exc: RateLimitExceeded) -> JSONResponse:
@@ -4,6 +4,12 @@ from .strength_service import strength_service, StrengthService
 from .password_service import password_service, PasswordService
 from .breach_service import breach_service, BreachService
 from .analytics_service import analytics_service, AnalyticsService
+from .audit_service import audit_service, AuditService
+from .session_service import session_service, SessionService
+from .scheduler_service import scheduler_service, SchedulerService
+from .search_service import search_service, SearchService
+from .event_service import event_service, EventService
+from .backup_service import backup_service, BackupService
 
 __all__ = [
     "auth_service",
@@ -18,4 +24,16 @@ __all__ = [
     "BreachService",
     "analytics_service",
     "AnalyticsService",
+    "audit_service",
+    "AuditService",
+    "session_service",
+    "SessionService",
+    "scheduler_service",
+    "SchedulerService",
+    "search_service",
+    "SearchService",
+    "event_service",
+    "EventService",
+    "backup_service",
+    "BackupService",
 ]
@@ -4,9 +4,10 @@ from typing import Dict, Any, List
 from datetime import datetime, timedelta
 from app.crypto import vault_crypto
 from app.db import vault_repo
-from app.db.models import AnalyticsDashboard
+from app.db.models import AnalyticsDashboard, ReusedPasswordGroup, SimilarPasswordEntry, SimilarPasswordGroup
 from app.services.strength_service import strength_service
 from app.services.password_service import password_service
+from app.services.vault_service import vault_service
 
 
 class AnalyticsService:
@@ -18,6 +19,7 @@ class AnalyticsService:
         encryption_key: bytes,
     ) -> AnalyticsDashboard:
         """Get comprehensive security analytics."""
+        await vault_service.ensure_fingerprints(user_id, encryption_key)
         entries = await vault_repo.get_by_user(user_id)
         
         total_passwords = len(entries)
@@ -60,8 +62,9 @@ class AnalyticsService:
             except Exception:
                 continue
         
-        # Calculate reused passwords
-        reused_passwords = password_service.count_reused(decrypted_entries)
+        # Reuse is counted on the stored fingerprints; near-duplicates need plaintext
+        reused_passwords = await vault_repo.count_reused(user_id)
+        similar_passwords = password_service.count_similar(decrypted_entries)
         
         # Calculate average strength
         average_strength = sum(strength_scores) / len(strength_scores) if strength_scores else 0
@@ -70,11 +73,68 @@ class AnalyticsService:
             total_passwords=total_passwords,
             weak_passwords=weak_passwords,
             reused_passwords=reused_passwords,
+            similar_passwords=similar_passwords,
             old_passwords=old_passwords,
             breached_passwords=0,  # Async check would be slow for bulk
             average_strength=round(average_strength, 1),
             category_breakdown=category_breakdown,
         )
+    
+    async def get_reused_groups(
+        self,
+        user_id: str,
+        encryption_key: bytes,
+    ) -> List[ReusedPasswordGroup]:
+        """
+        Groups of entries sharing the same password, largest first.
+        
+        Grouping is on the stored fingerprints; only the grouped entries are
+        decrypted, for their titles.
+        """
+        await vault_service.ensure_fingerprints(user_id, encryption_key)
+        
+        groups: Dict[str, List[SimilarPasswordEntry]] = {}
+        for entry in await vault_repo.get_reused(user_id):
+            try:
+                title = vault_crypto.decrypt_entry(entry["encrypted_data"], encryption_key).get("title", "")
+            except Exception:
+                continue
+            groups.setdefault(entry["password_fingerprint"], []).append(
+                SimilarPasswordEntry(id=entry["id"], title=title)
+            )
+        
+        return sorted(
+            (ReusedPasswordGroup(entries=members) for members in groups.values() if len(members) > 1),
+            key=lambda group: len(group.entries),
+            reverse=True,
+        )
+    
+    async def get_similar_groups(
+        self,
+        user_id: str,
+        encryption_key: bytes,
+    ) -> List[SimilarPasswordGroup]:
+        """Groups of entries with near-duplicate passwords, largest first."""
+        entries = await vault_repo.get_by_user(user_id)
+        
+        decrypted_entries = []
+        for entry in entries:
+            try:
+                decrypted = vault_crypto.decrypt_entry(entry["encrypted_data"], encryption_key)
+            except Exception:
+                continue
+            decrypted_entries.append({
+                "id": entry["id"],
+                "title": decrypted.get("title", ""),
+                "password": decrypted.get("password", ""),
+            })
+        
+        groups = password_service.find_similar_passwords(decrypted_entries)
+        groups.sort(key=len, reverse=True)
+        return [
+            SimilarPasswordGroup(entries=[SimilarPasswordEntry(**member) for member in group])
+            for group in groups
+        ]
 
 
 # Global instance
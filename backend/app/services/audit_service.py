@@ -0,0 +1,235 @@
+"""Audit log queries and retention: archive old rows to compressed segments."""
+
+import asyncio
+import base64
+import gzip
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import get_settings
+from app.db import db, audit_repo
+from app.utils import get_logger
+from app.utils.metrics import audit_rows_archived
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process deployments only
+    fcntl = None
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+INDEX_FILE = "index.jsonl"
+LOCK_FILE = ".lock"
+EXPORT_PAGE_SIZE = 1000
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Opaque keyset cursor pointing just past `row`."""
+    raw = json.dumps([row["timestamp"], row["id"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """(timestamp, id) from a cursor; raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(timestamp, str) or not isinstance(row_id, str):
+        raise ValueError("Invalid cursor")
+    return timestamp, row_id
+
+
+class AuditService:
+    """
+    Serves audit queries and keeps the hot audit_log table small.
+    
+    Queries page by keyset on (timestamp, id), newest first, so deep pages
+    cost the same as the first one.
+    
+    Rows older than AUDIT_RETENTION_DAYS are moved, oldest first and in
+    batches, into append-only gzip NDJSON segment files. Each segment is
+    listed in ``index.jsonl`` with its time range, so archived history
+    can be searched by time without opening every segment.
+    
+    Per batch, the segment is written and indexed before its rows are
+    deleted. The last index entry is the archive's high-water mark: after
+    a crash, rows at or below it are deleted without being archived again.
+    """
+    
+    @property
+    def archive_dir(self) -> Path:
+        path = Path(settings.AUDIT_ARCHIVE_DIR)
+        return path if path.is_absolute() else Path(db.db_path).parent / path
+    
+    # ============== Queries ==============
+    
+    async def query_events(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        **filters: Optional[str],
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of events matching `filters` (see AuditRepository.query).
+        
+        Returns the rows and the cursor for the next page, or None on the
+        last page. Raises ValueError for a malformed cursor.
+        """
+        before = decode_cursor(cursor) if cursor else None
+        rows = await audit_repo.query(before=before, limit=limit + 1, **filters)
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, encode_cursor(rows[-1])
+        return rows, None
+    
+    async def iter_events(self, **filters: Optional[str]) -> AsyncIterator[Dict[str, Any]]:
+        """Every matching event, newest first, fetched page by page for exports."""
+        before = None
+        while True:
+            rows = await audit_repo.query(before=before, limit=EXPORT_PAGE_SIZE, **filters)
+            for row in rows:
+                yield row
+            if len(rows) < EXPORT_PAGE_SIZE:
+                return
+            before = (rows[-1]["timestamp"], rows[-1]["id"])
+    
+    # ============== Archive files (run in a worker thread) ==============
+    
+    def _load_index(self) -> List[Dict[str, Any]]:
+        index_path = self.archive_dir / INDEX_FILE
+        if not index_path.exists():
+            return []
+        index = []
+        with open(index_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    index.append(json.loads(line))
+                except ValueError:
+                    # Torn write from a crash; that batch is archived again
+                    if line.strip():
+                        logger.warning("Skipping damaged audit index line")
+        return index
+    
+    def _write_segment(self, seq: int, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Write rows to segment `seq` and append it to the index."""
+        name = f"audit-{seq:06d}.ndjson.gz"
+        path = self.archive_dir / name
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False).encode("utf-8") + b"\n")
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+        
+        entry = {
+            "segment": name,
+            "first_ts": rows[0]["timestamp"],
+            "last_ts": rows[-1]["timestamp"],
+            "last_id": rows[-1]["id"],
+            "rows": len(rows),
+            "bytes": path.stat().st_size,
+        }
+        index_path = self.archive_dir / INDEX_FILE
+        line = json.dumps(entry).encode("utf-8") + b"\n"
+        if index_path.exists() and index_path.stat().st_size:
+            with open(index_path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = b"\n" + line  # start a fresh line after a torn write
+        with open(index_path, "ab") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        return entry
+    
+    def _read_segment(self, name: str) -> List[Dict[str, Any]]:
+        with gzip.open(self.archive_dir / name, "rt", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    
+    @contextmanager
+    def _exclusive(self):
+        """Yield True if this process may compact (one worker at a time)."""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            yield True
+            return
+        with open(self.archive_dir / LOCK_FILE, "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    # ============== Compaction ==============
+    
+    async def compact(self, now: Optional[datetime] = None) -> int:
+        """Archive and delete rows past retention; returns rows archived."""
+        if settings.AUDIT_RETENTION_DAYS <= 0:
+            return 0
+        
+        now = now or datetime.utcnow()
+        cutoff = (now - timedelta(days=settings.AUDIT_RETENTION_DAYS)).isoformat()
+        batch_size = settings.AUDIT_COMPACTION_BATCH_SIZE
+        pause = settings.AUDIT_COMPACTION_PAUSE_MS / 1000
+        
+        with self._exclusive() as acquired:
+            if not acquired:
+                logger.debug("Audit compaction already running in another worker")
+                return 0
+            
+            index = await run_in_threadpool(self._load_index)
+            if index:
+                # Finish a batch that was archived but not yet deleted
+                await audit_repo.delete_through(cutoff, (index[-1]["last_ts"], index[-1]["last_id"]))
+            
+            total = 0
+            while True:
+                rows = await audit_repo.get_older_than(cutoff, batch_size)
+                if not rows:
+                    break
+                entry = await run_in_threadpool(self._write_segment, len(index) + 1, rows)
+                index.append(entry)
+                await audit_repo.delete_through(cutoff, (entry["last_ts"], entry["last_id"]))
+                total += len(rows)
+                audit_rows_archived.inc(len(rows))
+                await asyncio.sleep(pause)
+        
+        if total:
+            logger.info("Archived %d audit rows older than %s", total, cutoff)
+        return total
+    
+    async def read_archive(
+        self,
+        start: str,
+        end: str,
+        user_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Archived rows with start <= timestamp < end (ISO strings), oldest first."""
+        index = await run_in_threadpool(self._load_index)
+        result = []
+        for entry in index:
+            if entry["last_ts"] < start or entry["first_ts"] >= end:
+                continue
+            for row in await run_in_threadpool(self._read_segment, entry["segment"]):
+                if start <= row["timestamp"] < end and (user_id is None or row["user_id"] == user_id):
+                    result.append(row)
+        return result
+
+
+# Global instance
+audit_service = AuditService()
@@ -1,39 +1,58 @@
 """Authentication service."""
 
+import hashlib
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, Tuple
 from jose import jwt, JWTError
+from starlette.concurrency import run_in_threadpool
 
 from app.config import get_settings
-from app.crypto import key_manager
+from app.crypto import key_manager, vault_crypto, mfa_crypto
+from app.crypto.key_manager import KEY_VERSION_LEGACY, KEY_VERSION_WRAPPED
 from app.db import user_repo, audit_repo
 from app.db.models import UserRegister, UserResponse, TokenResponse
 from app.mfa import totp_manager
-from app.utils import logger
+from app.services.session_service import session_service
+from app.utils import get_logger, LRUCache
 
 settings = get_settings()
+logger = get_logger(__name__)
+
+VAULT_UNREADABLE = "Vault data could not be decrypted with this password"
 
 
 class AuthService:
     """Handles user authentication and session management."""
     
-    def _create_token(self, user_id: str, expires_delta: timedelta) -> str:
+    def __init__(self):
+        # Verified claims by token digest, so repeat requests skip the
+        # signature check; revocation is still checked on every request
+        self._token_cache = LRUCache("jwt", settings.TOKEN_CACHE_SIZE)
+    
+    def _create_token(self, user_id: str, session_id: str, expires_at: datetime) -> str:
         """Create a JWT token."""
-        expire = datetime.utcnow() + expires_delta
         payload = {
             "sub": user_id,
-            "exp": expire,
+            "sid": session_id,
+            "exp": expires_at,
             "iat": datetime.utcnow(),
         }
         return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     
-    def _decode_token(self, token: str) -> Optional[str]:
-        """Decode and validate a JWT token, return user_id."""
+    def _decode_token(self, token: str) -> Optional[Dict[str, Any]]:
+        """Decode and validate a JWT token, return its claims."""
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        claims = self._token_cache.get(digest)
+        if claims is not None:
+            return claims
+        
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-            return payload.get("sub")
+            claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
         except JWTError:
             return None
+        if isinstance(claims.get("exp"), (int, float)):
+            self._token_cache.set(digest, claims, claims["exp"])
+        return claims
     
     async def register(
         self,
@@ -51,17 +70,24 @@ class AuthService:
         if existing:
             return None, "Username already taken"
         
-        # Generate salt and hash password
+        # Generate salt and derive the master key (the only Argon2 run)
         salt = key_manager.generate_salt()
-        password_hash = key_manager.hash_password(data.master_password)
+        params = key_manager.target_params
+        master_key = await run_in_threadpool(key_manager.derive_key, data.master_password, salt, params)
         salt_b64 = key_manager.encode_salt(salt)
         
+        # Random data key for the vault, stored wrapped by the master key
+        data_key = key_manager.generate_data_key()
+        
         # Create user
         user = await user_repo.create(
             email=data.email,
             username=data.username,
-            password_hash=password_hash,
+            password_hash=key_manager.create_auth_verifier(master_key),
             salt=salt_b64,
+            key_version=KEY_VERSION_WRAPPED,
+            data_key_wrapped=self._wrap_data_key(data_key, master_key),
+            kdf_params=params,
         )
         
         # Log audit
@@ -71,7 +97,7 @@ class AuthService:
             ip_address=ip_address,
         )
         
-        logger.info(f"User registered: {data.email}")
+        logger.info("User registered: %s", data.email)
         return user, ""
     
     async def login(
@@ -80,6 +106,7 @@ class AuthService:
         password: str,
         mfa_code: Optional[str] = None,
         ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
     ) -> Tuple[Optional[TokenResponse], str]:
         """Authenticate user and return tokens."""
         # Get user
@@ -88,8 +115,14 @@ class AuthService:
             await audit_repo.log(action="login_failed_no_user", details=email, ip_address=ip_address)
             return None, "Invalid credentials"
         
-        # Verify password
-        if not key_manager.verify_password(password, user["password_hash"]):
+        # Verify password (and get the vault key from the same derivation)
+        try:
+            encryption_key = await self._authenticate(user, password)
+        except ValueError:
+            await audit_repo.log(action="login_failed_key_upgrade", user_id=user["id"], ip_address=ip_address)
+            return None, VAULT_UNREADABLE
+        
+        if not encryption_key:
             await audit_repo.log(
                 action="login_failed_wrong_password",
                 user_id=user["id"],
@@ -97,18 +130,18 @@ class AuthService:
             )
             return None, "Invalid credentials"
         
+        if user["key_version"] != KEY_VERSION_WRAPPED:
+            # Upgraded by _authenticate; pick up the re-encrypted MFA secret
+            user = await user_repo.get_by_id(user["id"])
+        
         # Check MFA
         if user["mfa_enabled"]:
             if not mfa_code:
                 return None, "MFA code required"
             
             # Decrypt MFA secret
-            salt = key_manager.decode_salt(user["salt"])
-            derived_key = key_manager.derive_key(password, salt)
-            
-            from app.crypto import mfa_crypto
             try:
-                mfa_secret = mfa_crypto.decrypt_secret(user["mfa_secret_encrypted"], derived_key)
+                mfa_secret = mfa_crypto.decrypt_secret(user["mfa_secret_encrypted"], encryption_key)
             except Exception:
                 return None, "MFA verification failed"
             
@@ -120,10 +153,11 @@ class AuthService:
                 )
                 return None, "Invalid MFA code"
         
-        # Create tokens
-        access_token = self._create_token(
-            user["id"],
-            timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        # Start a session
+        session_id, refresh_token = await session_service.create(
+            user_id=user["id"],
+            ip_address=ip_address,
+            user_agent=user_agent,
         )
         
         # Update last login
@@ -136,10 +170,31 @@ class AuthService:
             ip_address=ip_address,
         )
         
-        logger.info(f"User logged in: {email}")
+        logger.info("User logged in: %s", email)
         
+        return self._issue_tokens(user, session_id, refresh_token), ""
+    
+    async def refresh(
+        self,
+        refresh_token: str,
+        ip_address: Optional[str] = None,
+    ) -> Tuple[Optional[TokenResponse], str]:
+        """Exchange a refresh token for new tokens (no password hashing)."""
+        session, new_refresh_token = await session_service.rotate(refresh_token, ip_address)
+        if not session:
+            return None, "Invalid refresh token"
+        
+        user = await user_repo.get_by_id(session["user_id"])
+        if not user:
+            return None, "Invalid refresh token"
+        
+        return self._issue_tokens(user, session["id"], new_refresh_token), ""
+    
+    def _issue_tokens(self, user: Dict[str, Any], session_id: str, refresh_token: str) -> TokenResponse:
+        expires_at = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         return TokenResponse(
-            access_token=access_token,
+            access_token=self._create_token(user["id"], session_id, expires_at),
+            refresh_token=refresh_token,
             expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
             user=UserResponse(
                 id=user["id"],
@@ -148,23 +203,239 @@ class AuthService:
                 mfa_enabled=bool(user["mfa_enabled"]),
                 created_at=user["created_at"],
             )
-        ), ""
+        )
     
     async def get_current_user(self, token: str) -> Optional[Dict[str, Any]]:
-        """Get current user from token."""
-        user_id = self._decode_token(token)
-        if not user_id:
+        """Get current user from token (None if invalid or revoked)."""
+        claims = self._decode_token(token)
+        if not claims or not claims.get("sub") or not claims.get("sid"):
+            return None
+        if session_service.is_revoked(claims["sid"]):
             return None
-        return await user_repo.get_by_id(user_id)
+        
+        user = await user_repo.get_by_id(claims["sub"])
+        if user:
+            user["session_id"] = claims["sid"]
+            user["token_expires_at"] = claims["exp"]  # Unix time
+        return user
+    
+    async def logout(self, user: Dict[str, Any], ip_address: Optional[str] = None):
+        """Revoke the session the request was authenticated with."""
+        await session_service.revoke([user["session_id"]])
+        await audit_repo.log(action="logout", user_id=user["id"], ip_address=ip_address)
     
     async def get_derived_key(self, user_id: str, password: str) -> Optional[bytes]:
-        """Get derived encryption key for a user."""
+        """Get derived encryption key for a user (None if the password is wrong)."""
         user = await user_repo.get_by_id(user_id)
         if not user:
             return None
         
-        salt = key_manager.decode_salt(user["salt"])
-        return key_manager.derive_key(password, salt)
+        return await self._unlock(user, password)
+    
+    async def change_master_password(
+        self,
+        user_id: str,
+        current_password: str,
+        new_password: str,
+        ip_address: Optional[str] = None,
+        session_id: Optional[str] = None,
+    ) -> Tuple[bool, str]:
+        """
+        Change the master password.
+        
+        Only the wrapped data key is re-encrypted, so the cost is two
+        Argon2 runs no matter how many entries the vault holds. The new
+        master key uses the current target Argon2 parameters. Every other
+        session of the user is revoked; `session_id` stays signed in.
+        """
+        user = await user_repo.get_by_id(user_id)
+        if not user:
+            return False, "User not found"
+        
+        # No rehash on the way: the new master key gets the target parameters
+        try:
+            data_key = await self._authenticate(user, current_password, rehash=False)
+        except ValueError:
+            return False, VAULT_UNREADABLE
+        if not data_key:
+            await audit_repo.log(
+                action="master_password_change_failed",
+                user_id=user_id,
+                ip_address=ip_address,
+            )
+            return False, "Invalid master password"
+        
+        if not await self._store_master_key(user_id, new_password, data_key, user["salt"]):
+            return False, "Master password was changed by another request"
+        await session_service.revoke_user(user_id, keep=session_id)
+        
+        await audit_repo.log(
+            action="master_password_changed",
+            user_id=user_id,
+            ip_address=ip_address,
+        )
+        
+        logger.info("Master password changed for user %s", user_id)
+        return True, ""
+    
+    async def _derive_master_key(self, user: Dict[str, Any], password: str) -> bytes:
+        """
+        Run Argon2 over the password with the user's salt and parameters.
+        
+        Argon2 releases the GIL, so it runs in a worker thread and the event
+        loop keeps serving other requests meanwhile.
+        """
+        return await run_in_threadpool(
+            key_manager.derive_key,
+            password,
+            key_manager.decode_salt(user["salt"]),
+            key_manager.user_params(user),
+        )
+    
+    async def _store_master_key(self, user_id: str, password: str, data_key: bytes, old_salt: str) -> bool:
+        """
+        Derive a new master key (fresh salt, target parameters) and rewrap
+        the data key; False if the user's salt is no longer `old_salt`.
+        """
+        salt = key_manager.generate_salt()
+        params = key_manager.target_params
+        master_key = await run_in_threadpool(key_manager.derive_key, password, salt, params)
+        
+        return await user_repo.update_master_password(
+            user_id=user_id,
+            password_hash=key_manager.create_auth_verifier(master_key),
+            salt=key_manager.encode_salt(salt),
+            data_key_wrapped=self._wrap_data_key(data_key, master_key),
+            kdf_params=params,
+            old_salt=old_salt,
+        )
+    
+    def _wrap_data_key(self, data_key: bytes, master_key: bytes) -> str:
+        """Wrap the data key under the master key's wrapping subkey."""
+        return vault_crypto.wrap_key(data_key, key_manager.derive_wrapping_key(master_key))
+    
+    def _data_key(self, user: Dict[str, Any], master_key: bytes) -> Optional[bytes]:
+        """
+        Return the key vault entries and the MFA secret are encrypted with.
+        
+        Legacy accounts (not logged in since the key upgrade) get their raw
+        Argon2 key back unverified, as before. Other schemes verify the auth
+        verifier first; wrapped accounts then unwrap their random data key.
+        """
+        if user["key_version"] == KEY_VERSION_LEGACY:
+            return master_key
+        
+        if not key_manager.verify_auth_verifier(master_key, user["password_hash"]):
+            return None
+        if user["key_version"] == KEY_VERSION_WRAPPED:
+            return vault_crypto.unwrap_key(
+                user["data_key_wrapped"],
+                key_manager.derive_wrapping_key(master_key),
+            )
+        return key_manager.derive_encryption_key(master_key)
+    
+    async def _unlock(self, user: Dict[str, Any], password: str) -> Optional[bytes]:
+        """Verify the master password and return the data key (one Argon2 run)."""
+        return self._data_key(user, await self._derive_master_key(user, password))
+    
+    async def _authenticate(self, user: Dict[str, Any], password: str, rehash: bool = True) -> Optional[bytes]:
+        """
+        Verify the master password and return the data key.
+        
+        Accounts still on an older key scheme are upgraded to a wrapped
+        data key on the way, and with `rehash` master keys derived with
+        outdated Argon2 parameters are re-derived with the target ones (an
+        O(1) rewrap). The rehash is dropped if the master key changed since
+        `user` was read, so a concurrent password change is never undone.
+        Raises ValueError if the password is right but the legacy key does
+        not decrypt the vault.
+        """
+        if user["key_version"] == KEY_VERSION_LEGACY:
+            if not await run_in_threadpool(key_manager.verify_password, password, user["password_hash"]):
+                return None
+            master_key = await self._derive_master_key(user, password)
+            data_key = await self._upgrade_credentials(user, master_key)
+        else:
+            master_key = await self._derive_master_key(user, password)
+            data_key = self._data_key(user, master_key)
+            if data_key and user["key_version"] != KEY_VERSION_WRAPPED:
+                data_key = await self._upgrade_credentials(user, master_key)
+        
+        if rehash and data_key and key_manager.needs_rehash(key_manager.user_params(user)):
+            if not await self._store_master_key(user["id"], password, data_key, user["salt"]):
+                return data_key
+            logger.info(
+                "Rehashed master key for user %s with %s",
+                user["id"], key_manager.target_params,
+            )
+        return data_key
+    
+    async def _upgrade_credentials(self, user: Dict[str, Any], master_key: bytes) -> bytes:
+        """
+        Migrate an account to a wrapped data key.
+        
+        Runs once, on the first successful login after the upgrade. HKDF
+        accounts keep their encryption subkey as the data key, so only the
+        wrapped copy is stored. Legacy accounts get a fresh random data key:
+        entries and the MFA secret are re-encrypted from the raw Argon2 key
+        and password_hash is replaced by the auth verifier. Returns the
+        data key.
+        
+        The switch only applies if the account is still on its old scheme,
+        so of two concurrent logins one upgrades and the other unwraps the
+        winner's data key. A legacy account with data that does not decrypt
+        under the password is left as it is, and ValueError is raised.
+        """
+        if user["key_version"] != KEY_VERSION_LEGACY:
+            data_key = key_manager.derive_encryption_key(master_key)
+            await user_repo.upgrade_credentials(
+                user_id=user["id"],
+                from_version=user["key_version"],
+                password_hash=user["password_hash"],
+                key_version=KEY_VERSION_WRAPPED,
+                data_key_wrapped=self._wrap_data_key(data_key, master_key),
+            )
+            logger.info("Wrapped data key for user %s", user["id"])
+            return data_key
+        
+        data_key = key_manager.generate_data_key()
+        
+        def reencrypt(entries, mfa_secret_encrypted):
+            reencrypted = []
+            for entry in entries:
+                try:
+                    plaintext = vault_crypto.decrypt(entry["encrypted_data"], master_key)
+                except Exception:
+                    raise ValueError(f"entry {entry['id']} does not decrypt")
+                reencrypted.append((entry["id"], vault_crypto.encrypt(plaintext, data_key)))
+            if mfa_secret_encrypted:
+                try:
+                    secret = mfa_crypto.decrypt_secret(mfa_secret_encrypted, master_key)
+                except Exception:
+                    raise ValueError("MFA secret does not decrypt")
+                mfa_secret_encrypted = mfa_crypto.encrypt_secret(secret, data_key)
+            return reencrypted, mfa_secret_encrypted
+        
+        try:
+            upgraded = await user_repo.upgrade_credentials(
+                user_id=user["id"],
+                from_version=KEY_VERSION_LEGACY,
+                password_hash=key_manager.create_auth_verifier(master_key),
+                key_version=KEY_VERSION_WRAPPED,
+                data_key_wrapped=self._wrap_data_key(data_key, master_key),
+                reencrypt=reencrypt,
+            )
+        except ValueError as e:
+            logger.error("Key upgrade for user %s aborted: %s", user["id"], e)
+            raise
+        
+        if not upgraded:
+            # Another login upgraded first; use its data key
+            current = await user_repo.get_by_id(user["id"])
+            return self._data_key(current, master_key) if current else None
+        
+        logger.info("Upgraded key scheme for user %s", user["id"])
+        return data_key
 
 
 # Global instance
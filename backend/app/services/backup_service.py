@@ -0,0 +1,303 @@
+"""Online snapshots of the database files, with retention, verification and restore."""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import get_settings
+from app.db import db, shard_router
+from app.db.shards import shard_path
+from app.utils import get_logger
+from app.utils.metrics import backup_last_success
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+PARTIAL_SUFFIX = ".partial"
+# Age after which a .partial directory is taken for a crashed run's leftovers
+STALE_PARTIAL_SECONDS = 24 * 3600
+CHUNK_SIZE = 1024 * 1024
+
+# Times a stepped copy may start over (another connection wrote to the
+# source) before it gives up
+MAX_RESTARTS = 3
+
+
+class _Restarted(Exception):
+    pass
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fsync_dir(path: Path):
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(path, os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class BackupService:
+    """
+    Consistent copies of the live database, taken while it serves traffic.
+    
+    A snapshot is a directory under BACKUP_DIR named for its UTC time,
+    holding a gzip copy of every database file (each shard) and a
+    ``manifest.json`` with their SHA-256 checksums and schema version. It
+    is assembled under a ``.partial`` name and renamed when complete, so a
+    crash never leaves a snapshot that looks usable.
+    
+    Files are copied with SQLite's online backup API from a separate
+    connection. The app runs the database in WAL mode, where the copy is
+    one read transaction: it sees a fixed snapshot and writers carry on
+    into the write-ahead log meanwhile. A file still in rollback-journal
+    mode is copied BACKUP_PAGES_PER_STEP pages per step with a pause in
+    between, since its readers block writers; a write between steps
+    makes SQLite start over, and after MAX_RESTARTS the snapshot fails
+    rather than lock the file for a whole copy. Shards are copied one
+    after another, so a sharded snapshot is consistent per file.
+    """
+    
+    @property
+    def backup_dir(self) -> Path:
+        path = Path(settings.BACKUP_DIR)
+        return path if path.is_absolute() else Path(db.db_path).parent / path
+    
+    # ============== Taking snapshots (run in a worker thread) ==============
+    
+    def _copy(self, source: str, target: Path):
+        """Copy a live database file to `target` with the online backup API."""
+        last_remaining = None
+        restarts = 0
+        
+        def progress(status: int, remaining: int, total: int):
+            nonlocal last_remaining, restarts
+            if last_remaining is not None and remaining > last_remaining:
+                restarts += 1
+                if restarts >= MAX_RESTARTS:
+                    raise _Restarted()
+            last_remaining = remaining
+        
+        src = sqlite3.connect(source)
+        dst = sqlite3.connect(target)
+        try:
+            if src.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+                src.backup(dst)
+            else:
+                try:
+                    src.backup(
+                        dst,
+                        pages=settings.BACKUP_PAGES_PER_STEP,
+                        progress=progress,
+                        sleep=settings.BACKUP_STEP_PAUSE_MS / 1000,
+                    )
+                except _Restarted:
+                    raise RuntimeError(f"{source} kept changing during backup") from None
+            schema_version = dst.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            dst.close()
+            src.close()
+        return schema_version
+    
+    def _compress(self, raw: Path, target: Path) -> str:
+        """Gzip `raw` into `target`; returns the SHA-256 of the uncompressed bytes."""
+        digest = hashlib.sha256()
+        with open(raw, "rb") as f, open(target, "wb") as out:
+            with gzip.GzipFile(fileobj=out, mode="wb") as gz:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    gz.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        return digest.hexdigest()
+    
+    def _snapshot(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        name = now.strftime("%Y%m%dT%H%M%SZ")
+        final = self.backup_dir / name
+        if final.exists():
+            raise ValueError(f"Snapshot {name} already exists")
+        work = self.backup_dir / (name + PARTIAL_SUFFIX)
+        work.mkdir(parents=True)
+        
+        try:
+            files = []
+            for index, shard in enumerate(shard_router.shards):
+                source = Path(shard.db_path)
+                if not source.exists():
+                    raise ValueError(f"Database file {source} does not exist")
+                raw = work / source.name
+                schema_version = self._copy(str(source), raw)
+                compressed = work / (source.name + ".gz")
+                db_sha256 = self._compress(raw, compressed)
+                files.append({
+                    "shard": index,
+                    "name": source.name,
+                    "file": compressed.name,
+                    "sha256": _sha256(compressed),
+                    "db_sha256": db_sha256,
+                    "bytes": raw.stat().st_size,
+                    "compressed_bytes": compressed.stat().st_size,
+                    "schema_version": schema_version,
+                })
+                raw.unlink()
+            
+            manifest = {"name": name, "created_at": now.isoformat(), "files": files}
+            with open(work / MANIFEST_FILE, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.rename(work, final)
+            _fsync_dir(self.backup_dir)
+        except BaseException:
+            shutil.rmtree(work, ignore_errors=True)
+            raise
+        
+        logger.info(
+            "Database snapshot %s: %d file(s), %d bytes compressed, in %.1f s",
+            name, len(files), sum(f["compressed_bytes"] for f in files), time.perf_counter() - started,
+        )
+        return manifest
+    
+    async def snapshot(self) -> Dict[str, Any]:
+        """Take a snapshot, then drop those beyond BACKUP_KEEP; returns its manifest."""
+        manifest = await run_in_threadpool(self._snapshot)
+        backup_last_success.set(time.time())
+        await run_in_threadpool(self.prune)
+        return manifest
+    
+    # ============== Listing and retention ==============
+    
+    def snapshots(self) -> List[Dict[str, Any]]:
+        """Manifests of complete snapshots, oldest first."""
+        if not self.backup_dir.exists():
+            return []
+        manifests = []
+        for path in sorted(self.backup_dir.iterdir()):
+            manifest_path = path / MANIFEST_FILE
+            if path.is_dir() and manifest_path.exists():
+                with open(manifest_path, encoding="utf-8") as f:
+                    manifests.append(json.load(f))
+        return manifests
+    
+    def load(self, name: str) -> Dict[str, Any]:
+        manifest_path = self.backup_dir / name / MANIFEST_FILE
+        if not manifest_path.exists():
+            raise ValueError(f"No snapshot named {name}")
+        with open(manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+    
+    def prune(self, keep: Optional[int] = None) -> int:
+        """
+        Delete all but the newest `keep` snapshots (0 keeps all) and what
+        failed snapshots left behind; returns how many snapshots went.
+        """
+        keep = settings.BACKUP_KEEP if keep is None else keep
+        if self.backup_dir.exists():
+            for path in self.backup_dir.glob("*" + PARTIAL_SUFFIX):
+                if time.time() - path.stat().st_mtime > STALE_PARTIAL_SECONDS:
+                    shutil.rmtree(path, ignore_errors=True)
+        snapshots = self.snapshots()
+        old = snapshots[:len(snapshots) - keep] if keep > 0 else []
+        for manifest in old:
+            shutil.rmtree(self.backup_dir / manifest["name"])
+        if old:
+            logger.info("Removed %d old database snapshot(s)", len(old))
+        return len(old)
+    
+    # ============== Verify and restore (offline) ==============
+    
+    def _extract(self, name: str, entry: Dict[str, Any], target: Path):
+        """Check and unpack one file of a snapshot to `target`."""
+        compressed = self.backup_dir / name / entry["file"]
+        if not compressed.exists():
+            raise ValueError(f"{name}: {entry['file']} is missing")
+        if _sha256(compressed) != entry["sha256"]:
+            raise ValueError(f"{name}: {entry['file']} does not match its checksum")
+        
+        digest = hashlib.sha256()
+        with gzip.open(compressed, "rb") as gz, open(target, "wb") as out:
+            for chunk in iter(lambda: gz.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        if digest.hexdigest() != entry["db_sha256"]:
+            raise ValueError(f"{name}: {entry['name']} does not match its checksum")
+        
+        conn = sqlite3.connect(target)
+        try:
+            result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        finally:
+            conn.close()
+        if result != "ok":
+            raise ValueError(f"{name}: {entry['name']} failed the integrity check: {result}")
+    
+    def verify(self, name: str) -> Dict[str, Any]:
+        """Check every file of a snapshot; raises ValueError on the first problem."""
+        manifest = self.load(name)
+        work = self.backup_dir / (name + ".verify" + PARTIAL_SUFFIX)
+        work.mkdir(exist_ok=True)
+        try:
+            for entry in manifest["files"]:
+                self._extract(name, entry, work / entry["name"])
+                (work / entry["name"]).unlink()
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+        return manifest
+    
+    def restore(self, name: str) -> List[Path]:
+        """
+        Replace the database files with a snapshot; run with the app stopped.
+        
+        Every file is unpacked and checked before any live file is touched.
+        The replaced files are kept next to them with a ``.before-restore``
+        suffix. Returns the restored paths.
+        """
+        manifest = self.load(name)
+        staged = []
+        try:
+            for entry in manifest["files"]:
+                target = shard_path(entry["shard"])
+                temp = target.with_name(target.name + ".restore" + PARTIAL_SUFFIX)
+                self._extract(name, entry, temp)
+                staged.append((temp, target))
+        except BaseException:
+            for temp, _ in staged:
+                temp.unlink(missing_ok=True)
+            raise
+        
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        for temp, target in staged:
+            # The write-ahead log goes along: it may hold committed pages
+            for suffix in ("", "-wal", "-journal"):
+                path = target.with_name(target.name + suffix)
+                if path.exists():
+                    os.replace(path, target.with_name(f"{target.name}.before-restore-{stamp}{suffix}"))
+            target.with_name(target.name + "-shm").unlink(missing_ok=True)
+            os.replace(temp, target)
+            _fsync_dir(target.parent)
+        logger.info("Restored database snapshot %s (%d file(s))", name, len(staged))
+        return [target for _, target in staged]
+
+
+# Global instance
+backup_service = BackupService()
@@ -0,0 +1,173 @@
+"""Vault change notifications: in-process pub/sub over a SQLite event log."""
+
+import asyncio
+import os
+import socket
+import uuid
+from contextlib import suppress
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from app.config import get_settings
+from app.db import event_repo
+from app.utils import get_logger
+from app.utils.metrics import vault_event_subscribers, vault_events_published
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+# Events a slow stream may fall behind by before it is closed; the client
+# reconnects with Last-Event-ID and is replayed the rest
+QUEUE_SIZE = 100
+
+
+class Subscription:
+    """One open event stream."""
+    
+    def __init__(self, user_id: str, last_id: int = 0):
+        self.user_id = user_id
+        self.last_id = last_id
+        self.queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.closed = False
+        self.held: Optional[List[Dict[str, Any]]] = None  # live events held back during replay
+    
+    def put(self, event: Optional[Dict[str, Any]]):
+        """Queue an event (None ends the stream)."""
+        if self.closed:
+            return
+        if self.held is not None and event is not None:
+            self.held.append(event)
+            return
+        if event is not None:
+            if event["id"] <= self.last_id:
+                return  # already sent by replay
+            self.last_id = event["id"]
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.close()
+    
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        # Make room so the reader wakes up and sees the end
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class EventService:
+    """
+    Vault change events for ``GET /api/vault/events``.
+    
+    VaultService publishes one event per write. It is appended to the
+    ``vault_events`` table, whose id doubles as the SSE event id, and handed
+    straight to this worker's subscribers. Other workers pick it up by
+    polling the table for newer ids every VAULT_EVENTS_POLL_SECONDS, but
+    only while they have subscribers. Events name the entry and the new
+    vault version, never entry contents.
+    
+    A client that reconnects with Last-Event-ID is replayed what it missed,
+    within VAULT_EVENTS_RETENTION_MINUTES.
+    """
+    
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._last_id: Optional[int] = None  # newest event seen, while anyone listens
+        self._task: Optional[asyncio.Task] = None
+        vault_event_subscribers.set_function(
+            lambda: sum(len(subs) for subs in self._subscribers.values())
+        )
+    
+    def _deliver(self, event: Dict[str, Any]):
+        for subscription in list(self._subscribers.get(event["user_id"], ())):
+            subscription.put(event)
+    
+    async def publish(
+        self,
+        user_id: str,
+        type: str,
+        entry_id: Optional[str],
+        vault_version: int,
+    ) -> Dict[str, Any]:
+        """Record a vault change and notify this worker's subscribers."""
+        event = await event_repo.append(user_id, self.worker_id, type, entry_id, vault_version)
+        vault_events_published.labels(type).inc()
+        self._deliver(event)
+        return event
+    
+    async def subscribe(self, user_id: str, last_event_id: Optional[int] = None) -> Subscription:
+        """
+        Open a stream for a user, first replaying events after
+        `last_event_id` if given.
+        """
+        if self._last_id is None:
+            self._last_id = await event_repo.get_last_id()
+        
+        subscription = Subscription(user_id, last_event_id or 0)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        if last_event_id is not None:
+            subscription.held = []
+            missed = await event_repo.get_for_user_after(user_id, last_event_id, limit=QUEUE_SIZE)
+            held, subscription.held = subscription.held, None
+            for event in sorted(missed + held, key=lambda event: event["id"]):
+                subscription.put(event)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription):
+        subscription.closed = True
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+        if not self._subscribers:
+            self._last_id = None
+    
+    async def poll(self) -> int:
+        """Deliver events other workers published; returns how many."""
+        if self._last_id is None:
+            return 0
+        events = await event_repo.get_after(self._last_id)
+        if self._last_id is None:
+            return 0  # everyone left meanwhile
+        delivered = 0
+        for event in events:
+            self._last_id = max(self._last_id, event["id"])
+            if event["worker"] != self.worker_id:
+                self._deliver(event)
+                delivered += 1
+        return delivered
+    
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(settings.VAULT_EVENTS_POLL_SECONDS)
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Polling vault events failed")
+    
+    async def prune(self) -> int:
+        """Delete events older than VAULT_EVENTS_RETENTION_MINUTES."""
+        cutoff = datetime.utcnow() - timedelta(minutes=settings.VAULT_EVENTS_RETENTION_MINUTES)
+        return await event_repo.delete_before(cutoff.isoformat())
+    
+    def start(self):
+        self._task = asyncio.create_task(self._poll_loop())
+    
+    async def stop(self):
+        """Stop polling and end every open stream."""
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        for subscriptions in list(self._subscribers.values()):
+            for subscription in list(subscriptions):
+                subscription.close()
+
+
+# Global instance
+event_service = EventService()
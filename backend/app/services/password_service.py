@@ -2,6 +2,11 @@
 
 from typing import List, Dict, Set
 import hashlib
+import hmac
+
+# Shorter passwords share too many one-deletion variants to compare usefully
+# (and are flagged as weak anyway)
+MIN_SIMILAR_LENGTH = 6
 
 
 class PasswordService:
@@ -11,37 +16,102 @@ class PasswordService:
         """Create a hash for comparison (not for storage)."""
         return hashlib.sha256(password.encode()).hexdigest()
     
-    def find_reused_passwords(self, entries: List[Dict]) -> Dict[str, List[str]]:
+    def fingerprint(self, password: str, fingerprint_key: bytes) -> str:
+        """
+        Keyed fingerprint of a password, stored with its entry so reuse can
+        be found without decrypting. Empty for entries without a password.
         """
-        Find reused passwords across entries.
+        if not password:
+            return ""
+        return hmac.new(fingerprint_key, password.encode("utf-8"), hashlib.sha256).hexdigest()
+    
+    def _deletion_keys(self, password: str) -> Set[str]:
+        """The password and every variant with one character removed."""
+        password = password.lower()
+        keys = {password}
+        for i in range(len(password)):
+            keys.add(password[:i] + password[i + 1:])
+        return keys
+    
+    def _one_edit_apart(self, a: str, b: str) -> bool:
+        """Whether `a` and `b` differ by at most one changed, added or removed character."""
+        if len(a) > len(b):
+            a, b = b, a
+        if len(b) - len(a) > 1:
+            return False
+        i = 0
+        while i < len(a) and a[i] == b[i]:
+            i += 1
+        if len(a) == len(b):
+            return a[i + 1:] == b[i + 1:]
+        return a[i:] == b[i + 1:]
+    
+    def find_similar_passwords(self, entries: List[Dict]) -> List[List[Dict]]:
+        """
+        Group entries whose passwords are near-identical.
+        
+        Two passwords match when, ignoring case, they are equal or one
+        edit apart (a changed, added or removed character, e.g.
+        "Summer2023!" / "Summer2024!"). Candidates are found through a
+        hash index of one-deletion variants instead of comparing every
+        pair, so the cost grows with vault size times password length;
+        sharing a variant also catches transpositions and some pairs two
+        edits apart, so each candidate pair is confirmed by comparing the
+        passwords. Matches are chained, so a group can span several edits.
         
         Args:
             entries: List of decrypted entry dicts with 'id', 'title', 'password'
         
         Returns:
-            Dict mapping password hash to list of entry titles that use it
+            Groups of {'id', 'title'} dicts holding at least two different
+            passwords (exact reuse alone is reported by GET /api/analytics/reused)
         """
-        password_map: Dict[str, List[str]] = {}
+        candidates = [
+            entry for entry in entries
+            if len(entry.get("password", "")) >= MIN_SIMILAR_LENGTH
+        ]
         
-        for entry in entries:
-            password = entry.get("password", "")
-            if not password:
+        # Union-find over entries that share a deletion variant
+        parent = list(range(len(candidates)))
+        
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        passwords = [entry["password"].lower() for entry in candidates]
+        first: Dict[str, int] = {}
+        seen: Dict[str, List[int]] = {}
+        for i, password in enumerate(passwords):
+            # Repeats join the first entry with that password; only distinct
+            # passwords go into the index, which keeps its buckets small
+            j = first.setdefault(password, i)
+            if j != i:
+                parent[find(i)] = find(j)
                 continue
-            
-            pw_hash = self._hash_password(password)
-            
-            if pw_hash not in password_map:
-                password_map[pw_hash] = []
-            
-            password_map[pw_hash].append(entry.get("title", entry.get("id", "Unknown")))
-        
-        # Filter to only reused passwords
-        return {k: v for k, v in password_map.items() if len(v) > 1}
+            for key in self._deletion_keys(password):
+                for j in seen.setdefault(key, []):
+                    if find(i) != find(j) and self._one_edit_apart(password, passwords[j]):
+                        parent[find(i)] = find(j)
+                seen[key].append(i)
+        
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(candidates)):
+            groups.setdefault(find(i), []).append(i)
+        
+        return [
+            [
+                {"id": candidates[i].get("id"), "title": candidates[i].get("title", "")}
+                for i in members
+            ]
+            for members in groups.values()
+            if len({candidates[i]["password"] for i in members}) > 1
+        ]
     
-    def count_reused(self, entries: List[Dict]) -> int:
-        """Count number of entries with reused passwords."""
-        reused = self.find_reused_passwords(entries)
-        return sum(len(titles) for titles in reused.values())
+    def count_similar(self, entries: List[Dict]) -> int:
+        """Count entries whose password is a near-duplicate of another."""
+        return sum(len(group) for group in self.find_similar_passwords(entries))
     
     def get_unique_passwords_count(self, entries: List[Dict]) -> int:
         """Count unique passwords."""
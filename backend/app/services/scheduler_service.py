@@ -0,0 +1,217 @@
+"""In-process scheduler for periodic jobs."""
+
+import asyncio
+import os
+import random
+import socket
+import time
+import uuid
+from contextlib import suppress
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import get_settings
+from app.db import job_repo
+from app.utils import get_logger
+from app.utils.cron import CronSchedule
+from app.utils.metrics import job_duration, job_runs_total, scheduler_leader
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+LEADER_LEASE = "scheduler"
+
+JobFunc = Callable[[], Awaitable[Any]]
+
+
+class Job:
+    """A coroutine function run on a cron schedule or a fixed interval."""
+    
+    def __init__(
+        self,
+        name: str,
+        func: JobFunc,
+        cron: Optional[str] = None,
+        every: Optional[float] = None,
+        jitter: float = 0.0,
+        timeout: Optional[float] = None,
+        leader_only: bool = True,
+    ):
+        if (cron is None) == (every is None):
+            raise ValueError(f"Job {name} needs exactly one of cron or every")
+        self.name = name
+        self.func = func
+        self.cron = CronSchedule(cron) if cron else None
+        self.every = every
+        self.jitter = jitter
+        self.timeout = timeout
+        self.leader_only = leader_only
+        self.next_run: Optional[datetime] = None
+        self.last_status: Optional[str] = None
+    
+    def schedule_next(self, now: datetime):
+        if self.cron:
+            self.next_run = self.cron.next_after(now)
+        else:
+            self.next_run = now + timedelta(seconds=self.every)
+    
+    def __repr__(self):
+        return f"<Job {self.name} {self.cron.expression if self.cron else f'every {self.every}s'}>"
+
+
+class SchedulerService:
+    """
+    Runs periodic jobs inside the app process.
+    
+    Each uvicorn worker runs the scheduler, but only one of them, the
+    holder of a lease row in ``scheduler_leases``, runs leader-only jobs.
+    The leader renews the lease every third of SCHEDULER_LEASE_SECONDS;
+    if it dies, another worker takes over once the lease has expired.
+    Jobs with ``leader_only=False`` (per-process housekeeping) run in
+    every worker.
+    
+    Every run is bounded by its job's timeout, delayed by a random jitter
+    so workers and jobs do not fire in lockstep, and recorded in the
+    ``job_runs`` table.
+    """
+    
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs: Dict[str, Job] = {}
+        self.is_leader = False
+        self._tasks: List[asyncio.Task] = []
+        scheduler_leader.set_function(lambda: 1.0 if self.is_leader else 0.0)
+    
+    def add_job(self, name: str, func: JobFunc, **options) -> Job:
+        """
+        Register (or replace) a job; takes `cron` or `every` (seconds), plus
+        `jitter`, `timeout` (seconds) and `leader_only`.
+        """
+        job = Job(name, func, **options)
+        self.jobs[name] = job
+        return job
+    
+    # ============== Leader election ==============
+    
+    async def _renew_lease(self):
+        expires_at = datetime.utcnow() + timedelta(seconds=settings.SCHEDULER_LEASE_SECONDS)
+        try:
+            leader = await job_repo.acquire_lease(LEADER_LEASE, self.worker_id, expires_at.isoformat())
+        except Exception:
+            logger.exception("Scheduler lease renewal failed")
+            leader = False
+        if leader != self.is_leader:
+            logger.info("Scheduler %s leadership: %s", "acquired" if leader else "lost", self.worker_id)
+        self.is_leader = leader
+    
+    async def _lease_loop(self):
+        while True:
+            await asyncio.sleep(settings.SCHEDULER_LEASE_SECONDS / 3)
+            await self._renew_lease()
+    
+    # ============== Running jobs ==============
+    
+    async def run_job(self, job: Job) -> str:
+        """Run a job once now; returns "ok", "timeout" or "error"."""
+        started = datetime.utcnow()
+        start = time.perf_counter()
+        error = None
+        try:
+            await asyncio.wait_for(job.func(), timeout=job.timeout)
+            status = "ok"
+        except asyncio.TimeoutError:
+            status, error = "timeout", f"Timed out after {job.timeout}s"
+            logger.error("Job %s timed out after %ss", job.name, job.timeout)
+        except Exception as e:
+            status, error = "error", repr(e)
+            logger.exception("Job %s failed", job.name)
+        
+        job.last_status = status
+        job_duration.labels(job.name).observe(time.perf_counter() - start)
+        job_runs_total.labels(job.name, status).inc()
+        try:
+            await job_repo.record_run(
+                job=job.name,
+                worker=self.worker_id,
+                started_at=started.isoformat(),
+                finished_at=datetime.utcnow().isoformat(),
+                status=status,
+                error=error,
+            )
+        except Exception:
+            logger.exception("Could not record run of job %s", job.name)
+        return status
+    
+    async def _job_loop(self, job: Job):
+        job.schedule_next(datetime.utcnow())
+        while True:
+            delay = (job.next_run - datetime.utcnow()).total_seconds()
+            await asyncio.sleep(max(0.0, delay) + random.uniform(0, job.jitter))
+            if self.is_leader or not job.leader_only:
+                await self.run_job(job)
+            job.schedule_next(datetime.utcnow())
+    
+    async def prune_history(self) -> int:
+        """Delete job runs older than SCHEDULER_HISTORY_DAYS."""
+        cutoff = datetime.utcnow() - timedelta(days=settings.SCHEDULER_HISTORY_DAYS)
+        return await job_repo.delete_runs_before(cutoff.isoformat())
+    
+    # ============== Lifecycle ==============
+    
+    async def start(self):
+        """Try to become leader and start every job loop."""
+        self.add_job("scheduler.prune_history", self.prune_history, cron="45 4 * * *", jitter=60)
+        await self._renew_lease()
+        self._tasks = [asyncio.create_task(self._lease_loop())]
+        self._tasks += [asyncio.create_task(self._job_loop(job)) for job in self.jobs.values()]
+        logger.info("Scheduler started with %d jobs (leader: %s)", len(self.jobs), self.is_leader)
+    
+    async def _plain_loop(self, job: Job):
+        while True:
+            try:
+                await asyncio.wait_for(job.func(), timeout=job.timeout)
+            except Exception:
+                logger.exception("Job %s failed", job.name)
+            await asyncio.sleep(job.every)
+    
+    def start_unscheduled(self):
+        """
+        Run the interval jobs (housekeeping) as plain loops in this worker,
+        for when SCHEDULER_ENABLED is off: no leader election and no run
+        history. Cron jobs (backups, PRAGMA optimize) do not run.
+        """
+        skipped = [job.name for job in self.jobs.values() if not job.every]
+        if skipped:
+            logger.warning("SCHEDULER_ENABLED is off, not running: %s", ", ".join(skipped))
+        self._tasks = [asyncio.create_task(self._plain_loop(job)) for job in self.jobs.values() if job.every]
+    
+    async def stop(self):
+        """Cancel job loops (interrupting running jobs) and free the lease."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with suppress(asyncio.CancelledError, Exception):
+                await task
+        self._tasks = []
+        
+        if self.is_leader:
+            with suppress(Exception):
+                await job_repo.release_lease(LEADER_LEASE, self.worker_id)
+            self.is_leader = False
+    
+    async def get_status(self) -> List[Dict[str, Any]]:
+        """Registered jobs with their next run and latest recorded runs."""
+        return [
+            {
+                "name": job.name,
+                "schedule": job.cron.expression if job.cron else f"every {job.every:g}s",
+                "leader_only": job.leader_only,
+                "next_run": job.next_run.isoformat() if job.next_run else None,
+                "last_runs": await job_repo.get_runs(job.name, limit=5),
+            }
+            for job in self.jobs.values()
+        ]
+
+
+# Global instance
+scheduler_service = SchedulerService()
@@ -0,0 +1,160 @@
+"""Encrypted per-user search index over vault entry titles, usernames and URLs."""
+
+import json
+import time
+from typing import Callable, List, Optional, Tuple
+
+from app.config import get_settings
+from app.crypto import vault_crypto
+from app.db import vault_repo, search_index_repo
+from app.db.models import VaultSearchResult
+from app.utils import LRUCache, get_logger
+from app.utils.search import SearchIndex
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+# Attempts at a read-modify-write of the index before dropping it for a rebuild
+SAVE_ATTEMPTS = 3
+
+
+def entry_fields(entry: dict) -> Tuple[str, str, str]:
+    """The searchable fields of a decrypted entry, title first."""
+    return entry.get("title") or "", entry.get("username") or "", entry.get("url") or ""
+
+
+class SearchService:
+    """
+    Server-side vault search without decrypting the vault per query.
+    
+    Each user has one row in ``search_indexes``: the searchable fields of
+    every entry, encrypted with the user's data key. It is decrypted on the
+    first search and kept in memory (SEARCH_INDEX_CACHE_SECONDS); later
+    searches only check the row's version. Vault writes update the index
+    in place, after bumping the vault version. Deletes carry no key, so
+    they append the entry id to ``deleted_ids`` instead, and the next
+    keyed write folds them in. Users without an index get one built from
+    their entries on first search. It is only stored if the vault version
+    did not move during the build, so a write the build missed cannot be
+    lost.
+    """
+    
+    def __init__(self):
+        self._cache = LRUCache("search_index", settings.SEARCH_INDEX_CACHE_SIZE)
+    
+    def _remember(self, user_id: str, version: int, index: SearchIndex):
+        self._cache.set(user_id, (version, index), time.time() + settings.SEARCH_INDEX_CACHE_SECONDS)
+    
+    async def _build(self, user_id: str, encryption_key: bytes) -> Tuple[Optional[int], SearchIndex]:
+        """
+        Index the user's entries and store the result if no vault write
+        happened meanwhile; returns (version, index), version None if not
+        stored.
+        """
+        vault_version = await vault_repo.get_version(user_id)
+        index = SearchIndex()
+        for entry in await vault_repo.get_by_user(user_id):
+            try:
+                decrypted = vault_crypto.decrypt_entry(entry["encrypted_data"], encryption_key)
+            except Exception as e:
+                logger.error("Failed to decrypt entry %s: %s", entry["id"], e)
+                continue
+            index.add(entry["id"], entry_fields(decrypted))
+        
+        version = await search_index_repo.insert(
+            user_id, vault_crypto.encrypt(index.to_json(), encryption_key), vault_version,
+        )
+        if version is not None:
+            logger.info("Built search index for user %s (%d entries)", user_id, len(index))
+        return version, index
+    
+    async def _load(self, user_id: str, encryption_key: bytes) -> Optional[Tuple[int, SearchIndex]]:
+        """The user's stored index as (version, index), or None if there is none."""
+        version = await search_index_repo.get_version(user_id)
+        if version is None:
+            return None
+        cached = self._cache.get(user_id)
+        if cached and cached[0] == version:
+            return cached
+        
+        row = await search_index_repo.get(user_id)
+        if not row:
+            return None
+        try:
+            index = SearchIndex.from_json(vault_crypto.decrypt(row["encrypted_index"], encryption_key))
+        except Exception as e:
+            # e.g. written under a data key replaced by a key upgrade
+            logger.warning("Discarding unreadable search index of user %s: %s", user_id, e)
+            await search_index_repo.delete(user_id)
+            return None
+        for entry_id in json.loads(row["deleted_ids"]):
+            index.remove(entry_id)
+        
+        self._remember(user_id, row["version"], index)
+        return row["version"], index
+    
+    async def search(
+        self,
+        user_id: str,
+        encryption_key: bytes,
+        query: str,
+        limit: int = 20,
+    ) -> List[VaultSearchResult]:
+        """Entries whose title, username or URL match `query`, best first."""
+        loaded = await self._load(user_id, encryption_key)
+        for _ in range(SAVE_ATTEMPTS):
+            if loaded is not None:
+                break
+            version, index = await self._build(user_id, encryption_key)
+            if version is None:
+                # The vault changed while building, or another request stored one first
+                loaded = await self._load(user_id, encryption_key)
+            else:
+                loaded = version, index
+                self._remember(user_id, version, index)
+        if loaded is None:
+            loaded = version, index  # vault kept changing; good for this query only
+        _, index = loaded
+        
+        results = []
+        for entry_id in index.search(query, limit):
+            title, username, url = index.docs[entry_id]
+            results.append(VaultSearchResult(id=entry_id, title=title, username=username or None, url=url or None))
+        return results
+    
+    async def _modify(self, user_id: str, encryption_key: bytes, change: Callable[[SearchIndex], None]):
+        for _ in range(SAVE_ATTEMPTS):
+            loaded = await self._load(user_id, encryption_key)
+            if loaded is None:
+                return  # built on the next search
+            version, index = loaded
+            change(index)
+            new_version = await search_index_repo.update(
+                user_id, vault_crypto.encrypt(index.to_json(), encryption_key), version,
+            )
+            if new_version is not None:
+                self._remember(user_id, new_version, index)
+                return
+            # Another worker wrote first; the cached copy may be ahead of the row
+            self._cache.pop(user_id)
+        
+        logger.warning("Search index of user %s kept changing, dropping it", user_id)
+        self._cache.pop(user_id)
+        await search_index_repo.delete(user_id)
+    
+    async def index_entry(self, user_id: str, encryption_key: bytes, entry_id: str, entry: dict):
+        """Add or refresh an entry after a vault write."""
+        fields = entry_fields(entry)
+        await self._modify(user_id, encryption_key, lambda index: index.add(entry_id, fields))
+    
+    async def remove_entry(self, user_id: str, entry_id: str):
+        """Drop a deleted entry (no key needed)."""
+        cached = self._cache.get(user_id)
+        version = await search_index_repo.add_deleted(user_id, entry_id)
+        if cached and version == cached[0] + 1:
+            cached[1].remove(entry_id)
+            self._remember(user_id, version, cached[1])
+
+
+# Global instance
+search_service = SearchService()
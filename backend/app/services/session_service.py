@@ -0,0 +1,230 @@
+"""Server-side sessions with in-memory revocation checks."""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import secrets
+import uuid
+from contextlib import suppress
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.db import session_repo, audit_repo
+from app.utils import get_logger
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+# Revocations are re-read with this overlap, so one committed late with an
+# earlier timestamp (another worker, small clock skew) is still picked up
+REFRESH_OVERLAP = timedelta(seconds=30)
+
+
+def hash_token(token: str) -> str:
+    """Hex SHA-256 of a token, as stored in sessions.token_hash."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+# Characters of the HMAC tag closing a refresh token's random part
+TAG_LENGTH = 22
+
+
+def _token_tag(session_id: str, generation: int, nonce: str) -> str:
+    message = f"{session_id}.{generation:d}.{nonce}".encode("utf-8")
+    digest = hmac.new(settings.SECRET_KEY.encode("utf-8"), message, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:16]).decode("ascii").rstrip("=")
+
+
+def make_refresh_token(session_id: str, generation: int) -> str:
+    """
+    Refresh tokens read ``<session id>.<generation>.<random><tag>``, the
+    tag being an HMAC of the rest under SECRET_KEY.
+    """
+    nonce = secrets.token_urlsafe(32)
+    return f"{session_id}.{generation:d}.{nonce}{_token_tag(session_id, generation, nonce)}"
+
+
+def parse_refresh_token(token: str) -> Optional[Tuple[str, int]]:
+    """(session id, generation), or None if the token is malformed."""
+    parts = token.split(".")
+    if len(parts) != 3 or not parts[1].isdigit():
+        return None
+    return parts[0], int(parts[1])
+
+
+def was_issued(token: str) -> bool:
+    """Whether this server made the token (its tag checks out), whatever its generation."""
+    session_id, generation, rest = token.split(".")
+    nonce, tag = rest[:-TAG_LENGTH], rest[-TAG_LENGTH:]
+    return bool(nonce) and hmac.compare_digest(tag, _token_tag(session_id, int(generation), nonce))
+
+
+class SessionService:
+    """
+    Tracks sign-ins in the ``sessions`` table.
+    
+    A session lives for REFRESH_TOKEN_EXPIRE_DAYS. It holds the hash of its
+    current refresh token, which is single use: each refresh replaces it
+    with the next generation. Presenting an older generation that this
+    server issued (refresh tokens carry an HMAC tag, so the session id seen
+    in an access token is not enough to fake one) means the token was
+    copied, so the whole session is revoked. The one just replaced is let
+    off for REFRESH_REUSE_GRACE_SECONDS after the rotation: that is two
+    tabs refreshing at once, and the late one is only refused.
+    
+    Every access token carries its session id (``sid`` claim). Checking
+    it costs a dict lookup and never touches the database: each worker
+    keeps the ids of revoked, unexpired sessions in memory, and a
+    background task pulls revocations newer than the last one it saw every
+    SESSION_REVOCATION_REFRESH_SECONDS. A revocation applies at once in the
+    worker that made it and within that interval elsewhere.
+    """
+    
+    def __init__(self):
+        self._revoked: Dict[str, str] = {}  # session id -> when it can be forgotten
+        self._watermark = ""  # newest revoked_at read from the database
+        self._task: Optional[asyncio.Task] = None
+        self._access_lifetime = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    
+    async def create(
+        self,
+        user_id: str,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+    ) -> Tuple[str, str]:
+        """Start a session; returns (session id, refresh token)."""
+        session_id = str(uuid.uuid4())
+        refresh_token = make_refresh_token(session_id, 0)
+        expires_at = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        
+        await session_repo.create(
+            session_id=session_id,
+            user_id=user_id,
+            token_hash=hash_token(refresh_token),
+            expires_at=expires_at.isoformat(),
+            ip_address=ip_address,
+            user_agent=user_agent,
+        )
+        return session_id, refresh_token
+    
+    async def rotate(
+        self,
+        refresh_token: str,
+        ip_address: Optional[str] = None,
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Exchange a refresh token for the next one.
+        
+        Returns (session, new refresh token), or (None, None) if the token
+        is not the session's current one.
+        """
+        parsed = parse_refresh_token(refresh_token)
+        if not parsed:
+            return None, None
+        session_id, generation = parsed
+        
+        session = await session_repo.get_by_id(session_id)
+        if not session or session["revoked_at"] or session["expires_at"] <= datetime.utcnow().isoformat():
+            return None, None
+        
+        token_hash = hash_token(refresh_token)
+        if generation < session["refresh_generation"]:
+            if not was_issued(refresh_token):
+                return None, None
+            if generation == session["refresh_generation"] - 1 and self._just_rotated(session):
+                return None, None
+            await self.revoke([session_id])
+            await audit_repo.log(
+                action="refresh_token_reused",
+                user_id=session["user_id"],
+                ip_address=ip_address,
+            )
+            logger.warning("Refresh token reused, revoked session %s", session_id)
+            return None, None
+        if generation != session["refresh_generation"] or not hmac.compare_digest(token_hash, session["token_hash"]):
+            return None, None
+        
+        new_token = make_refresh_token(session_id, generation + 1)
+        if not await session_repo.rotate(session_id, generation, token_hash, hash_token(new_token)):
+            return None, None  # lost a race with a concurrent refresh
+        return session, new_token
+    
+    def _just_rotated(self, session: Dict[str, Any]) -> bool:
+        if not session["rotated_at"]:
+            return False
+        grace = timedelta(seconds=settings.REFRESH_REUSE_GRACE_SECONDS)
+        return datetime.fromisoformat(session["rotated_at"]) + grace > datetime.utcnow()
+    
+    def is_revoked(self, session_id: str) -> bool:
+        return session_id in self._revoked
+    
+    async def refresh(self):
+        """Load revocations made since the last refresh."""
+        # Older revocations only matter while their access tokens live
+        since = (datetime.utcnow() - self._access_lifetime).isoformat()
+        if self._watermark:
+            since = max(since, (datetime.fromisoformat(self._watermark) - REFRESH_OVERLAP).isoformat())
+        
+        for row in await session_repo.get_revoked_since(since):
+            revoked_at = datetime.fromisoformat(row["revoked_at"])
+            self._revoked[row["id"]] = (revoked_at + self._access_lifetime).isoformat()
+            self._watermark = max(self._watermark, row["revoked_at"])
+    
+    async def revoke(self, session_ids: List[str]) -> int:
+        """Revoke sessions; returns how many were still active."""
+        now = datetime.utcnow()
+        count = await session_repo.revoke(session_ids, now.isoformat())
+        
+        # Access tokens issued before now are expired by then
+        forget_at = (now + self._access_lifetime).isoformat()
+        for session_id in session_ids:
+            self._revoked.setdefault(session_id, forget_at)
+        return count
+    
+    async def revoke_user(self, user_id: str, keep: Optional[str] = None) -> int:
+        """Revoke every active session of a user, except `keep`."""
+        sessions = await session_repo.get_active_for_user(user_id)
+        return await self.revoke([s["id"] for s in sessions if s["id"] != keep])
+    
+    async def prune(self) -> int:
+        """Forget revocations whose access tokens have all expired (per worker)."""
+        now = datetime.utcnow().isoformat()
+        expired = [sid for sid, until in self._revoked.items() if until <= now]
+        for session_id in expired:
+            del self._revoked[session_id]
+        return len(expired)
+    
+    async def cleanup(self) -> int:
+        """Delete sessions whose refresh token has expired."""
+        count = await session_repo.delete_expired(datetime.utcnow().isoformat())
+        if count:
+            logger.info("Deleted %d expired sessions", count)
+        return count
+    
+    # ============== Lifecycle ==============
+    
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(settings.SESSION_REVOCATION_REFRESH_SECONDS)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Loading session revocations failed")
+    
+    async def start(self):
+        """Load current revocations, then keep pulling new ones."""
+        await self.refresh()
+        self._task = asyncio.create_task(self._refresh_loop())
+    
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+# Global instance
+session_service = SessionService()
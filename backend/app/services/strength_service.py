@@ -3,6 +3,7 @@
 import re
 import math
 from typing import List, Tuple
+from app.utils.metrics import strength_analysis_duration, timed
 
 
 # Common passwords list (abbreviated - in production, use a larger list)
@@ -75,6 +76,7 @@ class StrengthService:
                 return True
         return False
     
+    @timed(strength_analysis_duration)
     def analyze(self, password: str) -> Tuple[int, str, List[str]]:
         """
         Analyze password strength.
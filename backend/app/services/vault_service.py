@@ -1,15 +1,102 @@
 """Vault service for password management."""
 
-from typing import Optional, List, Dict, Any
-from app.crypto import vault_crypto
+import time
+from typing import Callable, Optional, List, Dict, Any, Tuple
+from app.config import get_settings
+from app.crypto import key_manager, vault_crypto
 from app.db import vault_repo, audit_repo
 from app.db.models import VaultEntryCreate, VaultEntryUpdate, VaultEntryResponse, VaultEntryDetail
+from app.services.password_service import password_service
+from app.services.event_service import event_service
+from app.services.search_service import search_service
 from app.services.strength_service import strength_service
-from app.utils import logger
+from app.utils import LRUCache, get_logger
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+# Rough per-summary memory (model instance, dict slot, timestamps) besides its text
+SUMMARY_OVERHEAD_BYTES = 600
+
+Summaries = Dict[str, VaultEntryResponse]
+
+
+def _summary_size(summary: VaultEntryResponse) -> int:
+    return SUMMARY_OVERHEAD_BYTES + sum(
+        len(text or "") for text in (summary.title, summary.username, summary.url, summary.category)
+    )
 
 
 class VaultService:
-    """Handles vault entry CRUD operations with encryption."""
+    """
+    Handles vault entry CRUD operations with encryption.
+    
+    List views are served from a cache of decrypted entry summaries (no
+    passwords or notes), one slot per user, evicted least recently used
+    across users once the approximate total size reaches
+    VAULT_SUMMARY_CACHE_MB. A slot is tagged with the user's
+    ``vault_version``, which every write bumps: writes here patch the
+    slot in place, and a version that moved otherwise (another worker)
+    means the slot is rebuilt.
+    """
+    
+    def __init__(self):
+        self._summaries = LRUCache("vault_summaries", settings.VAULT_SUMMARY_CACHE_MB * 1024 * 1024)
+    
+    def _remember(self, user_id: str, version: int, summaries: Summaries):
+        self._summaries.set(
+            user_id,
+            (version, summaries),
+            time.time() + settings.VAULT_SUMMARY_CACHE_SECONDS,
+            weight=sum(_summary_size(summary) for summary in summaries.values()),
+        )
+    
+    async def _written(
+        self,
+        user_id: str,
+        event: str,
+        entry_id: str,
+        change: Callable[[Summaries], Summaries],
+    ) -> int:
+        """
+        Bump the vault version after a write, patch the cached summaries
+        and notify the user's other devices; returns the new version.
+        """
+        version = await vault_repo.bump_version(user_id)
+        cached = self._summaries.get(user_id)
+        if cached and cached[0] == version - 1:
+            self._remember(user_id, version, change(cached[1]))
+        else:
+            self._summaries.pop(user_id)
+        await event_service.publish(user_id, event, entry_id, version)
+        return version
+    
+    def _fingerprint(self, password: str, encryption_key: bytes) -> str:
+        return password_service.fingerprint(password, key_manager.derive_fingerprint_key(encryption_key))
+    
+    async def ensure_fingerprints(self, user_id: str, encryption_key: bytes) -> int:
+        """
+        Fingerprint entries that have none yet (written before fingerprints
+        existed, or re-encrypted by a key upgrade). Returns how many were set.
+        """
+        entries = await vault_repo.get_missing_fingerprints(user_id)
+        if not entries:
+            return 0
+        
+        fingerprint_key = key_manager.derive_fingerprint_key(encryption_key)
+        fingerprints = []
+        for entry in entries:
+            try:
+                decrypted = vault_crypto.decrypt_entry(entry["encrypted_data"], encryption_key)
+            except Exception as e:
+                logger.error("Failed to decrypt entry %s: %s", entry["id"], e)
+                continue
+            password = decrypted.get("password", "")
+            fingerprints.append((entry["id"], password_service.fingerprint(password, fingerprint_key)))
+        
+        stored = await vault_repo.set_fingerprints(user_id, fingerprints)
+        logger.info("Fingerprinted %d vault entries for user %s", stored, user_id)
+        return stored
     
     async def add_entry(
         self,
@@ -17,8 +104,8 @@ class VaultService:
         data: VaultEntryCreate,
         encryption_key: bytes,
         ip_address: Optional[str] = None,
-    ) -> VaultEntryDetail:
-        """Add a new vault entry."""
+    ) -> Tuple[VaultEntryDetail, int]:
+        """Add a new vault entry; returns it with the new vault version."""
         # Prepare entry data
         entry_data = {
             "title": data.title,
@@ -37,8 +124,8 @@ class VaultService:
             encrypted_data=encrypted_data,
             category=data.category,
             favorite=data.favorite,
+            password_fingerprint=self._fingerprint(data.password, encryption_key),
         )
-        
         # Log audit
         await audit_repo.log(
             action="vault_entry_added",
@@ -47,12 +134,12 @@ class VaultService:
             ip_address=ip_address,
         )
         
-        logger.info(f"Vault entry added for user {user_id}")
+        logger.info("Vault entry added for user %s", user_id)
         
         # Calculate strength
         score, _, _ = strength_service.analyze(data.password)
         
-        return VaultEntryDetail(
+        detail = VaultEntryDetail(
             id=entry["id"],
             title=data.title,
             username=data.username,
@@ -65,13 +152,31 @@ class VaultService:
             created_at=entry["created_at"],
             updated_at=entry["updated_at"],
         )
+        
+        # Newest first, as listed
+        summary = VaultEntryResponse(**detail.model_dump(exclude={"password", "notes"}))
+        version = await self._written(
+            user_id, "entry_added", summary.id,
+            lambda summaries: {summary.id: summary, **summaries},
+        )
+        # After the version bump, so an index build running meanwhile is not stored
+        await search_service.index_entry(user_id, encryption_key, entry["id"], entry_data)
+        return detail, version
     
     async def get_entries(
         self,
         user_id: str,
         encryption_key: bytes,
-    ) -> List[VaultEntryResponse]:
-        """Get all vault entries for a user (without passwords)."""
+    ) -> Tuple[List[VaultEntryResponse], int]:
+        """
+        Get all vault entries for a user (without passwords), with the
+        vault version they include every write up to.
+        """
+        version = await vault_repo.get_version(user_id)
+        cached = self._summaries.get(user_id)
+        if cached and cached[0] == version:
+            return list(cached[1].values()), version
+        
         entries = await vault_repo.get_by_user(user_id)
         result = []
         
@@ -94,10 +199,11 @@ class VaultService:
                     updated_at=entry["updated_at"],
                 ))
             except Exception as e:
-                logger.error(f"Failed to decrypt entry {entry['id']}: {e}")
+                logger.error("Failed to decrypt entry %s: %s", entry["id"], e)
                 continue
         
-        return result
+        self._remember(user_id, version, {summary.id: summary for summary in result})
+        return result, version
     
     async def get_entry(
         self,
@@ -106,7 +212,7 @@ class VaultService:
         encryption_key: bytes,
     ) -> Optional[VaultEntryDetail]:
         """Get a single vault entry with password."""
-        entry = await vault_repo.get_by_id(entry_id)
+        entry = await vault_repo.get_by_id(entry_id, user_id)
         
         if not entry or entry["user_id"] != user_id:
             return None
@@ -130,7 +236,7 @@ class VaultService:
                 updated_at=entry["updated_at"],
             )
         except Exception as e:
-            logger.error(f"Failed to decrypt entry {entry_id}: {e}")
+            logger.error("Failed to decrypt entry %s: %s", entry_id, e)
             return None
     
     async def update_entry(
@@ -140,9 +246,9 @@ class VaultService:
         data: VaultEntryUpdate,
         encryption_key: bytes,
         ip_address: Optional[str] = None,
-    ) -> Optional[VaultEntryDetail]:
-        """Update a vault entry."""
-        entry = await vault_repo.get_by_id(entry_id)
+    ) -> Optional[Tuple[VaultEntryDetail, int]]:
+        """Update a vault entry; returns it with the new vault version."""
+        entry = await vault_repo.get_by_id(entry_id, user_id)
         
         if not entry or entry["user_id"] != user_id:
             return None
@@ -171,11 +277,12 @@ class VaultService:
         # Update in database
         updated = await vault_repo.update(
             entry_id=entry_id,
+            user_id=user_id,
             encrypted_data=encrypted_data,
             category=data.category if data.category is not None else entry["category"],
             favorite=data.favorite if data.favorite is not None else bool(entry["favorite"]),
+            password_fingerprint=self._fingerprint(existing.get("password", ""), encryption_key),
         )
-        
         # Log audit
         await audit_repo.log(
             action="vault_entry_updated",
@@ -186,7 +293,7 @@ class VaultService:
         
         score, _, _ = strength_service.analyze(existing.get("password", ""))
         
-        return VaultEntryDetail(
+        detail = VaultEntryDetail(
             id=updated["id"],
             title=existing.get("title", ""),
             username=existing.get("username"),
@@ -199,30 +306,42 @@ class VaultService:
             created_at=updated["created_at"],
             updated_at=updated["updated_at"],
         )
+        
+        summary = VaultEntryResponse(**detail.model_dump(exclude={"password", "notes"}))
+        version = await self._written(
+            user_id, "entry_updated", summary.id,
+            lambda summaries: {**summaries, summary.id: summary},
+        )
+        await search_service.index_entry(user_id, encryption_key, entry_id, existing)
+        return detail, version
     
     async def delete_entry(
         self,
         entry_id: str,
         user_id: str,
         ip_address: Optional[str] = None,
-    ) -> bool:
-        """Delete a vault entry."""
-        entry = await vault_repo.get_by_id(entry_id)
+    ) -> Optional[int]:
+        """Delete a vault entry; returns the new vault version, None if not found."""
+        entry = await vault_repo.get_by_id(entry_id, user_id)
         
         if not entry or entry["user_id"] != user_id:
-            return False
-        
-        result = await vault_repo.delete(entry_id)
+            return None
         
-        if result:
-            await audit_repo.log(
-                action="vault_entry_deleted",
-                user_id=user_id,
-                details=f"Entry: {entry_id}",
-                ip_address=ip_address,
-            )
+        if not await vault_repo.delete(entry_id, user_id):
+            return None
         
-        return result
+        version = await self._written(
+            user_id, "entry_deleted", entry_id,
+            lambda summaries: {key: value for key, value in summaries.items() if key != entry_id},
+        )
+        await search_service.remove_entry(user_id, entry_id)
+        await audit_repo.log(
+            action="vault_entry_deleted",
+            user_id=user_id,
+            details=f"Entry: {entry_id}",
+            ip_address=ip_address,
+        )
+        return version
 
 
 # Global instance
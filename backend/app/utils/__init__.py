@@ -1,4 +1,6 @@
-from .logger import logger, setup_logger
+from .logger import logger, setup_logger, get_logger, request_id_var
+from .responses import model_list_response
+from .cache import LRUCache
 from .validators import (
     validate_email,
     validate_master_password,
@@ -10,6 +12,10 @@ from .validators import (
 __all__ = [
     "logger",
     "setup_logger",
+    "get_logger",
+    "request_id_var",
+    "model_list_response",
+    "LRUCache",
     "validate_email",
     "validate_master_password",
     "validate_username",
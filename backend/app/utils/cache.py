@@ -0,0 +1,64 @@
+"""Small in-process caches."""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from app.utils.metrics import cache_requests_total, cache_entries
+
+
+class LRUCache:
+    """
+    Bounded least-recently-used cache whose entries also expire.
+    
+    Every entry carries its own deadline (a ``time.time()`` timestamp) and
+    is dropped when looked up past it; when the cache is full the least
+    recently used entry is evicted. `maxsize` bounds the total weight of
+    the entries, 1 each unless ``set`` is given another (e.g. a size in
+    bytes). Hits, misses and size are exported as metrics under the cache's
+    name. Not thread-safe: use it from the event loop.
+    """
+    
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self.weight = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any, int]]" = OrderedDict()
+        self._hits = cache_requests_total.labels(name, "hit")
+        self._misses = cache_requests_total.labels(name, "miss")
+        cache_entries.labels(name).set_function(self.__len__)
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Cached value, or None if missing or expired."""
+        entry = self._data.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                self._data.move_to_end(key)
+                self._hits.inc()
+                return entry[1]
+            self.pop(key)
+        self._misses.inc()
+        return None
+    
+    def set(self, key: Hashable, value: Any, expires_at: float, weight: int = 1):
+        """Store a value until `expires_at`."""
+        self.pop(key)
+        if weight > self.maxsize:
+            return
+        self._data[key] = (expires_at, value, weight)
+        self.weight += weight
+        while self.weight > self.maxsize:
+            _, (_, _, evicted) = self._data.popitem(last=False)
+            self.weight -= evicted
+    
+    def pop(self, key: Hashable):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.weight -= entry[2]
+    
+    def clear(self):
+        self._data.clear()
+        self.weight = 0
@@ -0,0 +1,80 @@
+"""Minimal five-field cron expressions (UTC)."""
+
+from datetime import datetime, timedelta
+from typing import FrozenSet, Tuple
+
+# (low, high) for minute, hour, day of month, month, day of week (0 = Sunday)
+FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+
+def _parse_field(field: str, low: int, high: int) -> FrozenSet[int]:
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"Invalid cron step: {field}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron field out of range: {field}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronSchedule:
+    """
+    ``minute hour day-of-month month day-of-week``, e.g. ``30 3 * * *``.
+    
+    Supports ``*``, numbers, ranges (``1-5``), lists (``0,30``) and steps
+    (``*/15``). As in cron, when both day fields are restricted a day
+    matching either one is used. Day of week 7 is not accepted; use 0.
+    """
+    
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        parsed: Tuple[FrozenSet[int], ...] = tuple(
+            _parse_field(field, low, high)
+            for field, (low, high) in zip(fields, FIELD_RANGES)
+        )
+        self.minutes, self.hours, self.days, self.months, self.weekdays = parsed
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+    
+    def _day_matches(self, t: datetime) -> bool:
+        in_days = t.day in self.days
+        in_weekdays = (t.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+    
+    def next_after(self, after: datetime) -> datetime:
+        """First matching minute strictly after `after`."""
+        t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=366 * 5)
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+    
+    def __repr__(self):
+        return f"<CronSchedule {self.expression}>"
@@ -1,8 +1,27 @@
 """Structured logging configuration."""
 
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
-from datetime import datetime
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+
+ROOT_LOGGER_NAME = "samurai_vault"
+
+# Request id of the request being handled (set by RequestIdMiddleware)
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Standard LogRecord attributes, excluded when collecting `extra` fields
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "request_id"}
 
 
 class ColoredFormatter(logging.Formatter):
@@ -19,39 +38,161 @@ class ColoredFormatter(logging.Formatter):
     
     def format(self, record):
         color = self.COLORS.get(record.levelname, self.RESET)
+        record = logging.makeLogRecord(record.__dict__)
         record.levelname = f"{color}{record.levelname}{self.RESET}"
         return super().format(record)
 
 
-def setup_logger(name: str = "samurai_vault") -> logging.Logger:
-    """Set up and return a configured logger."""
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, including request id and `extra` fields."""
+    
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "module": record.module,
+            "line": record.lineno,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach the current request id (runs in the calling thread/context)."""
+    
+    def filter(self, record):
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of INFO-and-below records per module.
+    
+    Rates are keyed by logger name relative to the root logger
+    (e.g. ``services.vault_service``); the longest matching prefix wins.
+    Warnings and errors are never sampled out.
+    """
+    
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = dict(rates)
+        self._cache: Dict[str, float] = {}
+    
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            relative = name[len(ROOT_LOGGER_NAME) + 1:] if name.startswith(ROOT_LOGGER_NAME + ".") else name
+            rate = 1.0
+            best = -1
+            for prefix, value in self.rates.items():
+                if (relative == prefix or relative.startswith(prefix + ".")) and len(prefix) > best:
+                    rate, best = value, len(prefix)
+            self._cache[name] = rate
+        return rate
+    
+    def filter(self, record):
+        if record.levelno > logging.INFO:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue records without formatting them.
+    
+    The stock QueueHandler renders the message in the calling thread;
+    here `%`-style arguments are left in place so interpolation, JSON
+    encoding and I/O all happen on the listener thread.
+    """
+    
+    def prepare(self, record):
+        return record
+
+
+def _build_file_handler() -> logging.Handler:
+    if settings.LOG_ROTATION == "time":
+        return logging.handlers.TimedRotatingFileHandler(
+            settings.LOG_FILE,
+            when=settings.LOG_ROTATE_WHEN,
+            backupCount=settings.LOG_BACKUP_COUNT,
+            encoding="utf-8",
+        )
+    return logging.handlers.RotatingFileHandler(
+        settings.LOG_FILE,
+        maxBytes=settings.LOG_MAX_BYTES,
+        backupCount=settings.LOG_BACKUP_COUNT,
+        encoding="utf-8",
+    )
+
+
+def setup_logger(name: str = ROOT_LOGGER_NAME) -> logging.Logger:
+    """
+    Set up and return a configured logger.
+    
+    Records go through an in-memory queue to a listener thread that owns
+    the (possibly slow) console and rotating file handlers, so logging
+    never blocks the event loop on I/O.
+    """
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(settings.LOG_LEVEL.upper())
+    logger.propagate = False
+    
+    if logger.handlers:
+        return logger
+    
+    json_output = settings.LOG_FORMAT == "json"
     
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
-    console_format = ColoredFormatter(
-        '%(asctime)s | %(levelname)s | %(name)s | %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    console_handler.setFormatter(console_format)
+    if json_output:
+        console_handler.setFormatter(JSONFormatter())
+    else:
+        console_handler.setFormatter(ColoredFormatter(
+            '%(asctime)s | %(levelname)s | %(name)s | %(request_id)s | %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        ))
+    handlers = [console_handler]
     
     # File handler
-    file_handler = logging.FileHandler('app.log')
-    file_handler.setLevel(logging.DEBUG)
-    file_format = logging.Formatter(
-        '%(asctime)s | %(levelname)s | %(name)s | %(funcName)s:%(lineno)d | %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    file_handler.setFormatter(file_format)
+    if settings.LOG_FILE:
+        file_handler = _build_file_handler()
+        if json_output:
+            file_handler.setFormatter(JSONFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter(
+                '%(asctime)s | %(levelname)s | %(name)s | %(funcName)s:%(lineno)d | %(request_id)s | %(message)s',
+                datefmt='%Y-%m-%d %H:%M:%S'
+            ))
+        handlers.append(file_handler)
+    
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATES))
+    queue_handler.addFilter(RequestContextFilter())
+    logger.addHandler(queue_handler)
     
-    if not logger.handlers:
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
     
     return logger
 
 
+def get_logger(module_name: str) -> logging.Logger:
+    """Get a per-module child logger, e.g. get_logger(__name__)."""
+    if module_name.startswith("app."):
+        module_name = module_name[len("app."):]
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{module_name}")
+
+
 # Global logger instance
 logger = setup_logger()
@@ -0,0 +1,422 @@
+"""Low-overhead in-process metrics with Prometheus text exposition."""
+
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# Latency buckets in seconds, from sub-millisecond DB reads up to Argon2 runs
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class _ThreadCells:
+    """
+    Per-thread value arrays.
+    
+    Every writing thread gets its own list, so recording an event never
+    takes a lock or contends with other threads. Readers sum all arrays.
+    """
+    
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._cells: List[List[float]] = []
+        self._register_lock = threading.Lock()
+    
+    def get(self) -> List[float]:
+        """Return the calling thread's value array."""
+        try:
+            return self._local.cells
+        except AttributeError:
+            cells = [0.0] * self._size
+            with self._register_lock:
+                self._cells.append(cells)
+            self._local.cells = cells
+            return cells
+    
+    def snapshot(self) -> List[float]:
+        """Sum values across all threads."""
+        total = [0.0] * self._size
+        for cells in list(self._cells):
+            for i, value in enumerate(cells):
+                total[i] += value
+        return total
+
+
+class _CounterChild(_ThreadCells):
+    """Counter for a single label combination."""
+    
+    def __init__(self):
+        super().__init__(1)
+    
+    def inc(self, amount: float = 1.0):
+        """Increment the counter."""
+        try:
+            cells = self._local.cells
+        except AttributeError:
+            cells = self.get()
+        cells[0] += amount
+    
+    @property
+    def value(self) -> float:
+        return self.snapshot()[0]
+
+
+class _GaugeChild:
+    """Gauge for a single label combination."""
+    
+    def __init__(self):
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+    
+    def set(self, value: float):
+        """Set the gauge to a value."""
+        self._value = value
+    
+    def set_function(self, function: Callable[[], float]):
+        """Read the gauge value from a callable at scrape time."""
+        self._function = function
+    
+    @property
+    def value(self) -> float:
+        if self._function is not None:
+            return float(self._function())
+        return self._value
+
+
+class _HistogramChild(_ThreadCells):
+    """Histogram for a single label combination."""
+    
+    def __init__(self, buckets: Sequence[float]):
+        self._buckets = tuple(buckets)
+        # Layout: one slot per bucket, then +Inf, count and sum
+        super().__init__(len(self._buckets) + 3)
+    
+    def observe(self, value: float):
+        """Record a single observation."""
+        try:
+            cells = self._local.cells
+        except AttributeError:
+            cells = self.get()
+        cells[bisect_left(self._buckets, value)] += 1
+        cells[-2] += 1
+        cells[-1] += value
+    
+    def time(self) -> "_Timer":
+        """Time a block of code in seconds."""
+        return _Timer(self)
+    
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        """Return (per-bucket counts incl. +Inf, count, sum)."""
+        values = super().snapshot()
+        return values[:-2], values[-2], values[-1]
+
+
+class _Timer:
+    """Context manager observing elapsed wall time into a histogram."""
+    
+    __slots__ = ("_histogram", "_start")
+    
+    def __init__(self, histogram: _HistogramChild):
+        self._histogram = histogram
+    
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start)
+        return False
+
+
+class _Metric:
+    """Base class for labelled metric families."""
+    
+    TYPE = ""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+    
+    def _new_child(self):
+        raise NotImplementedError
+    
+    def labels(self, *values: str):
+        """Get (or create) the child for a label combination."""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+    
+    def _label_str(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [
+            f'{name}="{_escape(value)}"'
+            for name, value in zip(self.labelnames, values)
+        ]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+    
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.TYPE}",
+        ]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+    
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}{self._label_str(values)} {_format(child.value)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+    
+    TYPE = "counter"
+    
+    def _new_child(self):
+        return _CounterChild()
+    
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+    
+    TYPE = "gauge"
+    
+    def _new_child(self):
+        return _GaugeChild()
+    
+    def set(self, value: float):
+        self._default.set(value)
+    
+    def set_function(self, function: Callable[[], float]):
+        self._default.set_function(function)
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observations."""
+    
+    TYPE = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+    
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+    
+    def observe(self, value: float):
+        self._default.observe(value)
+    
+    def time(self) -> _Timer:
+        return self._default.time()
+    
+    def _render_child(self, values, child) -> List[str]:
+        counts, count, total = child.snapshot()
+        lines = []
+        cumulative = 0.0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else _format(bound)
+            labels = self._label_str(values, f'le="{le}"')
+            lines.append(f"{self.name}_bucket{labels} {_format(cumulative)}")
+        lines.append(f"{self.name}_count{self._label_str(values)} {_format(count)}")
+        lines.append(f"{self.name}_sum{self._label_str(values)} {_format(total)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+    
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+    
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+    
+    def render(self) -> str:
+        """Render all metrics in Prometheus text format (v0.0.4)."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def timed(histogram) -> Callable:
+    """Decorator observing a function's duration into a histogram (child)."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+            return async_wrapper
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+# Global registry
+registry = MetricsRegistry()
+
+# Hot-path instruments shared across the app
+http_request_duration = registry.histogram(
+    "samurai_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("method", "route"),
+)
+http_requests_total = registry.counter(
+    "samurai_http_requests_total",
+    "HTTP requests by route and status",
+    ("method", "route", "status"),
+)
+key_derivation_duration = registry.histogram(
+    "samurai_key_derivation_seconds",
+    "Argon2id key derivation latency",
+)
+vault_crypto_duration = registry.histogram(
+    "samurai_vault_crypto_seconds",
+    "AES-GCM encrypt/decrypt latency",
+    ("operation",),
+)
+strength_analysis_duration = registry.histogram(
+    "samurai_strength_analysis_seconds",
+    "Password strength analysis latency",
+)
+hibp_request_duration = registry.histogram(
+    "samurai_hibp_request_seconds",
+    "HIBP range API latency",
+)
+hibp_requests_total = registry.counter(
+    "samurai_hibp_requests_total",
+    "HIBP range API calls by outcome",
+    ("outcome",),
+)
+db_query_duration = registry.histogram(
+    "samurai_db_query_seconds",
+    "SQLite query latency by statement",
+    ("statement",),
+)
+audit_rows_archived = registry.counter(
+    "samurai_audit_rows_archived_total",
+    "Audit log rows moved to archive segments",
+)
+cache_requests_total = registry.counter(
+    "samurai_cache_requests_total",
+    "In-process cache lookups by cache and result (hit/miss)",
+    ("cache", "result"),
+)
+cache_entries = registry.gauge(
+    "samurai_cache_entries",
+    "Entries held by each in-process cache",
+    ("cache",),
+)
+job_duration = registry.histogram(
+    "samurai_job_duration_seconds",
+    "Scheduled job run time",
+    ("job",),
+)
+job_runs_total = registry.counter(
+    "samurai_job_runs_total",
+    "Scheduled job runs by outcome",
+    ("job", "status"),
+)
+scheduler_leader = registry.gauge(
+    "samurai_scheduler_leader",
+    "1 if this worker holds the scheduler lease",
+)
+vault_event_subscribers = registry.gauge(
+    "samurai_vault_event_subscribers",
+    "Open /api/vault/events streams in this worker",
+)
+vault_events_published = registry.counter(
+    "samurai_vault_events_published_total",
+    "Vault change events published by this worker",
+    ("type",),
+)
+backup_last_success = registry.gauge(
+    "samurai_backup_last_success_timestamp_seconds",
+    "Unix time of the newest complete database snapshot",
+)
+admission_in_flight = registry.gauge(
+    "samurai_admission_in_flight",
+    "CPU-heavy requests holding an admission slot in this worker",
+)
+admission_queued = registry.gauge(
+    "samurai_admission_queued",
+    "CPU-heavy requests waiting for an admission slot in this worker",
+)
+admission_wait_duration = registry.histogram(
+    "samurai_admission_wait_seconds",
+    "Time CPU-heavy requests queued for an admission slot",
+    ("kind",),
+)
+admission_rejected_total = registry.counter(
+    "samurai_admission_rejected_total",
+    "CPU-heavy requests refused with 503 by kind and reason (predicted/timeout)",
+    ("kind", "reason"),
+)
@@ -0,0 +1,140 @@
+"""In-memory substring and word-prefix search over short text fields."""
+
+import bisect
+import json
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+SEPARATOR = "\x00"
+
+# Queries shorter than this match the start of a word rather than anywhere
+MIN_SUBSTRING_QUERY = 3
+
+
+Finder = Callable[[str, int], int]
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _word_start_finder(word: str) -> Finder:
+    """
+    A str.find-like function for `word` at the start of a word. (Plain
+    find plus a look at the previous character is an order of magnitude
+    faster than a regex lookbehind, which defeats re's literal scan.)
+    """
+    def find(text: str, position: int) -> int:
+        at = text.find(word, position)
+        while at > 0 and _is_word_char(text[at - 1]):
+            at = text.find(word, at + 1)
+        return at
+    return find
+
+
+def _offsets(parts: List[str]) -> List[int]:
+    offsets, offset = [], 0
+    for part in parts:
+        offsets.append(offset)
+        offset += len(part)
+    return offsets
+
+
+class SearchIndex:
+    """
+    Case-insensitive search over a few fields per document.
+    
+    Documents are kept sorted by their first field (the title) and
+    case-folded into two separator-delimited strings, one of titles and
+    one of all fields, that ``str.find`` scans at C speed. Matches come
+    out in title order, so a search scans for title prefixes, then title
+    words, then anything else, and stops once it has `limit` results: the
+    cost is a few passes over the text plus a step per result, however
+    many documents match. (Per-trigram posting sets took
+    about a second and tens of MB to build for a 10k-entry vault.) The
+    strings are rebuilt lazily after changes; only the documents are
+    serialized (``to_json``).
+    """
+    
+    def __init__(self):
+        self.docs: Dict[str, Tuple[str, ...]] = {}
+        self._ids: List[str] = []
+        self._titles = ""
+        self._title_starts: List[int] = []
+        self._text = ""
+        self._text_starts: List[int] = []
+        self._stale = False
+    
+    def __len__(self) -> int:
+        return len(self.docs)
+    
+    def add(self, doc_id: str, fields: Iterable[Optional[str]]):
+        """Index (or re-index) a document's fields."""
+        self.docs[doc_id] = tuple((field or "").replace(SEPARATOR, "") for field in fields)
+        self._stale = True
+    
+    def remove(self, doc_id: str):
+        if self.docs.pop(doc_id, None) is not None:
+            self._stale = True
+    
+    def _rebuild(self):
+        folded = {doc_id: tuple(field.casefold() for field in fields) for doc_id, fields in self.docs.items()}
+        self._ids = sorted(folded, key=lambda doc_id: (folded[doc_id][0], doc_id))
+        titles = [SEPARATOR + folded[doc_id][0] for doc_id in self._ids]
+        texts = [SEPARATOR + SEPARATOR.join(folded[doc_id]) for doc_id in self._ids]
+        self._titles, self._title_starts = "".join(titles), _offsets(titles)
+        self._text, self._text_starts = "".join(texts), _offsets(texts)
+        self._stale = False
+    
+    def _scan(self, text: str, starts: List[int], find: Finder) -> Iterator[str]:
+        """Ids of documents in `text` where `find` hits, in title order."""
+        position = 0
+        while True:
+            at = find(text, position)
+            if at < 0:
+                return
+            i = bisect.bisect_right(starts, at) - 1
+            yield self._ids[i]
+            if i + 1 == len(starts):
+                return
+            position = starts[i + 1]
+    
+    def search(self, query: str, limit: int = 20) -> List[str]:
+        """
+        Ids of matching documents, best first: title starting with the
+        query, then a title word starting with it, then any other match;
+        ties in title order.
+        """
+        text = query.strip().casefold().replace(SEPARATOR, "")
+        if not text or limit < 1:
+            return []
+        if self._stale:
+            self._rebuild()
+        
+        prefix = SEPARATOR + text
+        word_start = _word_start_finder(text)
+        substring: Finder = lambda haystack, position: haystack.find(text, position)
+        tiers = (
+            (self._titles, self._title_starts, lambda haystack, position: haystack.find(prefix, position)),
+            (self._titles, self._title_starts, word_start),
+            (self._text, self._text_starts, word_start if len(text) < MIN_SUBSTRING_QUERY else substring),
+        )
+        results: List[str] = []
+        seen = set()
+        for haystack, starts, find in tiers:
+            for doc_id in self._scan(haystack, starts, find):
+                if doc_id not in seen:
+                    seen.add(doc_id)
+                    results.append(doc_id)
+                    if len(results) == limit:
+                        return results
+        return results
+    
+    def to_json(self) -> str:
+        return json.dumps({"docs": self.docs}, ensure_ascii=False, separators=(",", ":"))
+    
+    @classmethod
+    def from_json(cls, data: str) -> "SearchIndex":
+        index = cls()
+        for doc_id, fields in json.loads(data)["docs"].items():
+            index.add(doc_id, fields)
+        return index
@@ -0,0 +1,399 @@
+"""
+End-to-end API load test.
+
+Starts ``app.main:app`` under uvicorn against a temporary SQLite file,
+seeds synthetic users and vaults, drives a weighted mix of API calls
+from concurrent clients and prints throughput and latency percentiles
+as JSON. HIBP is replaced by a local stand-in server, so the run is
+fully offline.
+
+Usage (from ``backend/``):
+    
+    python -m benchmarks.api_bench --users 4 --entries 1000 \\
+        --concurrency 16 --requests 2000 --output results.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_MIX = "list=35,get=25,add=10,update=10,dashboard=10,login=5,register=2,breach=3"
+DEFAULT_MIX_OPS = [part.split("=")[0] for part in DEFAULT_MIX.split(",")]
+MASTER_PASSWORD = "Bench-Master-Passw0rd!"
+
+
+# ============== Offline HIBP stand-in ==============
+
+class _HIBPHandler(BaseHTTPRequestHandler):
+    """Answers /range/<prefix> like the Pwned Passwords API."""
+    
+    def do_GET(self):
+        prefix = self.path.rstrip("/").rsplit("/", 1)[-1].upper()
+        rng = random.Random(prefix)
+        lines = [
+            f"{rng.getrandbits(140):035X}"[:35] + f":{rng.randint(1, 5000)}"
+            for _ in range(800)
+        ]
+        body = ("\r\n".join(lines)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def start_hibp_stub() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _HIBPHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ============== Seeding ==============
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _synthetic_entry(rng: random.Random, index: int) -> Dict[str, str]:
+    site = f"site{index}-{rng.randrange(10**6)}.example.com"
+    # Some reuse, as in real vaults
+    if rng.random() < 0.2:
+        password = f"Summer{2015 + rng.randrange(10)}!"
+    else:
+        password = "".join(rng.choice("abcdefghijkmnpqrstuvwxyzABCDEFGH23456789!@#$") for _ in range(16))
+    return {
+        "title": f"Account {index} at {site}",
+        "username": f"user{index}@example.com",
+        "password": password,
+        "url": f"https://{site}/login",
+        "notes": "Synthetic benchmark entry",
+    }
+
+
+async def seed(db_file: Path, users: int, entries: int, seed_value: int) -> List[Dict[str, str]]:
+    """Create users through the auth service and bulk insert encrypted entries."""
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_file}"
+    sys.path.insert(0, str(BACKEND_DIR))
+    
+    from app.crypto import vault_crypto
+    from app.db import db, shard_router
+    from app.db.models import UserRegister
+    from app.services import auth_service
+    
+    db.db_path = str(db_file)
+    await db.connect()
+    await db.init_schema()
+    await shard_router.connect()  # DB_SHARDS from the environment
+    
+    rng = random.Random(seed_value)
+    accounts = []
+    for i in range(users):
+        email = f"bench{i}@example.com"
+        user, error = await auth_service.register(
+            UserRegister(email=email, username=f"bench{i}", master_password=MASTER_PASSWORD)
+        )
+        if error:
+            raise RuntimeError(f"Seeding failed: {error}")
+        
+        key = await auth_service.get_derived_key(user["id"], MASTER_PASSWORD)
+        now = time.strftime("%Y-%m-%dT%H:%M:%S")
+        rows = [
+            (
+                str(uuid.uuid4()),
+                user["id"],
+                vault_crypto.encrypt_entry(_synthetic_entry(rng, n), key),
+                rng.choice(["Work", "Personal", "Finance", None]),
+                int(rng.random() < 0.1),
+                now,
+                now,
+            )
+            for n in range(entries)
+        ]
+        async with (await shard_router.for_user(user["id"])).transaction() as conn:
+            await conn.executemany(
+                """
+                INSERT INTO vault_entries (id, user_id, encrypted_data, category, favorite, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+        accounts.append({"email": email, "user_id": user["id"]})
+    
+    await shard_router.disconnect()
+    await db.disconnect()
+    return accounts
+
+
+# ============== Server ==============
+
+def start_server(db_file: Path, hibp_url: str, port: int, workers: int, workdir: Path) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{db_file}",
+        "HIBP_API_URL": hibp_url,
+        "RATE_LIMIT_ENABLED": "false",
+        "PYTHONPATH": str(BACKEND_DIR),
+    }
+    cmd = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1",
+        "--port", str(port),
+        "--workers", str(workers),
+        "--log-level", "warning",
+        "--no-access-log",
+    ]
+    return subprocess.Popen(cmd, cwd=workdir, env=env)
+
+
+async def wait_ready(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/api/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("Server did not become ready")
+
+
+# ============== Load generation ==============
+
+class Workload:
+    """Weighted mix of API operations against seeded accounts."""
+    
+    def __init__(self, client: httpx.AsyncClient, accounts: List[Dict[str, str]], mix: Dict[str, int], rng: random.Random):
+        self.client = client
+        self.accounts = accounts
+        self.ops = list(mix)
+        self.weights = [mix[op] for op in self.ops]
+        self.rng = rng
+        self.tokens: Dict[str, str] = {}
+        self.entry_ids: Dict[str, List[str]] = {}
+    
+    async def login(self, account: Dict[str, str]) -> httpx.Response:
+        response = await self.client.post(
+            "/api/auth/login",
+            json={"email": account["email"], "master_password": MASTER_PASSWORD},
+        )
+        if response.status_code == 200:
+            self.tokens[account["email"]] = response.json()["access_token"]
+        return response
+    
+    def _headers(self, account: Dict[str, str]) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.tokens[account['email']]}",
+            "X-Master-Password": MASTER_PASSWORD,
+        }
+    
+    async def prepare(self):
+        for account in self.accounts:
+            await self.login(account)
+            response = await self.client.get("/api/vault/list", headers=self._headers(account))
+            response.raise_for_status()
+            self.entry_ids[account["email"]] = [e["id"] for e in response.json()]
+    
+    def pick(self) -> str:
+        return self.rng.choices(self.ops, self.weights)[0]
+    
+    async def run(self, op: str) -> httpx.Response:
+        account = self.rng.choice(self.accounts)
+        headers = self._headers(account)
+        ids = self.entry_ids[account["email"]]
+        
+        if op == "list":
+            return await self.client.get("/api/vault/list", headers=headers)
+        if op == "get" and ids:
+            return await self.client.get(f"/api/vault/{self.rng.choice(ids)}", headers=headers)
+        if op == "update" and ids:
+            return await self.client.put(
+                f"/api/vault/{self.rng.choice(ids)}",
+                json={"password": uuid.uuid4().hex + "A!"},
+                headers=headers,
+            )
+        if op == "dashboard":
+            return await self.client.get("/api/analytics/dashboard", headers=headers)
+        if op == "login":
+            return await self.login(account)
+        if op == "register":
+            name = uuid.uuid4().hex[:12]
+            return await self.client.post(
+                "/api/auth/register",
+                json={"email": f"{name}@example.com", "username": name, "master_password": MASTER_PASSWORD},
+            )
+        if op == "breach":
+            return await self.client.post(
+                "/api/vault/check-breach",
+                params={"password": hashlib.sha1(os.urandom(8)).hexdigest()},
+            )
+        # "add", or get/update on an empty vault
+        response = await self.client.post(
+            "/api/vault/add",
+            json=_synthetic_entry(self.rng, self.rng.randrange(10**6)),
+            headers=headers,
+        )
+        if response.status_code == 201:
+            ids.append(response.json()["id"])
+        return response
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, object]:
+    values = sorted(latencies)
+    to_ms = lambda v: None if v is None else round(v * 1000, 3)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": to_ms(percentile(values, 50)),
+        "p95_ms": to_ms(percentile(values, 95)),
+        "p99_ms": to_ms(percentile(values, 99)),
+        "max_ms": to_ms(values[-1] if values else None),
+    }
+
+
+async def drive(base_url: str, accounts, mix: Dict[str, int], concurrency: int, total: int, seed_value: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        workload = Workload(client, accounts, mix, random.Random(seed_value))
+        await workload.prepare()
+        
+        latencies: Dict[str, List[float]] = {op: [] for op in mix}
+        errors: Dict[str, int] = {op: 0 for op in mix}
+        remaining = total
+        
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                op = workload.pick()
+                start = time.perf_counter()
+                try:
+                    response = await workload.run(op)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                latencies[op].append(time.perf_counter() - start)
+                if not ok:
+                    errors[op] += 1
+        
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    
+    all_latencies = [v for values in latencies.values() for v in values]
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "overall": summarize(all_latencies, sum(errors.values()), elapsed),
+        "operations": {
+            op: summarize(latencies[op], errors[op], elapsed)
+            for op in mix
+            if latencies[op]
+        },
+    }
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = int(weight or 1)
+    unknown = set(mix) - set(DEFAULT_MIX_OPS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown operations: {', '.join(sorted(unknown))}")
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+async def main_async(args) -> Dict[str, object]:
+    workdir = Path(tempfile.mkdtemp(prefix="samurai-bench-"))
+    db_file = workdir / "bench.db"
+    # Keep app.log and friends out of the source tree
+    os.chdir(workdir)
+    
+    seed_start = time.perf_counter()
+    accounts = await seed(db_file, args.users, args.entries, args.seed)
+    seed_elapsed = time.perf_counter() - seed_start
+    
+    hibp = start_hibp_stub()
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(db_file, f"http://127.0.0.1:{hibp.server_port}/range/", port, args.workers, workdir)
+    try:
+        await wait_ready(base_url)
+        results = await drive(base_url, accounts, args.mix, args.concurrency, args.requests, args.seed)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        hibp.shutdown()
+    
+    return {
+        "config": {
+            "users": args.users,
+            "entries_per_user": args.entries,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "workers": args.workers,
+            "mix": args.mix,
+            "seed": args.seed,
+        },
+        "seed_s": round(seed_elapsed, 3),
+        **results,
+        "workdir": str(workdir),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SamuraiVault API load test")
+    parser.add_argument("--users", type=int, default=4, help="Seeded users")
+    parser.add_argument("--entries", type=int, default=1000, help="Vault entries per user (10 to 50000)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=1000, help="Total requests to send")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Operation weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+    
+    if not 10 <= args.entries <= 50000:
+        parser.error("--entries must be between 10 and 50000")
+    
+    output = Path(args.output).resolve() if args.output else None
+    results = asyncio.run(main_async(args))
+    payload = json.dumps(results, indent=2)
+    if output:
+        output.write_text(payload + "\n")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Cold-start import budget.
+
+Imports ``app.main`` in fresh interpreters under ``-X importtime`` and
+checks that
+
+- the median import time stays within ``--budget-ms``
+- lazily loaded subsystems (QR rendering, the HIBP HTTP client) are not
+  pulled in at start-up
+
+It prints the slowest modules and exits non-zero when either check fails,
+so it can gate CI.
+
+Usage (from ``backend/``):
+    
+    python -m benchmarks.import_budget --budget-ms 1500 --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Top-level packages that must only load on first use
+LAZY_MODULES = ("qrcode", "PIL", "httpx")
+
+
+def import_profile(workdir: str) -> Tuple[int, Dict[str, int]]:
+    """Import app.main once; return total and per-package cumulative microseconds."""
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(BACKEND_DIR),
+        "LOG_FILE": "",
+        "PYTHONDONTWRITEBYTECODE": "1",
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=workdir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative: Dict[str, int] = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        if not cum.strip().isdigit():
+            continue  # header line
+        module = name.strip()
+        cumulative[module] = int(cum)
+        if module == "app.main":
+            total = int(cum)
+    return total, cumulative
+
+
+def top_modules(cumulative: Dict[str, int], count: int) -> List[Tuple[str, float]]:
+    """Slowest top-level packages by cumulative import time (ms)."""
+    packages = {name: us for name, us in cumulative.items() if "." not in name}
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return [(name, round(us / 1000, 1)) for name, us in ranked[:count]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SamuraiVault cold-start import budget")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="Maximum median import time of app.main")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to sample")
+    parser.add_argument("--top", type=int, default=15, help="Slowest packages to report")
+    args = parser.parse_args(argv)
+    
+    totals = []
+    with tempfile.TemporaryDirectory(prefix="samurai-import-") as workdir:
+        for _ in range(args.runs):
+            total, cumulative = import_profile(workdir)
+            totals.append(total / 1000)
+    
+    median_ms = statistics.median(totals)
+    eager_lazy = sorted(name for name in LAZY_MODULES if name in cumulative)
+    report = {
+        "median_ms": round(median_ms, 1),
+        "budget_ms": args.budget_ms,
+        "runs_ms": [round(t, 1) for t in totals],
+        "slowest_packages_ms": top_modules(cumulative, args.top),
+        "lazy_modules_loaded": eager_lazy,
+    }
+    print(json.dumps(report, indent=2))
+    
+    failed = False
+    if median_ms > args.budget_ms:
+        print(f"FAIL: app.main imports in {median_ms:.0f} ms (budget {args.budget_ms:.0f} ms)", file=sys.stderr)
+        failed = True
+    if eager_lazy:
+        print(f"FAIL: imported at start-up: {', '.join(eager_lazy)}", file=sys.stderr)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
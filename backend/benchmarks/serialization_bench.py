@@ -0,0 +1,112 @@
+"""
+Vault list serialization micro-benchmark.
+
+Times the steps between decrypted entries and response bytes for a
+synthetic vault, without the database or crypto:
+
+- ``response_model``: what FastAPI does for a list returned from a route
+  with ``response_model=List[VaultEntryResponse]`` (re-validation,
+  ``jsonable_encoder``, stdlib ``json``)
+- ``fast_path``: ``model_list_response`` (pydantic-core ``dump_json``)
+- ``gzip``: compressing the body at each level, with the size saved
+
+Usage (from ``backend/``):
+    
+    python -m benchmarks.serialization_bench --entries 10000 --rounds 5
+"""
+
+import argparse
+import gzip
+import json
+import statistics
+import time
+import uuid
+from typing import Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.db.models import VaultEntryResponse
+from app.utils.responses import model_list_response
+
+
+def make_entries(count: int) -> List[VaultEntryResponse]:
+    """Build validated list entries shaped like real ones."""
+    now = "2026-01-01T12:00:00.000000"
+    return [
+        VaultEntryResponse(
+            id=str(uuid.uuid4()),
+            title=f"Account {i}",
+            username=f"user{i}@example.com",
+            url=f"https://site{i % 500}.example.com/login",
+            category=("Work", "Personal", "Finance", None)[i % 4],
+            favorite=i % 7 == 0,
+            strength_score=(i * 37) % 101,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def time_ms(func: Callable[[], object], rounds: int) -> Dict[str, float]:
+    """Run func `rounds` times and summarize wall time in milliseconds."""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": round(statistics.median(timings), 2),
+        "min_ms": round(min(timings), 2),
+    }
+
+
+def run(count: int, rounds: int) -> Dict[str, object]:
+    entries = make_entries(count)
+    adapter = TypeAdapter(List[VaultEntryResponse])
+    
+    def response_model_path() -> bytes:
+        validated = adapter.validate_python(entries, from_attributes=True)
+        return json.dumps(
+            jsonable_encoder(validated),
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+    
+    def fast_path() -> bytes:
+        return model_list_response(entries, VaultEntryResponse).body
+    
+    body = fast_path()
+    if json.loads(body) != json.loads(response_model_path()):
+        raise SystemExit("fast path output differs from response_model output")
+    
+    results: Dict[str, object] = {
+        "entries": count,
+        "body_bytes": len(body),
+        "response_model": time_ms(response_model_path, rounds),
+        "fast_path": time_ms(fast_path, rounds),
+        "gzip": {},
+    }
+    for level in (1, 5, 9):
+        compressed = gzip.compress(body, compresslevel=level)
+        results["gzip"][f"level_{level}"] = {
+            **time_ms(lambda: gzip.compress(body, compresslevel=level), rounds),
+            "body_bytes": len(compressed),
+            "ratio": round(len(compressed) / len(body), 3),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SamuraiVault list serialization benchmark")
+    parser.add_argument("--entries", type=int, default=10000, help="Entries in the synthetic vault")
+    parser.add_argument("--rounds", type=int, default=5, help="Runs per measurement")
+    args = parser.parse_args(argv)
+    
+    print(json.dumps(run(args.entries, args.rounds), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,31 +9,76 @@ const API_BASE_URL = 'http://localhost:8000';
  * Get stored auth data
  */
 async function getAuthData() {
-    const result = await chrome.storage.local.get(['access_token', 'master_password']);
+    const result = await chrome.storage.local.get(['access_token', 'refresh_token', 'master_password']);
     return result;
 }
 
 /**
  * Save auth data
  */
-async function saveAuthData(accessToken, masterPassword) {
+async function saveAuthData(accessToken, masterPassword, refreshToken = null) {
     await chrome.storage.local.set({
         access_token: accessToken,
         master_password: masterPassword
     });
+    if (refreshToken) {
+        await chrome.storage.local.set({ refresh_token: refreshToken });
+    } else {
+        // Synced website logins come without one
+        await chrome.storage.local.remove('refresh_token');
+    }
 }
 
 /**
  * Clear auth data
  */
 async function clearAuthData() {
-    await chrome.storage.local.remove(['access_token', 'master_password']);
+    await chrome.storage.local.remove(['access_token', 'refresh_token', 'master_password']);
+}
+
+let refreshing = null;
+
+/**
+ * Exchange the refresh token for new tokens instead of logging in again.
+ * Refresh tokens are single use, so concurrent callers share one request.
+ */
+function refreshTokens() {
+    if (!refreshing) {
+        refreshing = (async () => {
+            const { refresh_token: refreshToken } = await chrome.storage.local.get(['refresh_token']);
+            if (!refreshToken) {
+                return false;
+            }
+
+            try {
+                const response = await fetch(`${API_BASE_URL}/api/auth/refresh`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ refresh_token: refreshToken })
+                });
+                if (!response.ok) {
+                    return false;
+                }
+                const data = await response.json();
+                await chrome.storage.local.set({
+                    access_token: data.access_token,
+                    refresh_token: data.refresh_token
+                });
+                return true;
+            } catch (error) {
+                return false;
+            }
+        })().finally(() => {
+            refreshing = null;
+        });
+    }
+    return refreshing;
 }
 
 /**
  * Make API request
  */
-async function apiRequest(endpoint, options = {}) {
+async function apiRequest(endpoint, options = {}, retry = true) {
     const authData = await getAuthData();
 
     const headers = {
@@ -55,6 +100,9 @@ async function apiRequest(endpoint, options = {}) {
     });
 
     if (response.status === 401) {
+        if (retry && authData.access_token && endpoint !== '/api/auth/login' && await refreshTokens()) {
+            return apiRequest(endpoint, options, false);
+        }
         await clearAuthData();
         throw new Error('Authentication expired. Please log in again.');
     }
@@ -89,7 +137,7 @@ async function login(email, password, mfaCode = null) {
     });
 
     if (response.access_token) {
-        await saveAuthData(response.access_token, password);
+        await saveAuthData(response.access_token, password, response.refresh_token);
         return { success: true, user: response.user };
     }
 
@@ -127,6 +175,15 @@ async function checkAuth() {
  * Logout
  */
 async function logout() {
+    // Only end our own session, not one synced from the website
+    const authData = await getAuthData();
+    if (authData.refresh_token) {
+        try {
+            await apiRequest('/api/auth/logout', { method: 'POST' }, false);
+        } catch (error) {
+            // Signed out locally either way
+        }
+    }
     await clearAuthData();
     return { success: true };
 }
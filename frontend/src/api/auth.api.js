@@ -21,7 +21,7 @@ export const authApi = {
         });
 
         if (response && response.access_token) {
-            localStorage.setItem('access_token', response.access_token);
+            apiClient.setTokens(response.access_token, response.refresh_token);
             // Store master password in session for vault encryption
             sessionStorage.setItem('master_password', masterPassword);
 
@@ -29,7 +29,9 @@ export const authApi = {
             try {
                 if (typeof chrome !== 'undefined' && chrome.runtime && chrome.runtime.sendMessage) {
                     // Try to send to extension - extension ID will be different in production
-                    // This uses the externally_connectable feature
+                    // This uses the externally_connectable feature.
+                    // The refresh token stays here: it is single use, and
+                    // the extension gets its own when it logs in itself
                     window.postMessage({
                         type: 'SAMURAI_VAULT_LOGIN',
                         access_token: response.access_token,
@@ -48,7 +50,7 @@ export const authApi = {
         try {
             await apiClient.post('/api/auth/logout', {});
         } finally {
-            localStorage.removeItem('access_token');
+            apiClient.clearTokens();
             sessionStorage.removeItem('master_password');
         }
     },
@@ -13,16 +13,86 @@ class ApiClient {
         return localStorage.getItem('access_token');
     }
 
+    getRefreshToken() {
+        return localStorage.getItem('refresh_token');
+    }
+
+    setTokens(accessToken, refreshToken) {
+        localStorage.setItem('access_token', accessToken);
+        if (refreshToken) {
+            localStorage.setItem('refresh_token', refreshToken);
+        }
+    }
+
+    clearTokens() {
+        localStorage.removeItem('access_token');
+        localStorage.removeItem('refresh_token');
+    }
+
+    /**
+     * Get a new access token with the refresh token (no password needed).
+     * Refresh tokens are single use, so concurrent callers share one request,
+     * and tabs take turns through a Web Lock (where supported) so a second
+     * tab picks up the tokens the first one stored instead of reusing the
+     * old refresh token.
+     */
+    async refreshTokens(failedToken) {
+        if (!this.refreshing) {
+            const refresh = () => {
+                // Another tab may have refreshed already
+                if (this.getToken() && this.getToken() !== failedToken) {
+                    return true;
+                }
+                return this.exchangeRefreshToken();
+            };
+            const locked = navigator.locks
+                ? navigator.locks.request('samurai-token-refresh', refresh)
+                : refresh();
+            this.refreshing = Promise.resolve(locked).finally(() => {
+                this.refreshing = null;
+            });
+        }
+        return this.refreshing;
+    }
+
+    async exchangeRefreshToken() {
+        const refreshToken = this.getRefreshToken();
+        if (!refreshToken) {
+            return false;
+        }
+
+        try {
+            const response = await fetch(`${this.baseUrl}/api/auth/refresh`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ refresh_token: refreshToken }),
+            });
+            if (!response.ok) {
+                return false;
+            }
+            const data = await response.json();
+            this.setTokens(data.access_token, data.refresh_token);
+            return true;
+        } catch (error) {
+            return false;
+        }
+    }
+
     getMasterPassword() {
         return sessionStorage.getItem('master_password');
     }
 
-    async request(endpoint, options = {}) {
+    /**
+     * Send a request and return its parsed JSON body. `onResponse`, if
+     * given, is called with the successful Response (to read headers).
+     */
+    async request(endpoint, options = {}, retry = true) {
         const url = `${this.baseUrl}${endpoint}`;
+        const { onResponse, ...fetchOptions } = options;
 
         const headers = {
             'Content-Type': 'application/json',
-            ...options.headers,
+            ...fetchOptions.headers,
         };
 
         // Add auth token
@@ -39,13 +109,16 @@ class ApiClient {
 
         try {
             const response = await fetch(url, {
-                ...options,
+                ...fetchOptions,
                 headers,
             });
 
-            // Handle 401 - redirect to login
+            // Handle 401 - refresh the access token once, else redirect to login
             if (response.status === 401) {
-                localStorage.removeItem('access_token');
+                if (retry && token && endpoint !== '/api/auth/login' && await this.refreshTokens(token)) {
+                    return this.request(endpoint, options, false);
+                }
+                this.clearTokens();
                 sessionStorage.removeItem('master_password');
                 window.location.href = '/login';
                 return null;
@@ -53,6 +126,7 @@ class ApiClient {
 
             // Handle 204 No Content (for delete operations)
             if (response.status === 204) {
+                onResponse?.(response);
                 return { success: true };
             }
 
@@ -62,6 +136,7 @@ class ApiClient {
                 throw new Error(data.detail || 'Request failed');
             }
 
+            onResponse?.(response);
             return data;
         } catch (error) {
             console.error('API Error:', error);
@@ -69,26 +144,116 @@ class ApiClient {
         }
     }
 
-    async get(endpoint) {
-        return this.request(endpoint, { method: 'GET' });
+    /**
+     * Follow a server-sent event stream, calling onEvent(type, data) per
+     * event. Reconnects (with Last-Event-ID, so nothing is missed) when the
+     * stream ends or fails. Returns a function that closes the stream.
+     */
+    stream(endpoint, onEvent) {
+        const controller = new AbortController();
+        let lastEventId = null;
+        let retryMs = 3000;
+
+        const connect = async () => {
+            const token = this.getToken();
+            const headers = { Accept: 'text/event-stream' };
+            if (token) {
+                headers['Authorization'] = `Bearer ${token}`;
+            }
+            if (lastEventId) {
+                headers['Last-Event-ID'] = lastEventId;
+            }
+
+            const response = await fetch(`${this.baseUrl}${endpoint}`, {
+                headers,
+                signal: controller.signal,
+            });
+            if (response.status === 401) {
+                if (!token || !(await this.refreshTokens(token))) {
+                    controller.abort();
+                }
+                return;
+            }
+            if (!response.ok) {
+                throw new Error(`Event stream failed: ${response.status}`);
+            }
+
+            const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+            let buffer = '';
+            for (;;) {
+                const { value, done } = await reader.read();
+                if (done) {
+                    return;
+                }
+                buffer += value.replace(/\r\n?/g, '\n');
+                let end;
+                while ((end = buffer.indexOf('\n\n')) >= 0) {
+                    const block = buffer.slice(0, end);
+                    buffer = buffer.slice(end + 2);
+                    let type = 'message';
+                    const data = [];
+                    for (const line of block.split('\n')) {
+                        const colon = line.indexOf(':');
+                        if (colon === 0) {
+                            continue; // comment (keepalive)
+                        }
+                        const field = colon < 0 ? line : line.slice(0, colon);
+                        const content = colon < 0 ? '' : line.slice(colon + 1).replace(/^ /, '');
+                        if (field === 'id') lastEventId = content;
+                        else if (field === 'event') type = content;
+                        else if (field === 'data') data.push(content);
+                        else if (field === 'retry' && /^\d+$/.test(content)) retryMs = Number(content);
+                    }
+                    if (data.length) {
+                        onEvent(type, JSON.parse(data.join('\n')));
+                    }
+                }
+            }
+        };
+
+        (async () => {
+            let failures = 0;
+            while (!controller.signal.aborted) {
+                try {
+                    await connect();
+                    failures = 0;
+                } catch (error) {
+                    if (controller.signal.aborted) {
+                        return;
+                    }
+                    failures += 1;
+                }
+                // Back off on repeated failures, up to a minute
+                const delay = Math.min(retryMs * 2 ** failures, 60000);
+                await new Promise((resolve) => setTimeout(resolve, delay));
+            }
+        })();
+
+        return () => controller.abort();
+    }
+
+    async get(endpoint, options = {}) {
+        return this.request(endpoint, { ...options, method: 'GET' });
     }
 
-    async post(endpoint, body) {
+    async post(endpoint, body, options = {}) {
         return this.request(endpoint, {
+            ...options,
             method: 'POST',
             body: JSON.stringify(body),
         });
     }
 
-    async put(endpoint, body) {
+    async put(endpoint, body, options = {}) {
         return this.request(endpoint, {
+            ...options,
             method: 'PUT',
             body: JSON.stringify(body),
         });
     }
 
-    async delete(endpoint) {
-        return this.request(endpoint, { method: 'DELETE' });
+    async delete(endpoint, options = {}) {
+        return this.request(endpoint, { ...options, method: 'DELETE' });
     }
 }
 
@@ -4,25 +4,40 @@
 
 import { apiClient } from './client';
 
+// Pass the X-Vault-Version of a list or write to onVersion, if given
+const reportVersion = (onVersion) => ({
+    onResponse: (response) => {
+        const version = Number(response.headers.get('X-Vault-Version'));
+        if (onVersion && version) {
+            onVersion(version);
+        }
+    },
+});
+
 export const vaultApi = {
-    async list() {
-        return apiClient.get('/api/vault/list');
+    async list(onVersion) {
+        return apiClient.get('/api/vault/list', reportVersion(onVersion));
     },
 
     async get(entryId) {
         return apiClient.get(`/api/vault/${entryId}`);
     },
 
-    async add(entry) {
-        return apiClient.post('/api/vault/add', entry);
+    async add(entry, onVersion) {
+        return apiClient.post('/api/vault/add', entry, reportVersion(onVersion));
+    },
+
+    async update(entryId, entry, onVersion) {
+        return apiClient.put(`/api/vault/${entryId}`, entry, reportVersion(onVersion));
     },
 
-    async update(entryId, entry) {
-        return apiClient.put(`/api/vault/${entryId}`, entry);
+    async delete(entryId, onVersion) {
+        return apiClient.delete(`/api/vault/${entryId}`, reportVersion(onVersion));
     },
 
-    async delete(entryId) {
-        return apiClient.delete(`/api/vault/${entryId}`);
+    /** Follow changes made from other devices; returns an unsubscribe function. */
+    events(onEvent) {
+        return apiClient.stream('/api/vault/events', onEvent);
     },
 
     async checkStrength(password) {
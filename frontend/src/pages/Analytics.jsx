@@ -54,6 +54,9 @@ const Analytics = () => {
                         <div className="health-item">
                             <span>Reused</span><span>{analytics?.reused_passwords || 0}</span>
                         </div>
+                        <div className="health-item">
+                            <span>Near-duplicates</span><span>{analytics?.similar_passwords || 0}</span>
+                        </div>
                     </div>
                 </div>
 
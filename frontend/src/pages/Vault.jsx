@@ -10,7 +10,7 @@ import StrengthMeter from '../components/StrengthMeter';
 import { PASSWORD_CATEGORIES } from '../utils/constants';
 
 const Vault = () => {
-    const { entries, loading, error, fetchEntries, addEntry, updateEntry, deleteEntry, getEntry } = useVault();
+    const { entries, loading, error, fetchEntries, addEntry, updateEntry, deleteEntry, getEntry, watchChanges } = useVault();
     const [showAddModal, setShowAddModal] = useState(false);
     const [editingEntry, setEditingEntry] = useState(null);
     const [searchQuery, setSearchQuery] = useState('');
@@ -31,6 +31,8 @@ const Vault = () => {
         fetchEntries();
     }, [fetchEntries]);
 
+    useEffect(() => watchChanges(), [watchChanges]);
+
     const filteredEntries = entries.filter((entry) => {
         const matchesSearch =
             entry.title.toLowerCase().includes(searchQuery.toLowerCase()) ||
@@ -7,6 +7,21 @@ import { vaultApi } from '../api/vault.api';
 
 let globalEntries = [];
 let entriesListeners = [];
+// Vault version globalEntries include every write up to; events at or
+// below it are this tab's own writes (or already listed)
+let knownVersion = 0;
+
+const listed = (version) => {
+    knownVersion = version;
+};
+
+// A write only moves us to its version if we had every earlier one;
+// otherwise another device wrote in between and its event must refetch
+const wrote = (version) => {
+    if (version === knownVersion + 1) {
+        knownVersion = version;
+    }
+};
 
 const notifyEntries = () => {
     entriesListeners.forEach((listener) => listener([...globalEntries]));
@@ -28,7 +43,7 @@ export const useVault = () => {
         setLoading(true);
         setError(null);
         try {
-            const data = await vaultApi.list();
+            const data = await vaultApi.list(listed);
             globalEntries = data || [];
             notifyEntries();
         } catch (err) {
@@ -42,7 +57,7 @@ export const useVault = () => {
         setLoading(true);
         setError(null);
         try {
-            const newEntry = await vaultApi.add(entry);
+            const newEntry = await vaultApi.add(entry, wrote);
             globalEntries = [newEntry, ...globalEntries];
             notifyEntries();
             return newEntry;
@@ -58,7 +73,7 @@ export const useVault = () => {
         setLoading(true);
         setError(null);
         try {
-            const updated = await vaultApi.update(entryId, updates);
+            const updated = await vaultApi.update(entryId, updates, wrote);
             globalEntries = globalEntries.map((e) =>
                 e.id === entryId ? updated : e
             );
@@ -76,7 +91,7 @@ export const useVault = () => {
         setLoading(true);
         setError(null);
         try {
-            await vaultApi.delete(entryId);
+            await vaultApi.delete(entryId, wrote);
             globalEntries = globalEntries.filter((e) => e.id !== entryId);
             notifyEntries();
         } catch (err) {
@@ -91,6 +106,37 @@ export const useVault = () => {
         return vaultApi.get(entryId);
     }, []);
 
+    // Refetch quietly when the vault changes elsewhere (e.g. another device).
+    // Events come in bursts, so wait for a pause before refetching; events of
+    // this tab's own writes are skipped, each refetch costs an Argon2 run.
+    const watchChanges = useCallback(() => {
+        let timer = null;
+        let latest = 0;
+        const close = vaultApi.events((type, data) => {
+            latest = Math.max(latest, data.vault_version || 0);
+            if (latest <= knownVersion) {
+                return;
+            }
+            clearTimeout(timer);
+            timer = setTimeout(async () => {
+                // The response of our own write may have come in meanwhile
+                if (latest <= knownVersion) {
+                    return;
+                }
+                try {
+                    globalEntries = (await vaultApi.list(listed)) || [];
+                    notifyEntries();
+                } catch (err) {
+                    // Keep showing what we have; the next event retries
+                }
+            }, 500);
+        });
+        return () => {
+            clearTimeout(timer);
+            close();
+        };
+    }, []);
+
     return {
         entries,
         loading,
@@ -100,6 +146,7 @@ export const useVault = () => {
         updateEntry,
         deleteEntry,
         getEntry,
+        watchChanges,
     };
 };
 